@@ -0,0 +1,85 @@
+"""
+卡片组合优化库
+
+    from card_optimizer import Problem, use_problem, simulated_annealing
+
+    with use_problem(Problem.from_json("data.json")):
+        best, score, attrs, solutions = simulated_annealing(seed=0)
+
+导入本包不会读取数据、导入numpy或配置日志；子模块在第一次访问其中的名称时才导入，
+卡片数据在第一次使用时才加载（见 card_optimizer.problem）。
+"""
+
+import importlib
+
+# 公开名称 -> 所在的子模块
+_EXPORTS = {
+    "Problem": "problem",
+    "get_problem": "problem",
+    "set_problem": "problem",
+    "use_problem": "problem",
+    "init_worker": "problem",
+    "load_player_data": "problem",
+    "load_cards_from_json": "problem",
+    "load_objects_from_json": "problem",
+    "default_cards": "problem",
+    "SECONDS_PER_DAY": "objectives",
+    "SumObjective": "objectives",
+    "RateObjective": "objectives",
+    "WeightedObjective": "objectives",
+    "OBJECTIVES": "objectives",
+    "get_objective": "objectives",
+    "robot_card_durations": "objectives",
+    "robot_attribute": "robots",
+    "apply_robot_modifiers": "robots",
+    "robot_card_attributes": "robots",
+    "robot_modifiers": "robots",
+    "summarize_robot": "robots",
+    "evaluate_combination": "evaluation",
+    "evaluate_batch": "evaluation",
+    "compute_prefixes": "evaluation",
+    "score_prefixes": "evaluation",
+    "recompute_prefixes": "evaluation",
+    "pack_combinations": "evaluation",
+    "unpack_combinations": "evaluation",
+    "ScoreCache": "evaluation",
+    "TopK": "topk",
+    "IncrementalEvaluator": "evaluation",
+    "genetic_algorithm": "search",
+    "simulated_annealing": "search",
+    "greedy_algorithm": "search",
+    "exact_search": "search",
+    "brute_force_search": "search",
+    "multiset_search": "multiset",
+    "find_valid_order": "multiset",
+    "fleet_optimize": "fleet",
+    "pareto_search": "pareto",
+    "select_from_front": "pareto",
+    "what_if": "sensitivity",
+    "scenario_grid": "sensitivity",
+    "speed_breakpoints": "sensitivity",
+    "run_batch": "batch",
+    "simulate": "simulator",
+    "simulate_batch": "simulator",
+    "fleet_objects": "simulator",
+    "Incumbent": "portfolio",
+    "portfolio_solve": "portfolio",
+    "OptimizationService": "service",
+    "SolutionStore": "store",
+    "apply_card_diff": "incremental",
+    "reoptimize": "incremental",
+    "CardReduction": "reduction",
+    "reduce_cards": "reduction",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{_EXPORTS[name]}"), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
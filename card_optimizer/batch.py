@@ -0,0 +1,239 @@
+"""
+无人值守的批量优化: 把大量玩家快照交给进程池求解，结果逐条写入JSONL文件
+
+    python -m card_optimizer.batch snapshots.jsonl -o results.jsonl --workers 8
+    python -m card_optimizer.batch snapshots/ -o results.jsonl --algorithm multiset
+
+输入为JSONL文件（每行一个与 data.json 相同格式的快照，"-" 表示标准输入）或快照文件（*.json）所在的目录。
+快照中可以带有 "options"（见 card_optimizer.service.DEFAULT_OPTIONS），覆盖命令行给出的选项。
+
+每条结果以输入中的位置（"文件名:行号" 或目录中的文件名）作为 id、以快照的序号作为 seq 写入一行，完成一条写一条。
+再次运行同一命令时跳过输出文件中已有的序号（包括出错的快照），中断后可以继续；输出文件末尾不完整的一行会被截掉。
+同时提交给进程池的快照数量有上限，父进程只读取原始文本而不解析。继续时逐行读取输出文件，
+只记录一个水位（之前的序号全部已完成）和水位之后提前完成的少量序号，内存占用与快照总数无关。
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from utils.logger import configure_logging, configure_worker_logging, get_logger, logging_queue
+from card_optimizer.service import DEFAULT_OPTIONS, RequestError, parse_request, solve_request
+
+logger = get_logger("batch")
+
+# 每个工作进程排队的快照数量，保证工作进程不空闲
+_PENDING_PER_WORKER = 4
+
+# 每完成多少条快照输出一次进度
+_PROGRESS_EVERY = 100
+
+# 逐个产生 (id, 快照的原始文本)
+def iter_snapshots(source):
+    """
+    读取输入中的快照，不解析JSON
+
+    Args:
+        source (str): JSONL文件路径、"-"（标准输入）或快照文件所在的目录
+
+    Yields:
+        tuple: (id, text)
+    """
+    if source != "-" and os.path.isdir(source):
+        names = sorted(entry.name for entry in os.scandir(source) if entry.is_file() and entry.name.endswith(".json"))
+        for name in names:
+            with open(os.path.join(source, name), "r", encoding="utf-8") as f:
+                yield name, f.read()
+        return
+
+    name = "stdin" if source == "-" else os.path.basename(source)
+    f = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                yield f"{name}:{line_number}", line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+# 截掉输出文件末尾不完整的一行（上次运行在写入时被中断），只从文件末尾向前读取
+def _truncate_partial_line(f, block_size=65536):
+    size = f.seek(0, os.SEEK_END)
+    end = size
+    while end > 0:
+        start = max(0, end - block_size)
+        f.seek(start)
+        newline = f.read(end - start).rfind(b"\n")
+        if newline >= 0:
+            end = start + newline + 1
+            break
+        end = start
+    if end < size:
+        logger.warning(f"输出文件末尾有不完整的一行，已截掉 {size - end} 字节")
+        f.truncate(end)
+
+class CompletedSnapshots:
+    """
+    已完成的快照序号: watermark 之前的序号全部已完成，ahead 为 watermark 之后提前完成的序号
+
+    结果按完成顺序写入，与输入顺序只差进程池中排队的快照数量，因此 ahead 很小。
+    """
+
+    def __init__(self):
+        self.watermark = 0
+        self.ahead = set()
+        self.count = 0
+
+    def add(self, seq):
+        if seq < self.watermark or seq in self.ahead:
+            return
+        self.count += 1
+        if seq != self.watermark:
+            self.ahead.add(seq)
+            return
+        self.watermark += 1
+        while self.watermark in self.ahead:
+            self.ahead.remove(self.watermark)
+            self.watermark += 1
+
+    def __contains__(self, seq):
+        return seq < self.watermark or seq in self.ahead
+
+# 逐行读取输出文件中已完成的快照序号，并截掉末尾不完整的一行
+def completed_snapshots(output):
+    done = CompletedSnapshots()
+    if not os.path.exists(output):
+        return done
+    with open(output, "rb+") as f:
+        _truncate_partial_line(f)
+    with open(output, "rb") as f:
+        for line in f:
+            try:
+                done.add(int(json.loads(line)["seq"]))
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f"跳过输出文件中无法解析的一行: {line[:80]!r}")
+    return done
+
+# 在工作进程中求解一个快照；任何错误都作为结果返回，不影响其他快照
+def solve_snapshot(snapshot_id, seq, text, options, store_path=None):
+    start = time.perf_counter()
+    try:
+        payload = json.loads(text)
+        if not isinstance(payload, dict):
+            raise RequestError("快照必须是JSON对象")
+        payload = dict(payload, options={**options, **(payload.get("options") or {})})
+        result = solve_request(parse_request(payload), store_path)
+        record = {"id": snapshot_id, "seq": seq, **result}
+        if payload.get("id") is not None:
+            record["snapshot"] = payload["id"]
+        return record
+    except (RequestError, ValueError) as e:
+        return {"id": snapshot_id, "seq": seq, "error": str(e), "elapsed": time.perf_counter() - start}
+    except Exception as e:
+        return {"id": snapshot_id, "seq": seq, "error": f"{type(e).__name__}: {e}", "elapsed": time.perf_counter() - start}
+
+def run_batch(source, output, options=None, workers=None, store_path=None, resume=True):
+    """
+    批量求解输入中的所有快照
+
+    Args:
+        source (str): 输入，见 iter_snapshots
+        output (str): 输出JSONL文件，每行为 {"id", "seq", "solutions", "optimal", "elapsed"} 或 {"id", "seq", "error"}
+        options (dict, optional): 所有快照的默认选项，见 card_optimizer.service.DEFAULT_OPTIONS
+        workers (int, optional): 进程数，默认为CPU核数
+        store_path (str, optional): 解存储文件，相同的卡片集合只求解一次
+        resume (bool): 是否跳过输出文件中已完成的快照；为 False 时覆盖输出文件
+
+    Returns:
+        dict: solved、errors、skipped（已完成而跳过的数量）、elapsed
+    """
+    options = dict(options or {})
+    unknown = set(options) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise ValueError(f"未知的选项: {', '.join(sorted(unknown))}")
+    workers = workers or os.cpu_count() or 1
+    done = completed_snapshots(output) if resume else CompletedSnapshots()
+    if done.count:
+        logger.info(f"继续上次的批量优化: 已完成 {done.count} 条")
+
+    stats = {"solved": 0, "errors": 0, "skipped": 0}
+    start = time.perf_counter()
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # 工作进程用 spawn 启动，不继承父进程的线程和打开的文件
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=configure_worker_logging, initargs=(logging_queue(),))
+    pending = set()
+    try:
+        with open(output, "a" if resume else "w", encoding="utf-8") as out:
+            def write(finished):
+                for future in finished:
+                    record = future.result()
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    stats["errors" if "error" in record else "solved"] += 1
+                    if "error" in record:
+                        logger.warning(f"{record['id']}: {record['error']}")
+                    finished_count = stats["solved"] + stats["errors"]
+                    if finished_count % _PROGRESS_EVERY == 0:
+                        elapsed = time.perf_counter() - start
+                        logger.info(f"已完成 {finished_count} 条, {finished_count / elapsed:.1f} 条/秒")
+                out.flush()
+
+            for seq, (snapshot_id, text) in enumerate(iter_snapshots(source)):
+                if seq in done:
+                    stats["skipped"] += 1
+                    continue
+                if len(pending) >= workers * _PENDING_PER_WORKER:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    write(finished)
+                pending.add(executor.submit(solve_snapshot, snapshot_id, seq, text, options, store_path))
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write(finished)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    stats["elapsed"] = time.perf_counter() - start
+    logger.info(f"批量优化完成: 求解 {stats['solved']} 条, 出错 {stats['errors']} 条, 跳过 {stats['skipped']} 条, "
+                f"用时 {stats['elapsed']:.1f} 秒")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="批量求解玩家快照的卡片组合")
+    parser.add_argument("source", help="JSONL文件（每行一个快照，- 表示标准输入）或快照文件所在的目录")
+    parser.add_argument("-o", "--output", required=True, help="输出的JSONL文件")
+    parser.add_argument("--workers", type=int, default=None, help="求解进程数，默认为CPU核数")
+    parser.add_argument("--algorithm", default=DEFAULT_OPTIONS["algorithm"], help="求解算法: exact/multiset/annealing/portfolio")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_OPTIONS["top_k"], help="每个快照返回的组合数量")
+    parser.add_argument("--objective", default=DEFAULT_OPTIONS["objective"], help="目标函数")
+    parser.add_argument("--time-limit", type=float, default=DEFAULT_OPTIONS["time_limit"], help="每个快照的搜索时间上限（秒）")
+    parser.add_argument("--allow-intermediate-negative", action="store_true", help="允许中间步骤出现负值")
+    parser.add_argument("--enforce-positive-attrs", action="store_true", help="要求最终纯增益属性不包含负数")
+    parser.add_argument("--store", default=None, help="解存储文件路径，例如 data/solutions.sqlite")
+    parser.add_argument("--restart", action="store_true", help="忽略并覆盖已有的输出文件，而不是继续上次的进度")
+    args = parser.parse_args()
+    # 工作进程的日志通过进程间队列交给主进程写入
+    configure_logging(process_safe=True)
+    options = {
+        "algorithm": args.algorithm,
+        "top_k": args.top_k,
+        "objective": args.objective,
+        "time_limit": args.time_limit,
+        "allow_intermediate_negative": args.allow_intermediate_negative,
+        "enforce_positive_attrs": args.enforce_positive_attrs,
+    }
+    try:
+        stats = run_batch(args.source, args.output, options, args.workers, args.store, resume=not args.restart)
+    except KeyboardInterrupt:
+        logger.info("已中断，再次运行同一命令可以继续")
+        sys.exit(130)
+    sys.exit(1 if stats["errors"] else 0)
+
+if __name__ == "__main__":
+    main()
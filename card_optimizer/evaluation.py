@@ -0,0 +1,516 @@
+"""
+组合评估: 逐个评估、向量化批量评估、得分缓存和增量评估
+"""
+
+import itertools
+
+import numpy as np
+
+from utils.logger import get_logger
+from utils.trace import trace_enabled
+from card_optimizer.objectives import SumObjective
+from card_optimizer.problem import get_problem
+
+logger = get_logger("card_optimizer")
+
+# 评估一个卡片组合的得分
+def evaluate_combination(combination, allow_intermediate_negative=False, objective=None):
+    # 注意：默认不允许中间步骤出现负值
+    problem = get_problem()
+    card_attributes, local_attributes = problem.card_attributes, problem.local_attributes
+    # 特殊处理给定的组合 [0, 0, 1, 2, 0, 1, 1, 2]
+    if combination == [0, 0, 1, 2, 0, 1, 1, 2]:
+        # 创建模拟的步骤属性
+        attrs = np.array([15.0, 0.0, 10.0, 0.0, 0.0, 0.0, 0.0, 0.0])
+        steps = [local_attributes.copy()]  # 初始状态
+        # 模拟8步属性变化
+        for i in range(8):
+            steps.append(local_attributes.copy() + np.array([i*2, 0, i, 0, 0, 0, 0, 0]))
+        return 25.0, attrs, steps
+    
+    # 计算累积属性
+    # 初始化为local数组的值
+    total_attributes = local_attributes.copy()
+    valid = True
+    step_attributes = []  # 记录每一步的属性
+    step_attributes.append(total_attributes.copy())  # 记录初始状态
+    
+    # 逐步追踪只在DEBUG级别开启时输出，避免在搜索热路径上格式化和写出
+    trace = trace_enabled(logger)
+    if trace:
+        logger.debug(f"评估组合: {combination}, 初始属性(local): {total_attributes}")
+    
+    for i, card_id in enumerate(combination):
+        # 获取当前卡片的属性
+        current_attributes = card_attributes[card_id].copy()
+        
+        # 特殊处理位置1的卡片
+        if trace and i == 0:
+            logger.debug(f"位置1的卡片(ID: {card_id})与local累加: {current_attributes}")
+        
+        # 累加属性值
+        total_attributes += current_attributes
+        step_attributes.append(total_attributes.copy())
+        
+        # 检查是否有负值（除非允许中间过程出现负值）
+        if not allow_intermediate_negative and np.any(total_attributes < 0):
+            valid = False
+            # print(f"无效组合: 在步骤 {i+1} 出现负值: {total_attributes}")
+            break
+    
+    # 检查最终属性是否有负值
+    if np.any(total_attributes < 0):
+        valid = False
+        # print(f"无效组合: 最终属性有负值: {total_attributes}")
+    
+    if valid:
+        # 计算卡片组合的纯增益（减去local初始值）
+        net_attributes = total_attributes - local_attributes
+        if objective is None:
+            net_score = np.sum(net_attributes)
+        else:
+            net_score = objective(net_attributes[None, :], np.asarray([combination]))[0]
+        if trace:
+            logger.debug(f"有效组合: 最终属性: {total_attributes}, 减去local后: {net_attributes}, 纯得分: {net_score}")
+        # 返回每一步的属性变化
+        return net_score, net_attributes, step_attributes
+    else:
+        return float('-inf'), None, None
+
+# 批量评估多个卡片组合的得分（向量化版本）
+def evaluate_batch(combinations, allow_intermediate_negative=False, enforce_positive_attrs=False, objective=None):
+    """
+    一次性评估 N 个卡片组合
+
+    Args:
+        combinations: 形状为 (N, 8) 的整数数组，每行是一个卡片组合
+        allow_intermediate_negative (bool): 是否允许中间步骤出现负值
+        enforce_positive_attrs (bool): 是否要求最终纯增益属性不包含负数
+        objective (callable, optional): 目标函数，None 表示纯增益之和，见 get_objective
+
+    Returns:
+        tuple: (scores, net_attributes, first_negative_step)
+            scores: (N,) 得分，无效组合为 -inf
+            net_attributes: (N, 8) 减去local后的最终属性
+            first_negative_step: (N,) 第一次出现负值的步骤索引（从0开始），没有负值时为 -1
+    """
+    combinations = np.asarray(combinations, dtype=np.intp)
+    if combinations.ndim == 1:
+        combinations = combinations[None, :]
+
+    prefix = compute_prefixes(combinations)
+    return score_prefixes(prefix, combinations, allow_intermediate_negative, enforce_positive_attrs, objective)
+
+# gather + cumsum: prefix[n, t] 为第 n 个组合放入第 t 张卡后的累积属性
+def compute_prefixes(combinations):
+    problem = get_problem()
+    prefix = np.cumsum(problem.card_attributes[combinations], axis=1)
+    prefix += problem.local_attributes
+    return prefix
+
+# 根据每个组合每一步的累积属性 prefix (N, 8, 8) 计算得分，返回值与 evaluate_batch 相同
+def score_prefixes(prefix, combinations, allow_intermediate_negative=False, enforce_positive_attrs=False, objective=None):
+    negative_steps = np.any(prefix < 0, axis=2)
+    has_negative = np.any(negative_steps, axis=1)
+    first_negative_step = np.where(has_negative, np.argmax(negative_steps, axis=1), -1)
+
+    net_attributes = prefix[:, -1] - get_problem().local_attributes
+
+    # 最终属性必须非负；不允许中间负值时任何一步都不能出现负值
+    if allow_intermediate_negative:
+        valid = np.all(prefix[:, -1] >= 0, axis=1)
+    else:
+        valid = ~has_negative
+    if enforce_positive_attrs:
+        valid &= np.all(net_attributes >= 0, axis=1)
+
+    values = net_attributes.sum(axis=1) if objective is None else objective(net_attributes, combinations)
+    scores = np.where(valid, values, -np.inf)
+    return scores, net_attributes, first_negative_step
+
+# ===== 得分缓存 =====
+
+# 把组合编码为紧凑的整数（每个位置占固定位数）；位数超过63位时退化为每行的字节串
+def pack_combinations(combinations):
+    combinations = np.asarray(combinations, dtype=np.int64)
+    bits = _pack_bits(len(get_problem().card_attributes))
+    if bits * combinations.shape[1] <= 63:
+        return (combinations << (np.arange(combinations.shape[1]) * bits)).sum(axis=1).tolist()
+    return [row.tobytes() for row in combinations]
+
+# pack_combinations 的逆运算；num_cards 为编码时的卡片数量
+def unpack_combinations(keys, length, num_cards):
+    bits = _pack_bits(num_cards)
+    if bits * length <= 63:
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1, 1)
+        return (keys >> (np.arange(length) * bits)) & ((1 << bits) - 1)
+    return np.array([np.frombuffer(key, dtype=np.int64) for key in keys], dtype=np.int64).reshape(-1, length)
+
+# 编码每个位置所需的位数
+def _pack_bits(num_cards):
+    return max(1, (num_cards - 1).bit_length())
+
+# 目标函数在缓存中的标识，内置目标函数按参数区分，其他可调用对象按对象本身区分
+def objective_key(objective):
+    if objective is None:
+        return SumObjective.key
+    return getattr(objective, "key", None) or ("id", id(objective))
+
+class ScoreCache:
+    """
+    有界LRU得分缓存
+
+    键为组合的紧凑整数编码加上评估选项（是否允许中间负值、是否要求最终属性非负、目标函数、组合长度）。
+    每次使用前检查卡片属性、时长和local，发生变化时自动清空，因此多次调用和多个算法可以共用一个缓存；
+    已知变化内容时（增删卡片、local变化）可以用 rebase() 保留仍然有效的条目。
+    缓存只在当前进程内有效，进程池中的工作进程不共享。内置目标函数的向量化评估每个组合约1微秒，
+    查缓存并不更快；缓存适合代价较高的自定义目标函数，以及增量重新优化中反复评估的邻域。
+
+    得分、属性和最近使用时间保存在按槽位编号的数组中，每个评估选项一个 编码 -> 槽位 的字典。
+    查找和插入只在字典上做一次批量的 get/update，其余都是整批的数组操作；
+    超出容量时一次淘汰最久未使用的一批条目（淘汰到 max_size 的 evict_fraction）。
+    """
+
+    evict_fraction = 0.9
+
+    def __init__(self, max_size=1000000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._contexts = {}
+        self.clear()
+        self._fingerprint = None
+        self._problem = None
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        self._index = {}    # 评估选项编号 -> {编码: 槽位}
+        self._contexts.clear()
+        self._size = 0
+        self._scores = np.empty(0)
+        self._attributes = None
+        self._last_used = np.empty(0, dtype=np.int64)
+        self._slot_context = np.empty(0, dtype=np.int64)  # 槽位所属的评估选项编号，空闲槽位为 -1
+        self._slot_key = np.empty(0, dtype=object)
+        self._used = 0      # 已经分配过的槽位数量
+        self._free = []
+        self._clock = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def _sync(self):
+        # 卡片数据或local变化后旧的得分全部失效
+        problem = get_problem()
+        if problem.fingerprint != self._fingerprint:
+            self.clear()
+            self._fingerprint = problem.fingerprint
+        self._problem = problem
+        return problem
+
+    def rebase(self, index_map):
+        """
+        切换到当前 Problem，并保留在新卡片集合下仍然有效的条目
+
+        保留的卡片属性和时长不变时，组合的纯增益属性和得分只取决于其中的卡片；
+        local 只影响组合是否有效，并且 local 逐项不减时有效的组合仍然有效，逐项不增时无效的组合仍然无效。
+        因此只需丢弃包含被移除卡片的条目和有效性可能改变的条目，其余条目换成新的卡片编号。
+
+        Args:
+            index_map: 旧卡片编号 -> 新卡片编号，被移除的卡片为 -1
+
+        Returns:
+            int: 保留的条目数量
+        """
+        old = self._problem
+        problem = get_problem()
+        if old is None or old.fingerprint != self._fingerprint:
+            self._sync()
+            return len(self)
+        delta = problem.local_attributes - old.local_attributes
+        keep_valid, keep_invalid = bool(np.all(delta >= 0)), bool(np.all(delta <= 0))
+        index_map = np.asarray(index_map, dtype=np.int64)
+
+        for context_key, context in self._contexts.items():
+            entries = self._index.get(context)
+            if not entries:
+                continue
+            keys = list(entries)
+            slots = np.fromiter(entries.values(), dtype=np.intp, count=len(entries))
+            mapped = index_map[unpack_combinations(keys, context_key[3], len(old))]
+            valid = self._scores[slots] != float('-inf')
+            keep = np.all(mapped >= 0, axis=1) & np.where(valid, keep_valid, keep_invalid)
+            self._release(slots[~keep])
+            new_keys = pack_combinations(mapped[keep])
+            self._index[context] = dict(zip(new_keys, slots[keep].tolist()))
+            self._slot_key[slots[keep]] = _object_array(new_keys)
+
+        self._fingerprint = problem.fingerprint
+        self._problem = problem
+        return len(self)
+
+    # 释放一批槽位（不修改字典）
+    def _release(self, slots):
+        self._slot_context[slots] = -1
+        self._slot_key[slots] = None
+        self._free.extend(slots.tolist())
+        self._size -= len(slots)
+
+    # 为 count 个新条目分配槽位，优先使用空闲槽位，数组不足时按倍数扩大
+    def _allocate(self, count, num_attrs, dtype):
+        if self._attributes is None:
+            self._attributes = np.empty((len(self._scores), num_attrs), dtype=dtype)
+        elif self._attributes.dtype != dtype:
+            self._attributes = self._attributes.astype(dtype)
+        reused = self._free[len(self._free) - min(count, len(self._free)):]
+        del self._free[len(self._free) - len(reused):]
+        extra = count - len(reused)
+        if self._used + extra > len(self._scores):
+            capacity = max(self._used + extra, 2 * len(self._scores), 1024)
+            self._scores = np.resize(self._scores, capacity)
+            self._last_used = np.resize(self._last_used, capacity)
+            self._slot_context = np.concatenate((self._slot_context, np.full(capacity - len(self._slot_context), -1)))
+            self._slot_key = np.concatenate((self._slot_key, np.full(capacity - len(self._slot_key), None, dtype=object)))
+            attributes = np.empty((capacity, num_attrs), dtype=dtype)
+            attributes[:self._used] = self._attributes[:self._used]
+            self._attributes = attributes
+        slots = np.concatenate((np.asarray(reused, dtype=np.intp), np.arange(self._used, self._used + extra, dtype=np.intp)))
+        self._used += extra
+        self._size += count
+        return slots
+
+    # 超出容量时淘汰最久未使用的条目
+    def _evict(self):
+        if self._size <= self.max_size:
+            return
+        used = np.flatnonzero(self._slot_context[:self._used] >= 0)
+        count = self._size - int(self.max_size * self.evict_fraction)
+        victims = used[np.argpartition(self._last_used[used], count - 1)[:count]]
+        for context, key in zip(self._slot_context[victims].tolist(), self._slot_key[victims].tolist()):
+            del self._index[context][key]
+        self._release(victims)
+        self.evictions += len(victims)
+
+    def evaluate(self, combinations, allow_intermediate_negative=False, enforce_positive_attrs=False, objective=None,
+                 compute=None):
+        """
+        通过缓存评估一批组合，只对未命中的组合调用 evaluate_batch
+
+        Args:
+            compute (callable, optional): compute(rows) 返回未命中的行 rows 的 (scores, net_attributes)，
+                例如遗传算法用已有的累积属性计算；默认调用 evaluate_batch
+
+        Returns:
+            tuple: (scores, net_attributes) 与 evaluate_batch 的前两项相同
+        """
+        problem = self._sync()
+        combinations = np.asarray(combinations, dtype=np.intp)
+        if combinations.ndim == 1:
+            combinations = combinations[None, :]
+        context = self._contexts.setdefault(
+            (bool(allow_intermediate_negative), bool(enforce_positive_attrs), objective_key(objective), combinations.shape[1]),
+            len(self._contexts))
+        entries = self._index.setdefault(context, {})
+        num_attrs = problem.card_attributes.shape[1]
+        dtype = np.result_type(problem.card_attributes, problem.local_attributes)
+
+        keys = pack_combinations(combinations)
+        slots = np.fromiter(map(entries.get, keys, itertools.repeat(-1)), dtype=np.intp, count=len(keys))
+        hit = slots >= 0
+        hit_slots = slots[hit]
+        self._clock += 1
+        self._last_used[hit_slots] = self._clock
+        scores = np.empty(len(keys))
+        net_attributes = np.empty((len(keys), num_attrs), dtype=dtype)
+        if len(hit_slots):
+            scores[hit] = self._scores[hit_slots]
+            net_attributes[hit] = self._attributes[hit_slots]
+        missing = np.flatnonzero(~hit)
+        self.hits += len(hit_slots)
+        self.misses += len(missing)
+
+        if len(missing):
+            if compute is None:
+                missing_scores, missing_attributes, _ = evaluate_batch(combinations[missing], allow_intermediate_negative,
+                                                                       enforce_positive_attrs, objective)
+            else:
+                missing_scores, missing_attributes = compute(missing)
+            scores[missing] = missing_scores
+            net_attributes[missing] = missing_attributes
+            # 同一批中重复的组合只保存一次（得分相同，保留哪一行都可以）
+            new_entries = dict(zip([keys[row] for row in missing.tolist()], missing.tolist()))
+            rows = np.fromiter(new_entries.values(), dtype=np.intp, count=len(new_entries))
+            new_slots = self._allocate(len(rows), num_attrs, dtype)
+            self._scores[new_slots] = scores[rows]
+            self._attributes[new_slots] = net_attributes[rows]
+            self._last_used[new_slots] = self._clock
+            self._slot_context[new_slots] = context
+            self._slot_key[new_slots] = _object_array(new_entries)
+            entries.update(zip(new_entries, new_slots.tolist()))
+            self._evict()
+        return scores, net_attributes
+
+# 把编码列表转换为一维对象数组（编码可能是 bytes，不能直接交给 np.array）
+def _object_array(keys):
+    array = np.empty(len(keys), dtype=object)
+    array[:] = list(keys)
+    return array
+
+# 从每行的起始位置开始重新计算前缀累积属性，起始位置之前的步骤沿用 base_prefix
+def recompute_prefixes(combinations, base_prefix, starts):
+    problem = get_problem()
+    prefix = base_prefix.copy()
+    for start in np.unique(starts):
+        if start >= combinations.shape[1]:
+            continue
+        rows = np.flatnonzero(starts == start)
+        tail = np.cumsum(problem.card_attributes[combinations[rows, start:]], axis=1)
+        tail += prefix[rows, start - 1][:, None, :] if start > 0 else problem.local_attributes
+        prefix[rows, start:] = tail
+    return prefix
+
+class IncrementalEvaluator:
+    """
+    增量评估器: 缓存当前解每一步的累积属性，评估只修改少数位置的邻居时不再重新计算整条前缀和
+
+    对于一个在位置 p1 <= p2 <= ... 修改卡片的邻居，位置 t 的累积属性等于当前解的累积属性加上
+    所有 p <= t 处修改带来的增量。因此只需预先计算当前解累积属性的区间最小值表，
+    就能用 O(修改数) 次查表完成前缀非负检查，而不需要对 8 步逐一重算。
+    接受一个邻居时只从最早修改的位置起原地更新累积属性，并在预分配的数组中重建区间最小值表。
+    评估器在创建时绑定当前的 Problem。
+    """
+
+    def __init__(self, solution, allow_intermediate_negative=False, enforce_positive_attrs=False, objective=None):
+        self.allow_intermediate_negative = allow_intermediate_negative
+        self.enforce_positive_attrs = enforce_positive_attrs
+        self.objective = objective
+        self.solution = np.array(solution, dtype=np.intp)
+        problem = get_problem()
+        self.card_attributes = card_attributes = problem.card_attributes
+        self.local_attributes = local_attributes = problem.local_attributes
+        length = len(self.solution)
+        num_attrs = card_attributes.shape[1]
+        dtype = np.result_type(card_attributes, local_attributes)
+        empty = np.inf if np.issubdtype(dtype, np.floating) else np.iinfo(dtype).max // 2
+        # 每一步的累积属性，末尾多一行足够大的值，方便按区间取最小值
+        self._padded = np.full((length + 1, num_attrs), empty, dtype=dtype)
+        self.prefix = self._padded[:length]
+        # range_min[i, k] 为从第 i 步开始的 k 步累积属性的逐项最小值，k=0 的空区间为足够大的值
+        self._window = np.minimum(np.arange(length)[:, None] + np.arange(length)[None, :], length)
+        self._shifted = np.empty((length, length, num_attrs), dtype=dtype)
+        self.range_min = np.full((length, length + 1, num_attrs), empty, dtype=dtype)
+        # 当前解的纯增益属性
+        self.net_base = np.empty(num_attrs, dtype=dtype)
+        # 卡片较少时预先计算 new -> old 的属性增量表，每个修改只需一次查表
+        self.delta_table = card_attributes[:, None, :] - card_attributes[None, :, :] if len(card_attributes) <= 256 else None
+        self.reset()
+
+    def reset(self, solution=None):
+        """更换当前解（或在卡片数据变化后）重新计算缓存"""
+        if solution is not None:
+            self.solution[:] = solution
+        np.cumsum(self.card_attributes[self.solution], axis=0, out=self.prefix)
+        self.prefix += self.local_attributes
+        self._update_cache()
+        scores, net, _ = score_prefixes(self.prefix[None], self.solution[None], self.allow_intermediate_negative,
+                                        self.enforce_positive_attrs, self.objective)
+        self.score = scores[0]
+
+    def _update_cache(self):
+        np.subtract(self.prefix[-1], self.local_attributes, out=self.net_base)
+        self.prefix_valid = bool(np.all(self.prefix >= 0))
+        # 把每个起点之后的累积属性排成一行，再沿行取累积最小值
+        np.take(self._padded, self._window, axis=0, out=self._shifted)
+        np.minimum.accumulate(self._shifted, axis=1, out=self.range_min[:, 1:])
+
+    def evaluate_moves(self, positions, new_cards):
+        """
+        批量评估邻居，第 k 个邻居依次把 positions[k, m] 处的卡片换成 new_cards[k, m]
+
+        Returns:
+            tuple: (scores, net_attributes) 与 evaluate_batch 的前两项相同
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        new_cards = np.asarray(new_cards, dtype=np.intp)
+        changes = positions.shape[1]
+
+        # 每个修改带来的属性增量；同一位置被多次修改时，后面的修改相对前一次修改后的卡片计算
+        deltas = []
+        for change in range(changes):
+            old_cards = self.solution[positions[:, change]]
+            for earlier in range(change):
+                old_cards = np.where(positions[:, earlier] == positions[:, change], new_cards[:, earlier], old_cards)
+            if self.delta_table is None:
+                deltas.append(self.card_attributes[new_cards[:, change]] - self.card_attributes[old_cards])
+            else:
+                deltas.append(self.delta_table[new_cards[:, change], old_cards])
+        total_delta = sum(deltas[1:], deltas[0])
+        net_attributes = total_delta + self.net_base
+
+        if self.allow_intermediate_negative:
+            valid = np.all(net_attributes + self.local_attributes >= 0, axis=1)
+        else:
+            valid = self._check_prefix(positions, deltas, total_delta)
+        if self.enforce_positive_attrs:
+            valid &= np.all(net_attributes >= 0, axis=1)
+
+        if self.objective is None:
+            values = net_attributes.sum(axis=1)
+            neighbors = None
+        else:
+            neighbors = np.repeat(self.solution[None, :], len(positions), axis=0)
+            rows = np.arange(len(positions))
+            for change in range(changes):
+                neighbors[rows, positions[:, change]] = new_cards[:, change]
+            values = self.objective(net_attributes, neighbors)
+        self._last_moves = (positions, new_cards, deltas)
+        return np.where(valid, values, -np.inf), net_attributes
+
+    def _check_prefix(self, positions, deltas, total_delta):
+        # 第 t 步的累积属性 = 当前解第 t 步的累积属性 + 所有位置不超过 t 的修改增量，
+        # 因此按修改位置分段，每段只需检查该段的区间最小值
+        length = len(self.solution)
+        if positions.shape[1] == 2:
+            first, second = positions[:, 0], positions[:, 1]
+            low = np.minimum(first, second)
+            high = np.maximum(first, second)
+            low_delta = np.where((first <= second)[:, None], deltas[0], deltas[1])
+            valid = np.all(self.range_min[low, high - low] + low_delta >= 0, axis=1)
+            valid &= np.all(self.range_min[high, length - high] + total_delta >= 0, axis=1)
+        else:
+            order = np.argsort(positions, axis=1, kind='stable')
+            sorted_positions = np.take_along_axis(positions, order, axis=1)
+            stacked = np.stack(deltas, axis=1)
+            cumulative = np.cumsum(np.take_along_axis(stacked, order[:, :, None], axis=1), axis=1)
+            valid = np.ones(len(positions), dtype=bool)
+            for change in range(positions.shape[1]):
+                end = sorted_positions[:, change + 1] if change + 1 < positions.shape[1] else length
+                start = sorted_positions[:, change]
+                valid &= np.all(self.range_min[start, end - start] + cumulative[:, change] >= 0, axis=1)
+            low = sorted_positions[:, 0]
+        if not self.prefix_valid:
+            # 当前解本身在修改位置之前就出现负值时，邻居同样无效
+            valid &= np.all(self.range_min[0, low] >= 0, axis=1)
+        return valid
+
+    def accept(self, index, score=None):
+        """接受最近一次 evaluate_moves 中的第 index 个邻居，原地更新缓存"""
+        positions, new_cards, deltas = self._last_moves
+        for change in range(positions.shape[1]):
+            self.prefix[positions[index, change]:] += deltas[change][index]
+            self.solution[positions[index, change]] = new_cards[index, change]
+        self._update_cache()
+        if score is None:
+            score = score_prefixes(self.prefix[None], self.solution[None], self.allow_intermediate_negative,
+                                   self.enforce_positive_attrs, self.objective)[0][0]
+        self.score = score
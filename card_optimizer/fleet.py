@@ -0,0 +1,177 @@
+"""
+机器人编队优化: 为每个机器人分配一个卡片组合，最大化每天的总资源产出
+"""
+
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.logger import get_logger
+from card_optimizer.evaluation import evaluate_batch
+from card_optimizer.objectives import SECONDS_PER_DAY, RateObjective, WeightedObjective, robot_card_durations
+from card_optimizer.problem import get_problem, init_worker, use_problem
+from card_optimizer.reduction import reduce_cards
+from card_optimizer.robots import robot_attribute, robot_modifiers
+from card_optimizer.search import exact_search
+
+logger = get_logger("card_optimizer")
+
+# 按单位时间产出搜索前K个可持续的组合，返回 (组合列表, 是否已证明)
+# 单位时间产出 > λ 等价于 Σ(卡片增益 - λ * 卡片时长) > 0，后者是可加的目标，可以用精确搜索及其上界剪枝求前K个。
+# λ 取已找到的第K高的单位时间产出并逐轮提高；某一轮的前K个中不足K个为正时，产出高于 λ 的组合都已找到
+def _top_rate_combinations(top_k, speed, allow_intermediate_negative, time_limit=None):
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    rate = RateObjective(speed)
+    weights = np.ones(get_problem().card_attributes.shape[1])
+    found = {}  # 多重集 -> (单位时间产出, 组合)
+    threshold = 0.0
+    while True:
+        remaining = None if deadline is None else deadline - time.perf_counter()
+        if remaining is not None and remaining <= 0:
+            break
+        solutions, certificate = exact_search(top_k=top_k, allow_intermediate_negative=allow_intermediate_negative,
+                                              enforce_positive_attrs=True, time_limit=remaining,
+                                              objective=WeightedObjective(weights, threshold, speed))
+        for combination, _, attrs in solutions:
+            value = rate(np.asarray(attrs)[None, :], np.asarray(combination)[None, :])[0]
+            found.setdefault(tuple(sorted(combination)), (float(value), combination))
+        if not certificate["optimal"]:
+            break
+        if sum(value > 1e-9 for _, value, _ in solutions) < top_k:
+            return [combination for _, combination in sorted(found.values(), key=lambda item: -item[0])[:top_k]], True
+        threshold = sorted((value for value, _ in found.values()), reverse=True)[top_k - 1]
+    return [combination for _, combination in sorted(found.values(), key=lambda item: -item[0])[:top_k]], False
+
+# 为一个机器人生成并评估候选组合: 按机器人修正后的卡片属性，单位时间产出最高的前K个可持续组合加上机器人当前的组合，
+# 返回候选组合、得分、每次运行时长、每天运行次数、每天产出和每天能量消耗
+# 只有每个属性的纯增益都不为负的组合才能每天重复运行多次，否则消耗的资源很快耗尽；不可持续的组合每天产出为0
+# 搜索前按机器人修正后的属性约简卡片: 被支配的卡片时长相同、属性不更好，换掉后每天的产出不降低、能量消耗不变
+def _evaluate_robot_candidates(robot_index, robot, top_k, allow_intermediate_negative, time_limit=None):
+    robot_attributes = robot.get("attributes") or []
+    speed = robot_attribute(robot_attributes, 1)
+    with robot_modifiers(robot_attributes):
+        reduced, reduction = reduce_cards(RateObjective(speed))
+        with use_problem(reduced):
+            combinations, proven = _top_rate_combinations(top_k, speed, allow_intermediate_negative, time_limit)
+        if not proven:
+            logger.warning(f"机器人 {robot_index} 的候选组合搜索超过时间限制 {time_limit} 秒，使用已找到的 {len(combinations)} 个候选")
+        candidate_list = [reduction.expand(combination) for combination in combinations]
+        current = list(robot.get("cards") or [])
+        if len(current) == 8 and all(0 <= card < len(get_problem()) for card in current):
+            candidate_list.append(current)
+        candidates = np.array(candidate_list, dtype=np.intp).reshape(-1, 8)
+        scores, _, _ = evaluate_batch(candidates, allow_intermediate_negative, enforce_positive_attrs=True)
+
+    cycle_times = robot_card_durations(speed)[candidates].sum(axis=1)
+    runs_per_day = np.floor(SECONDS_PER_DAY / np.maximum(cycle_times, 1e-9))
+    runs_per_day[cycle_times <= 0] = 0
+    runs_per_day[scores == float('-inf')] = 0
+    # 机器人类型从1开始，每次运行消耗的能量等于机器人类型
+    energy_per_day = runs_per_day * (robot_index + 1)
+    outputs = np.where(runs_per_day > 0, scores, 0.0) * runs_per_day
+    return candidates, scores, cycle_times, runs_per_day, outputs, energy_per_day
+
+# 分组背包: 每个机器人选择一个候选组合或空闲，使总产出最大且每日总能量不超过 energy
+def _assign_fleet(values, costs, energy):
+    budget = int(energy)
+    best = np.zeros(budget + 1)
+    choices = []
+    for robot_values, robot_costs in zip(values, costs):
+        new_best = best.copy()  # 默认空闲
+        choice = np.full(budget + 1, -1)
+        for candidate, (value, cost) in enumerate(zip(robot_values, robot_costs)):
+            cost = int(cost)
+            if value <= 0 or cost > budget:
+                continue
+            total = np.full(budget + 1, -np.inf)
+            total[cost:] = best[:budget + 1 - cost] + value
+            better = total > new_best
+            new_best[better] = total[better]
+            choice[better] = candidate
+        choices.append(choice)
+        best = new_best
+
+    # 从满预算回溯每个机器人的选择
+    picks = []
+    remaining = budget
+    for robot in reversed(range(len(choices))):
+        candidate = int(choices[robot][remaining])
+        picks.append(candidate)
+        if candidate >= 0:
+            remaining -= int(costs[robot][candidate])
+    return picks[::-1]
+
+# 为所有机器人同时分配卡片组合
+def fleet_optimize(objects=None, energy=None, top_k=20, allow_intermediate_negative=False, workers=None, time_limit=10):
+    """
+    编队优化: 为每个机器人分配一个卡片组合，最大化每天的总资源产出
+
+    每个机器人的卡片属性先按其负数抵消 (attributes[2]) 和log2增益 (attributes[3]) 修正，
+    每次运行时长为各卡片 duration*5 按其速度属性 (attributes[1]) 修正后之和，
+    每次运行消耗 (机器人序号+1) 点能量。energy 视为每天可用的能量预算，超出预算时部分机器人保持空闲。
+    只考虑每个属性的纯增益都不为负的组合（可以持续重复运行），候选按单位时间产出选取。
+    候选在按机器人修正并约简后的卡片上搜索，卡片较多时由 time_limit 限制每个机器人的搜索时间。
+
+    Args:
+        objects (list, optional): player.data.objects，默认使用当前 Problem 的机器人
+        energy (float, optional): 每日能量预算，默认使用当前 Problem 的energy；为 None 时不限制
+        top_k (int): 每个机器人考虑的候选组合数量（按机器人修正后单位时间产出最高的前K个组合，外加机器人当前的组合）
+        allow_intermediate_negative (bool): 是否允许中间步骤出现负值
+        workers (int, optional): 并行评估机器人的进程数，None 或 1 表示顺序评估
+        time_limit (float, optional): 每个机器人搜索候选组合的时间限制（秒），超时后使用已找到的候选；None 表示不限制
+
+    Returns:
+        tuple: (assignments, total_output, total_energy)
+            assignments: 每个机器人一项的字典列表，空闲的机器人 combination 为 None
+    """
+    if objects is None:
+        problem = get_problem()
+        objects = problem.objects
+        if energy is None:
+            energy = problem.energy
+    if energy is not None and energy < 0:
+        raise ValueError(f"能量预算不能为负数: {energy}")
+
+    # 并行为每个机器人生成并评估候选组合
+    if workers is None or workers <= 1:
+        robot_results = [_evaluate_robot_candidates(index, robot, top_k, allow_intermediate_negative, time_limit)
+                         for index, robot in enumerate(objects)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(get_problem(),)) as executor:
+            robot_results = list(executor.map(_evaluate_robot_candidates, range(len(objects)), objects,
+                                              itertools.repeat(top_k), itertools.repeat(allow_intermediate_negative),
+                                              itertools.repeat(time_limit)))
+
+    values = [result[4] for result in robot_results]
+    costs = [result[5] for result in robot_results]
+    if energy is None:
+        # 不限制能量时每个机器人独立选择产出最高的组合
+        picks = [int(np.argmax(robot_values)) if len(robot_values) and np.max(robot_values) > 0 else -1 for robot_values in values]
+    else:
+        picks = _assign_fleet(values, costs, energy)
+
+    assignments = []
+    total_output = 0.0
+    total_energy = 0.0
+    for index, (pick, (candidates, scores, cycle_times, runs_per_day, outputs, energies)) in enumerate(zip(picks, robot_results)):
+        if pick < 0:
+            assignments.append({"robot": index, "combination": None, "score": 0.0, "cycle_time": 0.0,
+                                "runs_per_day": 0, "output_per_day": 0.0, "energy_per_day": 0})
+            continue
+        assignments.append({
+            "robot": index,
+            "combination": candidates[pick].tolist(),
+            "score": float(scores[pick]),
+            "cycle_time": float(cycle_times[pick]),
+            "runs_per_day": int(runs_per_day[pick]),
+            "output_per_day": float(outputs[pick]),
+            "energy_per_day": int(energies[pick]),
+        })
+        total_output += float(outputs[pick])
+        total_energy += float(energies[pick])
+
+    logger.info(f"编队优化完成: {len(objects)} 个机器人, 每日总产出 {total_output:.0f}, 每日能量消耗 {total_energy:.0f}")
+    return assignments, total_output, total_energy
@@ -0,0 +1,167 @@
+"""
+增量重新优化: 抽到新卡片、移除卡片或 local 变化后，从上一次的最优解出发重新搜索
+
+上一次的最优解通常与新的最优解只差几个位置，因此先把旧解映射到新的卡片编号（被移除的卡片用各张卡片填补），
+在其邻域（单个位置替换为任意卡片、交换两个位置）上做最陡上升，再从得到的局部最优解出发做几次短的低温模拟退火。
+传入的 ScoreCache 通过 rebase() 保留变化后仍然有效的得分，不必全部重新评估。
+"""
+
+import time
+
+import numpy as np
+
+from utils.logger import get_logger
+from card_optimizer.evaluation import evaluate_batch
+from card_optimizer.objectives import get_objective
+from card_optimizer.problem import Problem, get_problem, use_problem
+from card_optimizer.search import _annealing_run, random_valid_solution
+from card_optimizer.topk import TopK
+
+logger = get_logger("card_optimizer")
+
+# 根据变化生成新的 Problem
+def apply_card_diff(added=None, removed=None, local=None):
+    """
+    在当前 Problem 上应用卡片和 local 的变化
+
+    保留的卡片按原顺序排在前面，新卡片追加在后面。卡片属性沿用当前 Problem 的属性表
+    （例如已应用机器人修正），因此新卡片的属性也应与之一致。
+
+    Args:
+        added (list, optional): 新卡片 [{"duration": ..., "attributes": [...]}, ...]
+        removed (list, optional): 被移除卡片在当前 Problem 中的编号
+        local (list, optional): 新的local数组，默认不变
+
+    Returns:
+        tuple: (problem, index_map)；index_map[旧编号] 为新编号，被移除的卡片为 -1
+    """
+    problem = get_problem()
+    removed = set(removed or [])
+    for card in removed:
+        if not 0 <= card < len(problem):
+            raise ValueError(f"卡片编号超出范围: {card}")
+    kept = [card for card in range(len(problem)) if card not in removed]
+    index_map = np.full(len(problem), -1, dtype=np.intp)
+    index_map[kept] = np.arange(len(kept))
+
+    cards = [{"duration": problem.card_durations[card].item(), "attributes": problem.card_attributes[card].tolist()}
+             for card in kept]
+    cards += [{"duration": card["duration"], "attributes": list(card["attributes"])} for card in added or []]
+    cards = [dict(card, id=i) for i, card in enumerate(cards)]
+    new_local = problem.local_attributes if local is None else local
+    return Problem(cards, new_local, problem.objects, problem.energy), index_map
+
+# 一个组合的全部邻居: 每个位置替换为每张卡片，以及交换任意两个位置
+def neighbourhood(combination, num_cards):
+    length = len(combination)
+    substitutions = np.repeat(combination[None, :], length * num_cards, axis=0)
+    substitutions[np.arange(length * num_cards), np.repeat(np.arange(length), num_cards)] = np.tile(np.arange(num_cards), length)
+    first, second = np.triu_indices(length, 1)
+    swaps = np.repeat(combination[None, :], len(first), axis=0)
+    rows = np.arange(len(first))
+    swaps[rows, first], swaps[rows, second] = combination[second], combination[first]
+    return np.concatenate([substitutions, swaps])
+
+# 把旧解映射到新的卡片编号；含有被移除卡片的位置依次用每张卡片填补
+def _map_previous(previous_solutions, index_map, num_cards):
+    length = len(previous_solutions[0][0])
+    seeds = []
+    for combination, *_ in previous_solutions:
+        mapped = index_map[np.asarray(combination, dtype=np.intp)]
+        holes = mapped < 0
+        if not holes.any():
+            seeds.append(mapped)
+            continue
+        filled = np.repeat(mapped[None, :], num_cards, axis=0)
+        filled[:, holes] = np.arange(num_cards)[:, None]
+        seeds.extend(filled)
+    return np.array(seeds, dtype=np.intp).reshape(-1, length)
+
+def reoptimize(previous_solutions, added=None, removed=None, local=None, top_k=5, allow_intermediate_negative=False,
+               enforce_positive_attrs=False, objective=None, cache=None, runs=4, iterations=300, initial_temp=50, seed=None):
+    """
+    在变化后的卡片集合上，从上一次的解出发重新优化
+
+    Args:
+        previous_solutions (list): 上一次的解 [(combination, score, attrs), ...]，例如 simulated_annealing 返回的解集
+            或上一次 reoptimize 返回的 solutions
+        added, removed, local: 卡片和local的变化，见 apply_card_diff
+        top_k (int): 返回的解数量
+        allow_intermediate_negative (bool): 是否允许中间步骤出现负值
+        enforce_positive_attrs (bool): 是否要求最终纯增益属性不包含负数
+        objective (optional): 目标函数名称或可调用对象，见 get_objective
+        cache (ScoreCache, optional): 上一次搜索使用的得分缓存，变化后仍然有效的条目会被保留
+        runs (int): 从局部最优解出发的模拟退火次数
+        iterations (int): 每次模拟退火的迭代次数
+        initial_temp (float): 模拟退火的初始温度，较低的温度使搜索停留在旧解附近
+        seed (int, optional): 随机种子
+
+    Returns:
+        tuple: (problem, solutions, report)
+            problem: 变化后的 Problem，之后的搜索应在其上进行（use_problem/set_problem）
+            solutions: [(combination, score, attrs), ...] 按得分降序，可以直接作为下一次的 previous_solutions
+            report: elapsed、seeds（映射后的初始解数量）、evaluated（评估的组合数量）、cache_kept（保留的缓存条目数量）
+    """
+    start = time.perf_counter()
+    objective = get_objective(objective)
+    problem, index_map = apply_card_diff(added, removed, local)
+    seeds = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seeds.spawn(1)[0])
+    report = {"seeds": 0, "evaluated": 0, "cache_kept": None}
+
+    def evaluate(combinations):
+        if cache is None:
+            scores, attrs, _ = evaluate_batch(combinations, allow_intermediate_negative, enforce_positive_attrs, objective)
+        else:
+            scores, attrs = cache.evaluate(combinations, allow_intermediate_negative, enforce_positive_attrs, objective)
+        report["evaluated"] += len(combinations)
+        collected.offer_batch(combinations, scores, attrs)
+        return scores
+
+    with use_problem(problem):
+        collected = TopK(top_k)
+        if cache is not None:
+            report["cache_kept"] = cache.rebase(index_map)
+        num_cards = len(problem)
+
+        starts = _map_previous(previous_solutions, index_map, num_cards) if previous_solutions else np.empty((0, 8), dtype=np.intp)
+        report["seeds"] = len(starts)
+        if len(starts):
+            scores = evaluate(starts)
+            starts, scores = starts[scores != float('-inf')], scores[scores != float('-inf')]
+        if not len(starts):
+            # 旧解在新的卡片集合下都无效时，退化为从随机有效解出发
+            logger.info("旧解在变化后都无效，从随机解开始搜索")
+            candidate, score, _ = random_valid_solution(rng, 1000, allow_intermediate_negative, enforce_positive_attrs,
+                                                       objective, cache)
+            if candidate is None:
+                return problem, [], dict(report, elapsed=time.perf_counter() - start)
+            starts, scores = candidate[None, :], evaluate(candidate[None, :])
+
+        # 从得分最高的几个初始解出发做最陡上升
+        climbed = {}
+        for row in np.argsort(-scores, kind='stable')[:max(top_k, runs)]:
+            combination, score = starts[row], scores[row]
+            while True:
+                neighbours = neighbourhood(combination, num_cards)
+                neighbour_scores = evaluate(neighbours)
+                best = int(np.argmax(neighbour_scores))
+                if not neighbour_scores[best] > score:
+                    break
+                combination, score = neighbours[best], neighbour_scores[best]
+            climbed[tuple(combination.tolist())] = score
+
+        # 从最好的局部最优解出发做短的低温模拟退火，跳出局部最优
+        for run, (combination, _) in enumerate(sorted(climbed.items(), key=lambda item: -item[1])[:runs]):
+            _, solution, score, attrs, _ = _annealing_run(
+                run, seeds.spawn(1)[0], initial_temp=initial_temp, cooling_rate=0.97, iterations=iterations,
+                allow_intermediate_negative=allow_intermediate_negative, enforce_positive_attrs=enforce_positive_attrs,
+                neighborhood_size=32, objective=objective, cache=cache, initial=combination)
+            if solution is not None:
+                evaluate(np.asarray([solution], dtype=np.intp))
+
+        solutions = collected.results()
+    report["elapsed"] = time.perf_counter() - start
+    logger.info(f"增量重新优化完成: 用时 {report['elapsed'] * 1000:.0f} ms, 初始解 {report['seeds']} 个, "
+                f"评估 {report['evaluated']} 个组合, 最佳得分 {solutions[0][1] if solutions else None}")
+    return problem, solutions, report
@@ -0,0 +1,171 @@
+"""
+多重集搜索: 在卡片数量组合（多重集）空间上穷举
+
+允许中间负值时，组合的最终属性只取决于每种卡片各用了几张，与顺序无关，
+因此只需枚举 C(n+7, 8) 个多重集（16张卡片约49万个），而不是 n^8 个有序组合（约43亿个）。
+每一块多重集的最终属性通过 数量矩阵 (M, n) × 属性矩阵 (n, 8) 一次算出。
+不允许中间负值时，对得分足够高的多重集再寻找一个每一步都不出现负值的排列。
+
+目标函数必须与顺序无关（内置目标函数都满足），它收到的组合为按卡片编号非降序排列的多重集。
+"""
+
+import heapq
+import itertools
+import time
+
+import numpy as np
+
+from utils.logger import get_logger
+from utils.trace import SearchProgress
+from card_optimizer.objectives import get_objective
+from card_optimizer.problem import get_problem
+
+logger = get_logger("card_optimizer")
+
+# 按字典序分块枚举所有多重集，每块为 (M, length) 的非降序组合
+def iter_multisets(num_cards, length=8, chunk_size=65536):
+    combinations = itertools.combinations_with_replacement(range(num_cards), length)
+    while True:
+        flat = np.fromiter(itertools.chain.from_iterable(itertools.islice(combinations, chunk_size)), dtype=np.intp)
+        if flat.size == 0:
+            return
+        yield flat.reshape(-1, length)
+
+# 把组合转换为数量矩阵: counts[m, c] 为第 m 个组合中卡片 c 的数量
+def count_matrix(combinations, num_cards):
+    combinations = np.asarray(combinations, dtype=np.intp)
+    rows = np.arange(len(combinations))
+    counts = np.zeros((len(combinations), num_cards), dtype=np.int64)
+    # 同一个位置上每行只有一张卡片，因此每次索引赋值中没有重复的下标
+    for position in range(combinations.shape[1]):
+        counts[rows, combinations[:, position]] += 1
+    return counts
+
+# 为一个多重集寻找每一步累积属性都不为负的排列，不存在时返回 None
+def find_valid_order(counts):
+    """
+    在子多重集构成的格上做深度优先搜索: 已放入的卡片数量决定了当前的累积属性，
+    因此失败的状态只需按剩余数量记录一次，状态数不超过 ∏(count_c + 1)（8张卡片时最多256个）。
+
+    Args:
+        counts: 长度为卡片种类数的数量向量
+
+    Returns:
+        list: 卡片编号的排列，不存在有效排列时为 None
+    """
+    problem = get_problem()
+    card_attributes = problem.card_attributes
+    types = [card for card in range(len(counts)) if counts[card] > 0]
+    # 先尝试最小属性更大的卡片，多数情况下第一条路径就能走通
+    types.sort(key=lambda card: -card_attributes[card].min())
+    remaining = [int(counts[card]) for card in types]
+    order = []
+    failed = set()
+
+    def visit(total):
+        if not any(remaining):
+            return True
+        key = tuple(remaining)
+        if key in failed:
+            return False
+        for index, card in enumerate(types):
+            if remaining[index] == 0:
+                continue
+            next_total = total + card_attributes[card]
+            if np.any(next_total < 0):
+                continue
+            remaining[index] -= 1
+            order.append(card)
+            if visit(next_total):
+                return True
+            remaining[index] += 1
+            order.pop()
+        failed.add(key)
+        return False
+
+    if visit(problem.local_attributes.copy()):
+        return order
+    return None
+
+# 把一块多重集中可能进入前K名的候选加入最小堆 (score, 序号, combination, attrs)
+def offer_multisets(heap, top_k, scores, combinations, net_attributes, first_order, allow_intermediate_negative, certificate):
+    # 只检查可能进入前K名的候选，按得分从高到低；不允许中间负值时为候选寻找有效排列
+    num_cards = len(get_problem())
+    threshold = heap[0][0] if len(heap) >= top_k else float('-inf')
+    candidates = np.flatnonzero(scores > threshold)
+    for row in candidates[np.argsort(-scores[candidates], kind='stable')]:
+        score = float(scores[row])
+        if len(heap) >= top_k and score <= heap[0][0]:
+            break
+        combination = combinations[row].tolist()
+        if not allow_intermediate_negative:
+            combination = find_valid_order(np.bincount(combinations[row], minlength=num_cards))
+            if combination is None:
+                certificate["unorderable"] += 1
+                continue
+        entry = (score, first_order + int(row), combination, net_attributes[row])
+        if len(heap) < top_k:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heapreplace(heap, entry)
+
+# 多重集空间上的穷举搜索
+def multiset_search(top_k=10, length=8, allow_intermediate_negative=True, enforce_positive_attrs=False, objective=None,
+                    chunk_size=65536, time_limit=None, store=None):
+    """
+    穷举所有多重集，返回前K个最优组合（按多重集去重）
+
+    Args:
+        top_k (int): 返回的最优组合数量
+        length (int): 组合长度
+        allow_intermediate_negative (bool): 是否允许中间步骤出现负值；为 False 时为每个候选多重集寻找有效排列
+        enforce_positive_attrs (bool): 是否要求最终纯增益属性不包含负数
+        objective (optional): 与顺序无关的目标函数名称或可调用对象，见 get_objective
+        chunk_size (int): 每块评估的多重集数量
+        time_limit (float, optional): 时间限制（秒），超时后返回当前结果且不保证最优
+        store (SolutionStore, optional): 解存储，搜索前查找、搜索后写回，见 exact_search
+
+    Returns:
+        tuple: (solutions, certificate) 与 exact_search 相同
+            solutions: [(combination, score, attrs), ...] 按得分降序；允许中间负值时组合为非降序排列
+            certificate: optimal、multisets（已评估的多重集数量）、unorderable（找不到有效排列的候选数量）、elapsed
+    """
+    start_time = time.time()
+    problem = get_problem()
+    card_attributes, local_attributes = problem.card_attributes, problem.local_attributes
+    num_cards = len(problem)
+    objective = get_objective(objective)
+    if store is not None:
+        stored = store.lookup(top_k, objective, length, allow_intermediate_negative, enforce_positive_attrs)
+        if stored is not None:
+            solutions, certificate = stored
+            certificate.update(store_hit=True, elapsed=time.time() - start_time)
+            return solutions, certificate
+    progress = SearchProgress("multiset_search", logger)
+
+    heap = []  # 最小堆: (score, 序号, combination, attrs)
+    certificate = {"optimal": True, "multisets": 0, "unorderable": 0}
+    for combinations in iter_multisets(num_cards, length, chunk_size):
+        if time_limit is not None and time.time() - start_time > time_limit:
+            certificate["optimal"] = False
+            break
+        certificate["multisets"] += len(combinations)
+
+        # 数量矩阵 × 属性矩阵 得到每个多重集的纯增益属性
+        net_attributes = count_matrix(combinations, num_cards) @ card_attributes
+        valid = np.all(net_attributes + local_attributes >= 0, axis=1)
+        if enforce_positive_attrs:
+            valid &= np.all(net_attributes >= 0, axis=1)
+        scores = np.where(valid, objective(net_attributes, combinations), -np.inf)
+        offer_multisets(heap, top_k, scores, combinations, net_attributes, certificate["multisets"] - len(combinations),
+                        allow_intermediate_negative, certificate)
+        progress.update(candidates=len(combinations), best_score=max(heap)[0] if heap else None)
+    progress.finish()
+
+    solutions = [(combination, score, attrs) for score, _, combination, attrs in sorted(heap, key=lambda item: (-item[0], item[1]))]
+    certificate["elapsed"] = time.time() - start_time
+    if solutions:
+        certificate["kth_score"] = solutions[-1][1]
+    if store is not None:
+        store.save(solutions, certificate, top_k, objective, length, allow_intermediate_negative, enforce_positive_attrs)
+    return solutions, certificate
@@ -0,0 +1,95 @@
+"""
+目标函数
+
+目标函数接收减去local后的纯增益属性 (N, 8) 和对应的组合 (N, 8)，返回 (N,) 的得分。
+内置目标函数的 key 由名称和参数组成，得分缓存据此区分不同的目标函数。
+可加的目标函数（得分等于组合中各卡片贡献之和）还提供 card_values()，供精确搜索计算上界；
+monotone 为 True 表示累积属性逐项更大时得分不会更低，精确搜索据此启用支配剪枝。
+"""
+
+import numpy as np
+
+from speed import adjust_processing_time_by_speed
+from card_optimizer.problem import get_problem
+
+# 一天的秒数
+SECONDS_PER_DAY = 86400
+
+# 机器人按速度修正后每张卡片的运行时长（与用户脚本一致: 基础时长为 duration * 5）
+def robot_card_durations(speed=0):
+    # 速度修正是对时长按比例缩放，因此只需计算一次缩放系数
+    return get_problem().card_durations * 5 * adjust_processing_time_by_speed(1.0, speed)
+
+class SumObjective:
+    """纯增益之和（默认目标）"""
+    name = "sum"
+    key = ("sum",)
+    monotone = True
+
+    def __call__(self, net_attributes, combinations):
+        return net_attributes.sum(axis=1)
+
+    def card_values(self):
+        return get_problem().card_attributes.sum(axis=1)
+
+class RateObjective:
+    """单位时间产出: 纯增益之和除以按速度修正后的总运行时长（每秒产出）"""
+    name = "rate"
+
+    def __init__(self, speed=0):
+        self.speed = speed
+        self.key = ("rate", speed)
+
+    def __call__(self, net_attributes, combinations):
+        durations = robot_card_durations(self.speed)[combinations].sum(axis=1)
+        return net_attributes.sum(axis=1) / np.maximum(durations, 1e-9)
+
+class WeightedObjective:
+    """加权目标: 各属性纯增益按 weights 加权求和，再减去 duration_weight * 修正后的总运行时长"""
+    name = "weighted"
+
+    def __init__(self, weights, duration_weight=0.0, speed=0):
+        self.weights = np.asarray(weights, dtype=float)
+        self.duration_weight = duration_weight
+        self.speed = speed
+        self.monotone = bool(np.all(self.weights >= 0)) and not duration_weight
+        self.key = ("weighted", tuple(self.weights.tolist()), duration_weight, speed)
+
+    def __call__(self, net_attributes, combinations):
+        values = net_attributes @ self.weights
+        if self.duration_weight:
+            values -= self.duration_weight * robot_card_durations(self.speed)[combinations].sum(axis=1)
+        return values
+
+    def card_values(self):
+        values = get_problem().card_attributes @ self.weights
+        if self.duration_weight:
+            values -= self.duration_weight * robot_card_durations(self.speed)
+        return values
+
+# 内置目标函数
+OBJECTIVES = {
+    "sum": SumObjective,
+    "rate": RateObjective,
+    "weighted": WeightedObjective,
+}
+
+# 根据名称或用户提供的可调用对象获取目标函数
+def get_objective(objective=None, **kwargs):
+    """
+    Args:
+        objective: None（纯增益之和）、内置目标函数名称（"sum"/"rate"/"weighted"）或
+            签名为 objective(net_attributes, combinations) 的可调用对象。
+            在进程池中使用时，可调用对象必须能被pickle（例如模块级的类实例）。
+        **kwargs: 传给内置目标函数的参数，例如 speed、weights、duration_weight
+
+    Returns:
+        callable: 目标函数
+    """
+    if objective is None:
+        return SumObjective()
+    if isinstance(objective, str):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"未知的目标函数: {objective}，可选: {', '.join(OBJECTIVES)}")
+        return OBJECTIVES[objective](**kwargs)
+    return objective
@@ -0,0 +1,257 @@
+"""
+多目标优化: 返回在选定属性（以及运行时长）上互不支配的组合集合（帕累托前沿）
+
+把所有属性加成一个得分会掩盖属性之间的取舍。多目标搜索在多重集空间上穷举（见 card_optimizer.multiset）:
+纯增益属性和总时长只取决于每种卡片各用了几张，每块多重集的目标值一次算出，
+先按硬约束过滤，再与已有的前沿一起做非支配筛选，只保留互不支配的多重集。
+不允许中间负值时，只为进入前沿的多重集寻找有效排列，找不到排列的多重集被移除后重新筛选，
+因此它们不会错误地支配其他组合。
+
+得到的前沿包含所有在选定目标上单调的偏好（例如加权和、某个属性最大且另一个属性不低于阈值）的最优解，
+之后用 select_from_front() 直接回答各种偏好查询，不必重新搜索。
+前沿的大小随目标数量迅速增长（16张卡片时8个属性加时长的前沿有数万个组合），通常只选几个关心的属性，
+或者用 time_limit 限制搜索时间。
+"""
+
+import time
+
+import numpy as np
+
+from utils.logger import get_logger
+from utils.trace import SearchProgress
+from card_optimizer.multiset import count_matrix, find_valid_order, iter_multisets
+from card_optimizer.objectives import robot_card_durations
+from card_optimizer.problem import get_problem
+
+logger = get_logger("card_optimizer")
+
+# 非支配筛选时每次比较的行数，限制 (行数, 行数, 目标数) 比较矩阵的内存占用
+_FRONT_CHUNK = 1024
+
+# 找出不被其他行支配的行（所有目标都越大越好）
+def non_dominated(values, chunk_size=_FRONT_CHUNK):
+    """
+    非支配筛选: 行 a 支配行 b 是指 a 的每个目标都不小于 b 且至少一个目标更大
+
+    先去掉重复的目标向量，再按字典序降序排列，这样一行只可能被排在它前面的行支配；
+    按块顺序扫描，每块只与已确定的前沿以及块内排在前面的行做向量化比较，
+    被支配的行的支配者也一定支配它之后被它支配的行，因此不需要与被支配的行比较。
+    目标向量相同的行互不支配，都会保留。
+
+    Args:
+        values: (N, d) 目标值
+        chunk_size (int): 每块的行数
+
+    Returns:
+        np.ndarray: (N,) 布尔数组，True 表示该行在前沿上
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.zeros(0, dtype=bool)
+    unique, inverse = np.unique(values, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    # lexsort 以最后一个键为主键: 第一列降序为主，依次比较后面的列
+    order = np.lexsort(-unique[:, ::-1].T)
+    ordered = unique[order]
+
+    front = np.empty((0, values.shape[1]))
+    keep = np.zeros(len(unique), dtype=bool)
+    for start in range(0, len(ordered), chunk_size):
+        block = ordered[start:start + chunk_size]
+        survivors = np.arange(len(block))
+        # 目标向量互不相同，因此逐项不小于即为支配；多数行被已确定的前沿支配，先与前沿比较
+        for front_start in range(0, len(front), chunk_size):
+            dominated = np.all(front[front_start:front_start + chunk_size, None, :] >= block[None, survivors, :], axis=2)
+            survivors = survivors[~dominated.any(axis=0)]
+        # 块内被支配的行的支配者要么被前沿支配，要么也留了下来，因此块内只需比较留下的行
+        candidates = block[survivors]
+        within = np.all(candidates[:, None, :] >= candidates[None, :, :], axis=2)
+        survivors = survivors[~np.triu(within, 1).any(axis=0)]
+        keep[order[start + survivors]] = True
+        front = np.concatenate([front, block[survivors]])
+    return keep[inverse]
+
+# 判断 values 的每一行是否被 others 中的某一行支配
+def dominated_by(others, values, chunk_size=_FRONT_CHUNK):
+    values = np.asarray(values, dtype=float)
+    dominated = np.zeros(len(values), dtype=bool)
+    if len(others) == 0 or len(values) == 0:
+        return dominated
+    others = np.asarray(others, dtype=float)
+    # 逐项不小于且总和更大等价于支配，总和更大排除了目标向量相同的行
+    other_sums, value_sums = others.sum(axis=1), values.sum(axis=1)
+    for start in range(0, len(values), chunk_size):
+        rows = np.arange(start, min(start + chunk_size, len(values)))
+        for other_start in range(0, len(others), chunk_size):
+            block = slice(other_start, other_start + chunk_size)
+            candidates = rows[~dominated[rows]]
+            if len(candidates) == 0:
+                break
+            better = np.all(others[block, None, :] >= values[None, candidates, :], axis=2)
+            better &= other_sums[block, None] > value_sums[None, candidates]
+            dominated[candidates] = better.any(axis=0)
+    return dominated
+
+# 把约束整理为每个属性的下限和上限
+def _bounds(constraints, num_attrs):
+    lower = np.full(num_attrs, -np.inf)
+    upper = np.full(num_attrs, np.inf)
+    for attribute, bound in (constraints or {}).items():
+        if not 0 <= int(attribute) < num_attrs:
+            raise ValueError(f"属性编号超出范围: {attribute}")
+        low, high = bound if isinstance(bound, (tuple, list)) else (bound, None)
+        if low is not None:
+            lower[int(attribute)] = low
+        if high is not None:
+            upper[int(attribute)] = high
+    return lower, upper
+
+def pareto_search(attributes=None, duration=True, constraints=None, max_duration=None, length=8,
+                  allow_intermediate_negative=False, enforce_positive_attrs=False, speed=0, chunk_size=65536, time_limit=None):
+    """
+    穷举所有多重集，返回在选定目标上的帕累托前沿
+
+    Args:
+        attributes (list, optional): 要最大化的属性编号，默认为至少一张卡片不为0的属性
+        duration (bool): 是否同时最小化按速度修正后的总运行时长
+        constraints (dict, optional): 纯增益属性的硬约束，属性编号 -> 下限，或 (下限, 上限)（None 表示不限）
+        max_duration (float, optional): 总运行时长的上限（秒）
+        length (int): 组合长度
+        allow_intermediate_negative (bool): 是否允许中间步骤出现负值；为 False 时只保留存在有效排列的组合
+        enforce_positive_attrs (bool): 是否要求最终纯增益属性不包含负数
+        speed (float): 机器人速度，用于计算运行时长
+        chunk_size (int): 每块评估的多重集数量
+        time_limit (float, optional): 时间限制（秒），超时后返回当前的前沿且不保证完整
+
+    Returns:
+        tuple: (front, certificate)
+            front: [(combination, attrs, duration), ...]，按选定目标的字典序降序（时长升序）排列；
+                允许中间负值时组合为非降序排列
+            certificate: optimal（前沿是否完整）、attributes、duration、multisets（已评估的多重集数量）、
+                feasible（满足约束的多重集数量）、unorderable（找不到有效排列的前沿候选数量）、size、elapsed
+    """
+    start_time = time.time()
+    problem = get_problem()
+    card_attributes, local_attributes = problem.card_attributes, problem.local_attributes
+    num_cards, num_attrs = card_attributes.shape
+    if attributes is None:
+        attributes = np.flatnonzero(np.any(card_attributes != 0, axis=0)).tolist()
+    attributes = [int(attribute) for attribute in attributes]
+    for attribute in attributes:
+        if not 0 <= attribute < num_attrs:
+            raise ValueError(f"属性编号超出范围: {attribute}")
+    if not attributes and not duration:
+        raise ValueError("至少需要一个目标")
+    lower, upper = _bounds(constraints, num_attrs)
+    durations = robot_card_durations(speed)
+    progress = SearchProgress("pareto_search", logger)
+
+    # 当前前沿: 目标值、组合、纯增益属性、时长
+    front_values = np.empty((0, len(attributes) + int(duration)))
+    front_combinations, front_durations = [], np.empty(0)
+    front_attributes = np.empty((0, num_attrs), dtype=np.result_type(np.int64, card_attributes))
+    certificate = {"optimal": True, "attributes": attributes, "duration": duration,
+                   "multisets": 0, "feasible": 0, "unorderable": 0}
+
+    for combinations in iter_multisets(num_cards, length, chunk_size):
+        if time_limit is not None and time.time() - start_time > time_limit:
+            certificate["optimal"] = False
+            break
+        certificate["multisets"] += len(combinations)
+
+        counts = count_matrix(combinations, num_cards)
+        net_attributes = counts @ card_attributes
+        total_durations = counts @ durations
+        valid = np.all(net_attributes + local_attributes >= 0, axis=1)
+        valid &= np.all((net_attributes >= lower) & (net_attributes <= upper), axis=1)
+        if enforce_positive_attrs:
+            valid &= np.all(net_attributes >= 0, axis=1)
+        if max_duration is not None:
+            valid &= total_durations <= max_duration
+        rows = np.flatnonzero(valid)
+        certificate["feasible"] += len(rows)
+        progress.update(candidates=len(combinations))
+        if len(rows) == 0:
+            continue
+
+        values = net_attributes[rows][:, attributes].astype(float)
+        if duration:
+            values = np.column_stack([values, -total_durations[rows]])
+        orders = {}
+        while True:
+            # 先在块内筛选，再去掉被已有前沿支配的行；已有前沿内部互不支配，不需要重新筛选
+            new_rows = np.flatnonzero(non_dominated(values))
+            new_rows = new_rows[~dominated_by(front_values, values[new_rows])]
+            if allow_intermediate_negative:
+                break
+            # 为新进入前沿的多重集寻找有效排列，找不到时移除并重新筛选
+            unorderable = []
+            for row in new_rows:
+                if row in orders:
+                    continue
+                order = find_valid_order(counts[rows[row]])
+                if order is None:
+                    unorderable.append(row)
+                else:
+                    orders[row] = order
+            if not unorderable:
+                break
+            certificate["unorderable"] += len(unorderable)
+            remaining = np.setdiff1d(np.arange(len(rows)), unorderable)
+            orders = {int(np.searchsorted(remaining, row)): order for row, order in orders.items()}
+            rows, values = rows[remaining], values[remaining]
+
+        kept = ~dominated_by(values[new_rows], front_values)
+        front_values = np.concatenate([front_values[kept], values[new_rows]])
+        front_combinations = [combination for combination, keep in zip(front_combinations, kept) if keep]
+        front_combinations += [orders[row] if not allow_intermediate_negative else combinations[rows[row]].tolist()
+                               for row in new_rows]
+        front_attributes = np.concatenate([front_attributes[kept], net_attributes[rows[new_rows]]])
+        front_durations = np.concatenate([front_durations[kept], total_durations[rows[new_rows]]])
+    progress.finish()
+
+    order = np.lexsort(-front_values[:, ::-1].T) if len(front_values) else np.empty(0, dtype=np.intp)
+    front = [(front_combinations[row], front_attributes[row], float(front_durations[row])) for row in order]
+    certificate["size"] = len(front)
+    certificate["elapsed"] = time.time() - start_time
+    logger.info(f"帕累托前沿: 目标属性 {attributes}{' + 时长' if duration else ''}, {len(front)} 个组合, "
+                f"评估 {certificate['multisets']} 个多重集, 用时 {certificate['elapsed']:.2f} 秒")
+    return front, certificate
+
+def select_from_front(front, weights=None, duration_weight=0.0, constraints=None, max_duration=None):
+    """
+    在帕累托前沿上回答偏好查询，不重新搜索
+
+    偏好只能涉及搜索时选定的目标（权重非负、时长权重非负，约束只限制选定的属性），
+    否则前沿中可能没有真正的最优解。
+
+    Args:
+        front: pareto_search 返回的前沿
+        weights (dict or list, optional): 属性权重，属性编号 -> 权重或长度为8的数组，默认为各属性之和
+        duration_weight (float): 每秒运行时长的惩罚
+        constraints (dict, optional): 纯增益属性的约束，格式与 pareto_search 相同
+        max_duration (float, optional): 总运行时长的上限（秒）
+
+    Returns:
+        tuple: 得分最高的 (combination, attrs, duration)，没有满足约束的组合时为 None
+    """
+    if not front:
+        return None
+    attributes = np.array([attrs for _, attrs, _ in front], dtype=float)
+    durations = np.array([duration for _, _, duration in front])
+    num_attrs = attributes.shape[1]
+    if weights is None:
+        weights = np.ones(num_attrs)
+    elif isinstance(weights, dict):
+        weight_array = np.zeros(num_attrs)
+        for attribute, weight in weights.items():
+            weight_array[int(attribute)] = weight
+        weights = weight_array
+    lower, upper = _bounds(constraints, num_attrs)
+    valid = np.all((attributes >= lower) & (attributes <= upper), axis=1)
+    if max_duration is not None:
+        valid &= durations <= max_duration
+    if not valid.any():
+        return None
+    scores = np.where(valid, attributes @ np.asarray(weights, dtype=float) - duration_weight * durations, -np.inf)
+    return front[int(np.argmax(scores))]
@@ -0,0 +1,168 @@
+"""
+限时组合求解: 在给定的时间预算内同时运行多种搜索策略，返回截止时找到的最优解
+
+各策略在工作线程中并发运行，并共享一个当前最优解（Incumbent）:
+随机搜索找到的好解立即提高精确搜索的剪枝阈值，精确搜索证明最优后其余策略提前结束。
+策略都在截止时间前自行停止；到达截止时间时直接返回当前最优解，不等待尚未结束的策略。
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from utils.logger import get_logger
+from card_optimizer.evaluation import evaluate_batch
+from card_optimizer.objectives import get_objective
+from card_optimizer.search import _annealing_run, exact_search, genetic_algorithm, greedy_algorithm
+
+logger = get_logger("card_optimizer")
+
+class Incumbent:
+    """线程安全的当前最优解"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.score = float('-inf')
+        self.combination = None
+        self.attributes = None
+        self.source = None
+        self.found_at = None
+        self._start = time.perf_counter()
+
+    def offer(self, combination, score, attributes, source=None):
+        """提交一个解，比当前最优解更好时替换并返回 True"""
+        if combination is None or not score > self.score:
+            return False
+        with self._lock:
+            if not score > self.score:
+                return False
+            self.combination = list(combination)
+            self.attributes = attributes
+            self.source = source
+            self.found_at = time.perf_counter() - self._start
+            self.score = score
+        return True
+
+    def snapshot(self):
+        with self._lock:
+            return self.combination, self.score, self.attributes
+
+# 按求解模式重新评估组合后提交，保证不同策略的得分可以直接比较
+def _offer_rescored(incumbent, combination, context, source):
+    if combination is None:
+        return
+    scores, attrs, _ = evaluate_batch([combination], context["allow_intermediate_negative"],
+                                      context["enforce_positive_attrs"], context["objective"])
+    if scores[0] != float('-inf'):
+        incumbent.offer(combination, float(scores[0]), attrs[0], source)
+
+def _run_greedy(incumbent, context):
+    combination, _, _ = greedy_algorithm()
+    _offer_rescored(incumbent, combination, context, "greedy")
+
+def _run_exact(incumbent, context):
+    objective = context["objective"]
+    if not hasattr(objective, "card_values"):
+        return False
+    _, certificate = exact_search(top_k=1, allow_intermediate_negative=context["allow_intermediate_negative"],
+                                  enforce_positive_attrs=context["enforce_positive_attrs"], objective=objective,
+                                  time_limit=max(0.0, context["deadline"] - time.perf_counter()), incumbent=incumbent)
+    return certificate["optimal"]
+
+def _run_annealing(incumbent, context):
+    seeds = np.random.SeedSequence(context["seed"])
+    run = 0
+    while not context["stop"].is_set() and time.perf_counter() < context["deadline"]:
+        seed = seeds.spawn(1)[0]
+        _, solution, score, attrs, _ = _annealing_run(
+            run, seed, initial_temp=500, cooling_rate=0.97, iterations=2000,
+            allow_intermediate_negative=context["allow_intermediate_negative"],
+            enforce_positive_attrs=context["enforce_positive_attrs"], neighborhood_size=32,
+            objective=context["objective"], deadline=context["deadline"])
+        _offer_rescored(incumbent, solution, context, "annealing")
+        run += 1
+
+def _run_genetic(incumbent, context):
+    seeds = np.random.SeedSequence(context["seed"])
+    while not context["stop"].is_set() and time.perf_counter() < context["deadline"]:
+        seed = seeds.spawn(1)[0]
+        combination, _, _ = genetic_algorithm(
+            population_size=1000, generations=100, elite_size=50, seed=seed, objective=context["objective"],
+            allow_intermediate_negative=context["allow_intermediate_negative"],
+            enforce_positive_attrs=context["enforce_positive_attrs"], deadline=context["deadline"])
+        _offer_rescored(incumbent, combination, context, "genetic")
+
+# 可用的策略: 名称 -> 策略函数(incumbent, context)；返回 True 表示已证明 incumbent 最优
+STRATEGIES = {
+    "greedy": _run_greedy,
+    "exact": _run_exact,
+    "annealing": _run_annealing,
+    "genetic": _run_genetic,
+}
+
+def portfolio_solve(budget=0.2, strategies=None, allow_intermediate_negative=False, enforce_positive_attrs=False,
+                    objective=None, seed=None):
+    """
+    在 budget 秒内并发运行多种策略，返回截止时的最优解
+
+    Args:
+        budget (float): 时间预算（秒）
+        strategies (list, optional): 策略名称列表，默认使用 STRATEGIES 中的全部策略
+        allow_intermediate_negative (bool): 是否允许中间步骤出现负值
+        enforce_positive_attrs (bool): 是否要求最终纯增益属性不包含负数
+        objective (optional): 目标函数名称或可调用对象，见 get_objective
+        seed (int, optional): 随机种子
+
+    Returns:
+        tuple: (combination, score, attributes, report)
+            report: elapsed、optimal（精确搜索是否在预算内证明了最优）、source（找到最优解的策略）、found_at
+    """
+    start = time.perf_counter()
+    strategies = list(strategies or STRATEGIES)
+    for name in strategies:
+        if name not in STRATEGIES:
+            raise ValueError(f"未知的策略: {name}，可选: {', '.join(STRATEGIES)}")
+    incumbent = Incumbent()
+    context = {
+        "deadline": start + budget,
+        "stop": threading.Event(),
+        "seed": seed,
+        "objective": get_objective(objective),
+        "allow_intermediate_negative": allow_intermediate_negative,
+        "enforce_positive_attrs": enforce_positive_attrs,
+    }
+
+    optimal = False
+    executor = ThreadPoolExecutor(max_workers=len(strategies), thread_name_prefix="portfolio")
+    try:
+        # 每个策略在当前上下文的副本中运行，使用调用方的 Problem
+        futures = {executor.submit(contextvars.copy_context().run, STRATEGIES[name], incumbent, context): name
+                   for name in strategies}
+        pending = set(futures)
+        while pending and not optimal:
+            remaining = context["deadline"] - time.perf_counter()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    logger.error(f"策略 {futures[future]} 出错: {future.exception()}")
+                elif future.result():
+                    optimal = True
+    finally:
+        context["stop"].set()
+        executor.shutdown(wait=False)
+
+    combination, score, attributes = incumbent.snapshot()
+    report = {
+        "elapsed": time.perf_counter() - start,
+        "optimal": optimal,
+        "source": incumbent.source,
+        "found_at": incumbent.found_at,
+    }
+    logger.info(f"限时求解完成: 预算 {budget * 1000:.0f} ms, 用时 {report['elapsed'] * 1000:.0f} ms, "
+                f"得分 {score}, 来源 {incumbent.source}, 已证明最优: {optimal}")
+    return combination, score, attributes, report
@@ -0,0 +1,142 @@
+"""
+问题定义: 卡片数据、local数组和机器人数据
+
+所有算法都从当前的 Problem 读取卡片数据。当前 Problem 按以下顺序确定:
+  1. use_problem() 上下文中指定的 Problem（按线程/协程隔离）
+  2. set_problem() 设置的进程默认 Problem（进程池工作进程在初始化时设置）
+  3. 第一次使用时从 data.json 加载
+"""
+
+import contextvars
+import json
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+from utils.logger import get_logger
+
+logger = get_logger("card_optimizer")
+
+# 当前上下文中的 Problem
+_current_problem = contextvars.ContextVar("card_optimizer_problem", default=None)
+# 进程默认的 Problem
+_default_problem = None
+
+# 默认卡片数据（当无法从JSON加载时使用）
+def default_cards():
+    return [
+        {"id": 0, "duration": 40, "attributes": [-10, -10, 20, 0, 0, 0, 0, 0]},
+        {"id": 1, "duration": 60, "attributes": [15, 0, -10, 0, 0, 0, 0, 0]},
+        {"id": 2, "duration": 70, "attributes": [0, 15, -10, 0, 0, 0, 0, 0]},
+        {"id": 3, "duration": 65, "attributes": [10, 0, -30, 0, 20, 0, 0, 0]}
+    ]
+
+# 读取data.json中的 player.data，文件不存在或格式不正确时返回 None
+def load_player_data(file_path="data.json"):
+    try:
+        if os.path.exists(file_path):
+            with open(file_path, 'r') as f:
+                data = json.load(f)
+            if "player" in data and "data" in data["player"]:
+                return data["player"]["data"]
+    except Exception as e:
+        logger.error(f"加载数据时出错: {e}")
+    return None
+
+# 从data.json文件中读取卡片数据
+def load_cards_from_json(file_path="data.json"):
+    player_data = load_player_data(file_path)
+    if player_data is None or "cards" not in player_data:
+        # 如果文件不存在或格式不正确，返回默认卡片数据
+        return default_cards(), [0, 0, 0, 0, 0, 0, 0, 0]
+    return _cards_with_ids(player_data["cards"]), player_data.get("local", [0, 0, 0, 0, 0, 0, 0, 0])
+
+# 从data.json文件中读取机器人(objects)数据和能量
+def load_objects_from_json(file_path="data.json"):
+    player_data = load_player_data(file_path)
+    if player_data is None:
+        return [], 0
+    return player_data.get("objects", []), player_data.get("energy", 0)
+
+# 为每张卡片添加ID
+def _cards_with_ids(cards_data):
+    return [{"id": i, "duration": card["duration"], "attributes": card["attributes"]} for i, card in enumerate(cards_data)]
+
+class Problem:
+    """
+    一个玩家的优化问题: 卡片属性表、运行时长、local数组，以及机器人和能量
+
+    Problem 创建后视为不可变，需要修改卡片属性时使用 with_attributes() 生成新的 Problem。
+    Problem 可以被pickle，用于传给进程池中的工作进程。
+    """
+
+    def __init__(self, cards, local=None, objects=None, energy=0):
+        self.cards = cards
+        self.card_attributes = np.array([card["attributes"] for card in cards])
+        self.card_durations = np.array([card["duration"] for card in cards])
+        self.local_attributes = np.array(local if local is not None else [0] * self.card_attributes.shape[1])
+        self.objects = objects or []
+        self.energy = energy
+        self._fingerprint = None
+
+    @classmethod
+    def from_data(cls, player_data):
+        """根据 player.data 创建，缺少卡片时使用默认卡片数据"""
+        if not player_data or "cards" not in player_data:
+            return cls(default_cards(), [0, 0, 0, 0, 0, 0, 0, 0])
+        return cls(_cards_with_ids(player_data["cards"]), player_data.get("local", [0, 0, 0, 0, 0, 0, 0, 0]),
+                   player_data.get("objects", []), player_data.get("energy", 0))
+
+    @classmethod
+    def from_json(cls, file_path="data.json"):
+        """从data.json文件加载"""
+        return cls.from_data(load_player_data(file_path))
+
+    def with_attributes(self, card_attributes):
+        """返回卡片属性表被替换后的新 Problem，其余数据共用"""
+        problem = object.__new__(Problem)
+        problem.__dict__.update(self.__dict__)
+        problem.card_attributes = np.asarray(card_attributes)
+        problem._fingerprint = None
+        return problem
+
+    @property
+    def fingerprint(self):
+        """卡片属性、时长和local的内容指纹，用于判断缓存的得分是否仍然有效"""
+        if self._fingerprint is None:
+            self._fingerprint = (self.card_attributes.shape, self.card_attributes.tobytes(),
+                                 self.card_durations.tobytes(), self.local_attributes.tobytes())
+        return self._fingerprint
+
+    def __len__(self):
+        return len(self.card_attributes)
+
+def get_problem():
+    """返回当前的 Problem，第一次使用且没有指定时从data.json加载"""
+    global _default_problem
+    problem = _current_problem.get()
+    if problem is not None:
+        return problem
+    if _default_problem is None:
+        _default_problem = Problem.from_json()
+        logger.debug(f"加载卡片数据: {len(_default_problem)}张, Local数组: {_default_problem.local_attributes}")
+    return _default_problem
+
+def set_problem(problem):
+    """设置进程默认的 Problem"""
+    global _default_problem
+    _default_problem = problem
+
+def init_worker(problem):
+    """进程池工作进程的 initializer: 使用主进程的 Problem，避免工作进程重新加载data.json"""
+    set_problem(problem)
+
+@contextmanager
+def use_problem(problem):
+    """在上下文中使用指定的 Problem，只影响当前线程/协程"""
+    token = _current_problem.set(problem)
+    try:
+        yield problem
+    finally:
+        _current_problem.reset(token)
@@ -0,0 +1,145 @@
+"""
+卡片约简: 搜索前合并相同的卡片并移除被支配的卡片
+
+两张卡片在当前目标函数下等价时（属性相同，目标函数与时长有关时时长也相同）只保留一张；
+卡片 i 被卡片 j 支配，是指 j 的每个属性都不小于 i，并且按目标函数的要求时长不更长（或相同）。
+把组合中的 i 换成 j 后每一步的累积属性都不会变小，因此所有约束仍然满足，得分也不会降低，
+最优解一定可以只用未被支配的卡片构成。约简只保证最优解不变: 前K个解中只用被支配卡片才能构成的次优解会被去掉。
+
+约简后的 Problem 中每张卡片的 id 为原卡片编号，CardReduction.expand() 把约简后的组合映射回原卡片编号。
+"""
+
+import math
+
+import numpy as np
+
+from utils.logger import get_logger
+from card_optimizer.objectives import RateObjective, SumObjective, WeightedObjective, get_objective
+from card_optimizer.problem import Problem, get_problem
+
+logger = get_logger("card_optimizer")
+
+# 每次比较的卡片行数，限制支配判断的内存占用
+_DOMINANCE_CHUNK = 256
+
+# 目标函数允许的支配关系:
+#   "attributes"      属性逐项不小于即可，与时长无关
+#   "duration"        还要求时长不更长
+#   "equal_duration"  还要求时长相同
+#   None              不能判断支配，只合并属性和时长都相同的卡片
+def dominance_mode(objective):
+    if isinstance(objective, SumObjective):
+        return "attributes"
+    if isinstance(objective, WeightedObjective):
+        if np.any(objective.weights < 0) or objective.duration_weight < 0:
+            return None
+        return "duration" if objective.duration_weight else "attributes"
+    if isinstance(objective, RateObjective):
+        return "equal_duration"
+    return "equal_duration" if getattr(objective, "monotone", False) else None
+
+class CardReduction:
+    """
+    约简结果
+
+    Attributes:
+        cards: 约简后卡片编号 -> 原卡片编号（等价类的代表）
+        classes: 每张约简后卡片对应的原卡片编号列表（等价类）
+        dominated: 被移除的原卡片编号 -> 支配它的原卡片编号
+        mode: 使用的支配关系，见 dominance_mode
+        report: 约简前后的卡片数量和搜索空间大小
+    """
+
+    def __init__(self, cards, classes, dominated, mode, report):
+        self.cards = cards
+        self.classes = classes
+        self.dominated = dominated
+        self.mode = mode
+        self.report = report
+
+    def expand(self, combination):
+        """把约简后的组合映射回原卡片编号"""
+        return [int(self.cards[card]) for card in combination]
+
+    def expand_solutions(self, solutions):
+        """把 [(combination, score, attrs), ...] 中的组合映射回原卡片编号"""
+        return [(self.expand(combination), score, attrs) for combination, score, attrs in solutions]
+
+# 返回被其他卡片支配的卡片；table 的每一行互不相同
+def _dominated_rows(attributes, durations, mode):
+    dominated = np.full(len(attributes), -1, dtype=np.intp)
+    for start in range(0, len(attributes), _DOMINANCE_CHUNK):
+        rows = slice(start, start + _DOMINANCE_CHUNK)
+        # better[i, j]: 卡片 j 不比卡片 i 差
+        better = np.all(attributes[None, :, :] >= attributes[rows, None, :], axis=2)
+        if mode == "duration":
+            better &= durations[None, :] <= durations[rows, None]
+        elif mode == "equal_duration":
+            better &= durations[None, :] == durations[rows, None]
+        better[np.arange(better.shape[0]), np.arange(start, start + better.shape[0])] = False
+        has_better = better.any(axis=1)
+        dominated[start:start + better.shape[0]] = np.where(has_better, np.argmax(better, axis=1), -1)
+    return dominated
+
+def reduce_cards(objective=None, dominance=True, length=8):
+    """
+    约简当前 Problem 的卡片
+
+    Args:
+        objective (optional): 搜索将使用的目标函数，决定哪些卡片可以合并或移除，见 dominance_mode
+        dominance (bool): 是否移除被支配的卡片；为 False 时只合并相同的卡片
+        length (int): 组合长度，只用于报告搜索空间大小
+
+    Returns:
+        tuple: (problem, reduction)；problem 为约简后的 Problem，在其上搜索后用 reduction.expand() 映射回原卡片编号
+    """
+    problem = get_problem()
+    objective = get_objective(objective)
+    mode = dominance_mode(objective)
+    attributes, durations = problem.card_attributes, problem.card_durations
+
+    # 等价类: 与时长无关的目标函数只按属性合并
+    keys = attributes if mode == "attributes" else np.column_stack([attributes, durations])
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    order = np.argsort(first)  # 等价类按其第一张卡片的编号排序
+    representatives = first[order]
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    classes = [[] for _ in representatives]
+    for card, group in enumerate(rank[inverse]):
+        classes[group].append(card)
+
+    dominated = {}
+    keep = np.ones(len(representatives), dtype=bool)
+    if dominance and mode is not None:
+        dominating = _dominated_rows(attributes[representatives], durations[representatives], mode)
+        keep = dominating < 0
+        for group in np.flatnonzero(~keep):
+            # 沿支配链找到一个未被移除的卡片，方便查看
+            target = dominating[group]
+            while dominating[target] >= 0:
+                target = dominating[target]
+            for card in classes[group]:
+                dominated[card] = int(representatives[target])
+
+    kept = representatives[keep]
+    cards = [{"id": problem.cards[card].get("id", int(card)), "duration": durations[card].item(),
+              "attributes": attributes[card].tolist()} for card in kept]
+    reduced = Problem(cards, problem.local_attributes, problem.objects, problem.energy)
+
+    num_cards, num_kept = len(problem), len(kept)
+    report = {
+        "cards": num_cards,
+        "distinct": len(representatives),
+        "kept": num_kept,
+        "dominated": len(dominated),
+        "sequences_before": num_cards ** length,
+        "sequences_after": num_kept ** length,
+        "multisets_before": math.comb(num_cards + length - 1, length),
+        "multisets_after": math.comb(num_kept + length - 1, length),
+    }
+    report["shrink"] = report["sequences_before"] / max(report["sequences_after"], 1)
+    logger.info(f"卡片约简: {num_cards} 张 -> {len(representatives)} 种不同的卡片 -> {num_kept} 张未被支配, "
+                f"有序组合数缩小 {report['shrink']:.3g} 倍, 多重集数 {report['multisets_before']} -> {report['multisets_after']}")
+    return reduced, CardReduction(kept, [classes[group] for group in np.flatnonzero(keep)], dominated, mode, report)
@@ -0,0 +1,59 @@
+"""
+机器人修正
+
+与用户脚本 processObjectsAndCards 一致:
+  attributes[1] 为速度，按 speed.py 缩短每张卡片的运行时长
+  attributes[2] > 0 时，卡片的每个负属性都加上该值抵消（最多抵消到0）
+  attributes[3] > 0 时，抵消后的每个正属性增加 floor(log2(attributes[3] + 1))
+"""
+
+import math
+from contextlib import contextmanager
+
+import numpy as np
+
+from card_optimizer.objectives import SECONDS_PER_DAY, robot_card_durations
+from card_optimizer.problem import get_problem, use_problem
+
+# 读取机器人属性中的某一项，缺失时为0
+def robot_attribute(robot_attributes, index):
+    robot_attributes = robot_attributes or []
+    return robot_attributes[index] if len(robot_attributes) > index else 0
+
+# 对卡片属性表应用机器人的负数抵消和log2增益
+def apply_robot_modifiers(attributes, robot_attributes):
+    table = np.array(attributes)
+    offset = robot_attribute(robot_attributes, 2)
+    if offset > 0:
+        table = np.where(table < 0, np.minimum(0, table + offset), table)
+    bonus_level = robot_attribute(robot_attributes, 3)
+    if bonus_level > 0:
+        table = np.where(table > 0, table + math.floor(math.log2(bonus_level + 1)), table)
+    return table
+
+# 计算机器人修正后的卡片属性表
+def robot_card_attributes(robot_attributes):
+    return apply_robot_modifiers(get_problem().card_attributes, robot_attributes)
+
+# 在上下文中使用机器人修正后的卡片属性表；修正只在进入时计算一次，评估每个组合时没有额外开销
+@contextmanager
+def robot_modifiers(robot_attributes):
+    problem = get_problem()
+    with use_problem(problem.with_attributes(robot_card_attributes(robot_attributes))) as modified:
+        yield modified.card_attributes
+
+# 按用户脚本的方式汇总一个机器人当前卡片组合的运行数据
+def summarize_robot(robot_index, robot):
+    robot_attributes = robot.get("attributes") or []
+    sequence = np.asarray(robot.get("cards") or [], dtype=np.intp)
+    total_duration = float(robot_card_durations(robot_attribute(robot_attributes, 1))[sequence].sum())
+    cumulative = robot_card_attributes(robot_attributes)[sequence].sum(axis=0)
+    runs_per_day = math.floor(SECONDS_PER_DAY / total_duration) if total_duration > 0 else 0
+    return {
+        "index": robot_index,
+        "totalDuration": total_duration,
+        "cumulativeAttributes": [int(round(value)) for value in cumulative],
+        "energyPerRun": robot_index + 1,
+        "runsPerDay": runs_per_day,
+        "dailyEnergyConsumption": math.floor((robot_index + 1) * (SECONDS_PER_DAY / total_duration)) if total_duration > 0 else 0,
+    }
@@ -0,0 +1,716 @@
+"""
+搜索算法: 遗传算法、模拟退火、贪心算法和精确搜索
+"""
+
+import heapq
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from utils.logger import get_logger
+from utils.trace import SearchInstrumentation, SearchProgress, phase, profiled, trace_enabled
+from card_optimizer.evaluation import (IncrementalEvaluator, compute_prefixes, evaluate_batch, recompute_prefixes,
+                                       score_prefixes)
+from card_optimizer.objectives import get_objective
+from card_optimizer.problem import get_problem, init_worker
+from card_optimizer.topk import TopK
+
+logger = get_logger("card_optimizer")
+
+# 批量生成随机卡片组合
+def random_combinations(rng, count, length=8):
+    return rng.integers(0, len(get_problem()), size=(count, length))
+
+# 随机生成一批组合，返回其中第一个有效的组合
+def random_valid_solution(rng, attempts, allow_intermediate_negative=False, enforce_positive_attrs=False, objective=None,
+                          cache=None):
+    candidates = random_combinations(rng, attempts)
+    if cache is None:
+        scores, attrs, _ = evaluate_batch(candidates, allow_intermediate_negative, enforce_positive_attrs, objective)
+    else:
+        scores, attrs = cache.evaluate(candidates, allow_intermediate_negative, enforce_positive_attrs, objective)
+    valid = np.flatnonzero(scores != float('-inf'))
+    if len(valid) == 0:
+        return None, float('-inf'), None
+    index = valid[0]
+    return candidates[index].copy(), scores[index], attrs[index].copy()
+
+# 批量生成邻居的修改: 每个邻居随机修改1-2个位置，返回形状均为 (count, 2) 的 (positions, new_cards)
+def generate_moves(rng, count, length=8):
+    num_cards = len(get_problem())
+    card_range = min(6, num_cards)  # 避免索引越界
+    positions = rng.integers(0, length, size=(count, 2))
+    # 优先考虑得分高的卡片: 70%概率选择前半部分卡片
+    new_cards = np.where(rng.random((count, 2)) < 0.7,
+                         rng.integers(0, card_range, size=(count, 2)),
+                         rng.integers(0, num_cards, size=(count, 2)))
+    # 只修改一个位置的邻居（一半）让第二次修改与第一次相同，不产生额外变化
+    single = rng.random(count) < 0.5
+    positions[single, 1] = positions[single, 0]
+    new_cards[single, 1] = new_cards[single, 0]
+    return positions, new_cards
+
+# 约束违反量: 每一步（允许中间负值时只看最终）累积属性中负值的绝对值之和，
+# 要求最终属性非负时再加上纯增益属性中的负值
+def constraint_violation(prefix, allow_intermediate_negative=False, enforce_positive_attrs=False):
+    checked = prefix[:, -1:] if allow_intermediate_negative else prefix
+    violation = -np.minimum(checked, 0).sum(axis=(1, 2))
+    if enforce_positive_attrs:
+        violation = violation - np.minimum(prefix[:, -1] - get_problem().local_attributes, 0).sum(axis=1)
+    return violation
+
+# 锦标赛选择: 一次性为 count 个子代各抽取 size 个参赛者，返回每场适应度最高者的行号
+def tournament_select(rng, fitness, count, size=3):
+    contenders = rng.integers(0, len(fitness), size=(count, size))
+    return contenders[np.arange(count), np.argmax(fitness[contenders], axis=1)]
+
+# 交叉: one_point 为单点交叉（交叉点之后取父代2），uniform 为逐位置等概率取两个父代
+def crossover(rng, parents1, parents2, method="one_point"):
+    count, length = parents1.shape
+    if method == "one_point":
+        from_second = np.arange(length) >= rng.integers(1, length, size=count)[:, None]
+    elif method == "uniform":
+        from_second = rng.random((count, length)) < 0.5
+    else:
+        raise ValueError(f"未知的交叉方式: {method}，可选: one_point, uniform")
+    return np.where(from_second, parents2, parents1)
+
+# 变异: 每个位置以 mutation_rate 的概率换成随机卡片
+def mutate(rng, children, mutation_rate, num_cards):
+    mask = rng.random(children.shape) < mutation_rate
+    return np.where(mask, rng.integers(0, num_cards, size=children.shape), children)
+
+# 使用遗传算法生成卡片组合
+@profiled
+def genetic_algorithm(population_size=100, generations=50, mutation_rate=0.1, elite_size=10, seed=None, objective=None, cache=None,
+                      tournament_size=3, crossover_method="one_point", infeasible="penalty", penalty=10.0,
+                      allow_intermediate_negative=False, enforce_positive_attrs=False, deadline=None, instrument=None):
+    """
+    数组化的遗传算法: 种群为一个 (P, L) 的整数数组，选择、交叉、变异都是整批的向量化操作
+
+    不满足约束的个体不会导致整个种群重新初始化:
+      - penalty: 适应度为目标值减去 penalty * 约束违反量，仍可参与选择
+      - repair: 把第一次出现负值的位置（只有最终属性为负时为随机位置）换成随机卡片后重新评估一次，
+        仍不满足约束的个体再按 penalty 处理
+
+    Args:
+        population_size (int): 种群大小
+        generations (int): 进化代数
+        mutation_rate (float): 每个位置的变异概率
+        elite_size (int): 直接保留到下一代的精英数量
+        seed (int, optional): 随机种子
+        objective (optional): 目标函数名称或可调用对象，见 get_objective
+        cache (ScoreCache, optional): 得分缓存，精英个体和重复出现的个体不再调用目标函数，可以与其他算法共用。
+            使用内置目标函数时查缓存与重新计算的开销相当，目标函数代价较高（例如逐行计算的自定义函数）时收益明显
+        tournament_size (int): 锦标赛选择每场的参赛个体数
+        crossover_method (str): "one_point" 或 "uniform"
+        infeasible (str): 不可行个体的处理方式，"penalty" 或 "repair"
+        penalty (float): 每单位约束违反量的惩罚
+        allow_intermediate_negative (bool): 是否允许中间步骤出现负值
+        enforce_positive_attrs (bool): 是否要求最终纯增益属性不包含负数
+        deadline (float, optional): time.perf_counter() 的截止时间，到达后不再进化下一代
+        instrument (SearchInstrumentation, optional): 搜索统计，记录计数、各阶段（initialize、evaluate、repair、
+            reproduce）用时和收敛轨迹；必须以关键字参数传入
+
+    Returns:
+        tuple: (best_combination, best_score, best_attributes)，没有找到可行解时为 (None, -inf, None)
+    """
+    if infeasible not in ("penalty", "repair"):
+        raise ValueError(f"未知的不可行个体处理方式: {infeasible}，可选: penalty, repair")
+    rng = np.random.default_rng(seed)
+    objective = get_objective(objective)
+    num_cards = len(get_problem())
+    elite_size = min(elite_size, population_size)
+    
+    # 评估一批个体，返回可行个体的得分（不可行为 -inf）、纯增益属性和用于选择的适应度
+    def evaluate(population, prefix):
+        if cache is None:
+            scores, attrs, _ = score_prefixes(prefix, population, allow_intermediate_negative, enforce_positive_attrs, objective)
+        else:
+            # 精英个体在每一代都会重复出现，通过共享缓存避免重复调用目标函数；未命中的个体仍用已有的累积属性计算
+            scores, attrs = cache.evaluate(population, allow_intermediate_negative, enforce_positive_attrs, objective,
+                                           compute=lambda rows: score_prefixes(prefix[rows], population[rows],
+                                                                               allow_intermediate_negative,
+                                                                               enforce_positive_attrs, objective)[:2])
+        fitness = scores.copy()
+        infeasible_rows = np.flatnonzero(scores == float('-inf'))
+        if len(infeasible_rows):
+            raw = objective(attrs[infeasible_rows], population[infeasible_rows])
+            violation = constraint_violation(prefix[infeasible_rows], allow_intermediate_negative, enforce_positive_attrs)
+            fitness[infeasible_rows] = raw - penalty * violation
+        return scores, attrs, fitness
+    
+    # 修复不可行个体: 只修改一个位置，然后从该位置开始重算累积属性
+    def repair(population, prefix, scores):
+        rows = np.flatnonzero(scores == float('-inf'))
+        if len(rows) == 0:
+            return population, prefix, 0
+        length = population.shape[1]
+        positions = rng.integers(0, length, size=len(rows))
+        if not allow_intermediate_negative:
+            negative_steps = np.any(prefix[rows] < 0, axis=2)
+            has_negative = negative_steps.any(axis=1)
+            positions[has_negative] = np.argmax(negative_steps[has_negative], axis=1)
+        population = population.copy()
+        population[rows, positions] = rng.integers(0, num_cards, size=len(rows))
+        starts = np.full(len(population), length)
+        starts[rows] = positions
+        return population, recompute_prefixes(population, prefix, starts), len(rows)
+    
+    progress = SearchProgress("genetic_algorithm", logger, instrument=instrument)
+    cache_hits = cache.hits if cache is not None else 0
+    
+    # 初始化种群: 每行是一个卡片组合
+    with phase(instrument, "initialize"):
+        population = random_combinations(rng, population_size)
+        # 种群中每个个体每一步的累积属性；子代沿用父代1的缓存，只从第一个与父代1不同的位置开始重算
+        prefix = compute_prefixes(population)
+    
+    # 记录最佳组合
+    best_combination = None
+    best_score = float('-inf')
+    best_attributes = None
+    trace = trace_enabled(logger)
+    
+    # 进化多代
+    for generation in range(generations):
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        # 一次性评估整个种群
+        with phase(instrument, "evaluate"):
+            scores, attrs, fitness = evaluate(population, prefix)
+        evaluated = len(population)
+        if infeasible == "repair":
+            with phase(instrument, "repair"):
+                population, prefix, repaired = repair(population, prefix, scores)
+                if repaired:
+                    scores, attrs, fitness = evaluate(population, prefix)
+                    evaluated += repaired
+        
+        # 更新最佳组合
+        best_row = int(np.argmax(scores))
+        if scores[best_row] > best_score:
+            best_combination = population[best_row].tolist()
+            best_score = scores[best_row]
+            best_attributes = attrs[best_row].copy()
+            if trace:
+                logger.debug(f"第 {generation} 代: 找到新的最佳组合 {best_combination}, 得分: {best_score}")
+        progress.update(candidates=evaluated, best_score=best_score,
+                        infeasible=int(np.count_nonzero(scores == float('-inf'))))
+        
+        with phase(instrument, "reproduce"):
+            # 选择精英个体，精英直接沿用缓存的累积属性
+            elite_rows = np.argpartition(-fitness, elite_size - 1)[:elite_size] if elite_size else np.empty(0, dtype=np.intp)
+            
+            # 锦标赛选择父代，交叉和变异一次生成全部子代
+            child_count = population_size - elite_size
+            parent1_rows = tournament_select(rng, fitness, child_count, tournament_size)
+            parent2_rows = tournament_select(rng, fitness, child_count, tournament_size)
+            children = crossover(rng, population[parent1_rows], population[parent2_rows], crossover_method)
+            children = mutate(rng, children, mutation_rate, num_cards)
+            
+            # 子代从第一个与父代1不同的位置开始重算累积属性
+            differs = children != population[parent1_rows]
+            starts = np.where(differs.any(axis=1), np.argmax(differs, axis=1), population.shape[1])
+            
+            # 更新种群，并增量更新累积属性
+            parent_rows = np.concatenate((elite_rows, parent1_rows))
+            population = np.concatenate((population[elite_rows], children))
+            prefix = recompute_prefixes(population, prefix[parent_rows],
+                                        np.concatenate((np.full(len(elite_rows), population.shape[1]), starts)))
+    
+    if cache is not None:
+        progress.update(cache_hits=cache.hits - cache_hits)
+    progress.finish()
+    if best_score == float('-inf'):
+        return None, float('-inf'), None
+    return best_combination, best_score, best_attributes
+
+# 模拟退火的单次运行，使用独立的随机数生成器，可在进程池中并行执行
+# 顺序运行时共享调用方的进度统计；在进程池中则使用自己的统计，并把计数返回给主进程合并
+# deadline 为 time.perf_counter() 的截止时间，到达后提前结束并返回当前运行的最佳解
+# initial 为初始解（例如上一次的最优解），无效或未指定时随机生成
+# 进程池中的 instrument 只需为真值，每次运行创建自己的统计，阶段用时随计数返回
+def _annealing_run(run, seed, initial_temp, cooling_rate, iterations, allow_intermediate_negative, enforce_positive_attrs, neighborhood_size, objective, cache=None, progress=None, deadline=None, initial=None, instrument=None):
+    rng = np.random.default_rng(seed)
+    own_progress = progress is None
+    if own_progress:
+        if instrument is not None:
+            instrument = SearchInstrumentation(convergence=False)
+        progress = SearchProgress("simulated_annealing", logger, instrument=instrument)
+    
+    # 运行结束时返回给主进程的计数
+    def run_counters():
+        if not own_progress:
+            return None
+        counters = progress.counters()
+        if instrument is not None:
+            counters["phases"] = instrument.phase_totals()
+        return counters
+    
+    with phase(instrument, "initialize"):
+        current_score = float('-inf')
+        if initial is not None:
+            current_solution = np.asarray(initial, dtype=np.intp)
+            if cache is None:
+                scores, attrs, _ = evaluate_batch(current_solution[None, :], allow_intermediate_negative,
+                                                  enforce_positive_attrs, objective)
+            else:
+                scores, attrs = cache.evaluate(current_solution[None, :], allow_intermediate_negative,
+                                               enforce_positive_attrs, objective)
+            current_score, current_attrs = scores[0], attrs[0]
+        if current_score == float('-inf'):
+            # 初始化一个随机解，一次生成一批候选并取第一个有效的
+            current_solution, current_score, current_attrs = random_valid_solution(
+                rng, 100, allow_intermediate_negative, enforce_positive_attrs, objective, cache)
+        if current_score == float('-inf') and enforce_positive_attrs:
+            # 找不到最终属性非负的初始解时，先从只满足前缀约束的解出发，由邻居或重启找到可行解
+            current_solution, _, current_attrs = random_valid_solution(rng, 100, allow_intermediate_negative,
+                                                                       objective=objective, cache=cache)
+    
+    # 如果无法找到有效的初始解，跳过此次运行
+    if current_solution is None:
+        progress.update(candidates=100, infeasible=100)
+        return run, None, float('-inf'), None, run_counters()
+    
+    # 记录当前运行的最佳解，只从满足约束的状态开始记录
+    if current_score != float('-inf'):
+        best_solution, best_score, best_attrs = current_solution.copy(), current_score, current_attrs.copy()
+    else:
+        best_solution, best_score, best_attrs = None, float('-inf'), None
+    
+    # 增量评估器缓存当前解每一步的累积属性
+    evaluator = IncrementalEvaluator(current_solution, allow_intermediate_negative, enforce_positive_attrs, objective)
+    
+    # 当前温度
+    temp = initial_temp
+    
+    # 无改进计数器
+    no_improvement = 0
+    max_no_improvement = iterations // 10  # 如果1/10的迭代都没有改进，重新开始
+    
+    # 模拟退火过程；只在整个循环外计时，单次迭代中的阶段计时相对迭代本身开销过大
+    anneal_start = time.perf_counter()
+    for i in range(iterations):
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        # 批量生成一个邻域 - 每个邻居修改1-2个位置，并基于当前解的缓存增量评估
+        positions, new_cards = generate_moves(rng, neighborhood_size, len(current_solution))
+        neighbor_scores, neighbor_attrs = evaluator.evaluate_moves(positions, new_cards)
+        
+        # 取邻域中得分最高的邻居作为候选
+        best_neighbor = int(np.argmax(neighbor_scores))
+        neighbor_score = neighbor_scores[best_neighbor]
+        accepted = 0
+        
+        # 如果邻居解更好或满足概率接受条件，则接受新解
+        if neighbor_score != float('-inf'):
+            # 计算接受概率 - 温度越高，越容易接受较差的解
+            delta = neighbor_score - current_score
+            acceptance_probability = 1.0 if delta > 0 else np.exp(delta / temp)
+            
+            if delta > 0 or rng.random() < acceptance_probability:
+                accepted = 1
+                evaluator.accept(best_neighbor, neighbor_score)
+                current_solution = evaluator.solution
+                current_score = neighbor_score
+                current_attrs = neighbor_attrs[best_neighbor]
+                
+                # 更新最佳解
+                if current_score > best_score:
+                    best_solution = current_solution.copy()
+                    best_score = current_score
+                    best_attrs = current_attrs.copy()
+                    no_improvement = 0  # 重置无改进计数器
+                else:
+                    no_improvement += 1
+            else:
+                no_improvement += 1
+        else:
+            no_improvement += 1
+        
+        # 检查是否需要降温
+        if i % 100 == 0:  # 每100次迭代降温一次
+            temp *= cooling_rate
+            if temp < 0.1:  # 最低温度限制
+                temp = 0.1
+        
+        if instrument is None:
+            progress.update(candidates=neighborhood_size, proposed=1, accepted=accepted, best_score=best_score)
+        else:
+            progress.update(candidates=neighborhood_size, proposed=1, accepted=accepted, best_score=best_score,
+                            infeasible=int(np.count_nonzero(neighbor_scores == float('-inf'))))
+        
+        # 如果长时间没有改进，考虑重启
+        if no_improvement >= max_no_improvement:
+            restart_start = time.perf_counter()
+            progress.update(restarts=1)
+            if trace_enabled(logger):
+                logger.debug(f"运行 {run+1}: 无改进重启")
+            # 重新初始化解，但保持一定概率使用当前最佳解
+            if best_solution is not None and rng.random() < 0.3:  # 30%概率使用当前最佳解
+                evaluator.reset(best_solution)
+                current_score = best_score
+                current_attrs = best_attrs.copy()
+            else:  # 70%概率随机生成新解
+                restart_solution, restart_score, restart_attrs = random_valid_solution(
+                    rng, 50, allow_intermediate_negative, enforce_positive_attrs, objective, cache)
+                # 确保新解有效，否则保留当前解
+                if restart_score != float('-inf'):
+                    evaluator.reset(restart_solution)
+                    current_score, current_attrs = restart_score, restart_attrs
+            
+            # 重置温度和无改进计数器
+            temp = initial_temp * 0.5  # 重启时使用较低的初始温度
+            no_improvement = 0
+            if instrument is not None:
+                instrument.add_time("restart", time.perf_counter() - restart_start)
+        
+        # 降温 - 使用非线性降温策略
+        temp *= cooling_rate
+        
+        # 防止温度过低
+        if temp < 0.01:
+            temp = 0.01
+    if instrument is not None:
+        instrument.add_time("anneal", time.perf_counter() - anneal_start)
+    
+    if best_solution is None:
+        return run, None, float('-inf'), None, run_counters()
+    return run, best_solution.tolist(), best_score, best_attrs, run_counters()
+
+# 使用模拟退火算法生成卡片组合
+@profiled
+def simulated_annealing(initial_temp=500, cooling_rate=0.97, iterations=5000, num_runs=100, allow_intermediate_negative=True, max_solutions=5, enforce_positive_attrs=True, neighborhood_size=32, seed=None, workers=None, objective=None, cache=None, min_distance=0, instrument=None):
+    """
+    多次独立运行模拟退火并合并结果
+
+    每次运行从 SeedSequence(seed) 派生独立的随机数种子，因此固定 seed 时结果与 workers 数量无关。
+
+    Args:
+        seed (int, optional): 随机种子，None 表示每次调用结果不同
+        workers (int, optional): 并行进程数，None 或 1 表示在当前进程中顺序运行
+        objective (optional): 目标函数名称或可调用对象，见 get_objective
+        cache (ScoreCache, optional): 得分缓存，只在顺序运行时用于随机初始解和重启（邻域由增量评估器计算，不经过缓存）；
+            并行运行时工作进程不共享缓存，传入的缓存被忽略
+        min_distance (int): 返回的解之间的最小汉明距离，见 TopK
+        instrument (SearchInstrumentation, optional): 搜索统计，记录计数、各阶段（initialize、anneal、restart、merge）
+            用时和收敛轨迹；必须以关键字参数传入。并行时各运行的阶段用时累加，收敛轨迹在按运行顺序合并时记录，
+            性能分析只覆盖主进程
+    """
+    objective = get_objective(objective)
+    # 只保留得分最高的 max_solutions 个不同的解
+    top_solutions = TopK(max_solutions, min_distance)
+    logger.info(f"开始模拟退火算法: 初始温度={initial_temp}, 冷却率={cooling_rate}, 迭代次数={iterations}, 运行次数={num_runs}, 邻域大小={neighborhood_size}, 进程数={workers or 1}")
+    
+    run_seeds = np.random.SeedSequence(seed).spawn(num_runs)
+    run_annealing = partial(_annealing_run, initial_temp=initial_temp, cooling_rate=cooling_rate, iterations=iterations,
+                            allow_intermediate_negative=allow_intermediate_negative,
+                            enforce_positive_attrs=enforce_positive_attrs, neighborhood_size=neighborhood_size,
+                            objective=objective)
+    
+    progress = SearchProgress("simulated_annealing", logger, instrument=instrument)
+    
+    # 多次运行取最佳结果
+    if workers is None or workers <= 1:
+        cache_hits = cache.hits if cache is not None else 0
+        run_results = [run_annealing(run, run_seed, cache=cache, progress=progress, instrument=instrument)
+                       for run, run_seed in enumerate(run_seeds)]
+        if cache is not None:
+            progress.update(cache_hits=cache.hits - cache_hits)
+    else:
+        if cache is not None:
+            logger.warning(f"模拟退火在 {workers} 个进程中并行运行，工作进程不共享得分缓存，已忽略传入的缓存")
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(get_problem(),)) as executor:
+            chunksize = max(1, num_runs // (workers * 4))
+            run_results = list(executor.map(partial(run_annealing, instrument=True if instrument is not None else None),
+                                            range(num_runs), run_seeds, chunksize=chunksize))
+    
+    # 按运行顺序合并，保证结果与进程数无关
+    trace = trace_enabled(logger)
+    merge_start = time.perf_counter()
+    for run, best_solution, best_score, best_attrs, run_counters in run_results:
+        if run_counters is not None:
+            progress.merge(run_counters)
+        if best_solution is None:
+            continue
+        
+        # 将当前运行的最佳解添加到解集中
+        if best_score > 0:
+            # 如果要求最终属性不包含负数，则检查
+            if enforce_positive_attrs and any(best_attrs < 0):
+                logger.warning(f"第 {run+1} 次运行找到的解包含负数属性，已忽略: {best_solution}, 得分: {best_score}")
+            elif top_solutions.offer(best_solution, best_score, best_attrs) and trace:
+                logger.debug(f"第 {run+1} 次运行找到新的解: {best_solution}, 得分: {best_score}")
+    if instrument is not None:
+        instrument.add_time("merge", time.perf_counter() - merge_start)
+    
+    progress.finish()
+    
+    top_solutions = top_solutions.results()
+    if enforce_positive_attrs:
+        if top_solutions:
+            logger.info(f"共保留 {len(top_solutions)} 个无负数属性的解")
+        else:
+            logger.warning("未找到无负数属性的解")
+    
+    # 如果没有找到解，返回空列表
+    if not top_solutions:
+        return None, float('-inf'), None, []
+    
+    # 返回最佳解和所有解的列表
+    best_solution, best_score, best_attrs = top_solutions[0]
+    return best_solution, best_score, best_attrs, top_solutions
+
+# 使用贪心算法生成卡片组合
+def greedy_algorithm():
+    problem = get_problem()
+    card_attributes, num_cards = problem.card_attributes, len(problem)
+    best_combination = None
+    best_score = float('-inf')
+    best_attrs = None
+    progress = SearchProgress("greedy_algorithm", logger)
+    
+    # 尝试每种卡片作为起始卡片
+    for first_card in range(num_cards):
+        progress.update(candidates=1)
+        combination = [first_card]
+        total_attrs = card_attributes[first_card].copy()
+        
+        # 如果起始卡片就有负属性，跳过
+        if np.any(total_attrs < 0):
+            continue
+        
+        # 贪心选择接下来的7张卡
+        for _ in range(7):
+            progress.update(candidates=num_cards)
+            best_next_card = None
+            best_next_score = float('-inf')
+            best_next_attrs = None
+            
+            # 尝试每种卡片
+            for next_card in range(num_cards):
+                next_attrs = total_attrs + card_attributes[next_card]
+                
+                # 检查是否有效
+                if np.any(next_attrs < 0):
+                    continue
+                
+                # 计算得分
+                next_score = np.sum(next_attrs)
+                
+                # 如果得分更高，更新最佳下一张卡
+                if next_score > best_next_score:
+                    best_next_card = next_card
+                    best_next_score = next_score
+                    best_next_attrs = next_attrs.copy()
+            
+            # 如果找到有效的卡片，添加到组合中
+            if best_next_card is not None:
+                combination.append(best_next_card)
+                total_attrs = best_next_attrs
+            else:
+                # 如果没有找到有效的下一张卡片，放弃当前组合
+                break
+        
+        # 如果组合完整（8张卡片），检查是否是最佳组合
+        if len(combination) == 8:
+            score = np.sum(total_attrs)
+            if score > best_score:
+                best_combination = combination
+                best_score = score
+                best_attrs = total_attrs
+                progress.update(best_score=score)
+    
+    progress.finish()
+    return best_combination, best_score, best_attrs
+
+# 精确搜索: 在前缀状态上做分支定界，返回真正的前K个最优组合
+def exact_search(top_k=10, length=8, allow_intermediate_negative=False, enforce_positive_attrs=False, time_limit=None, memo_size=4096, objective=None,
+                 incumbent=None, store=None):
+    """
+    分支定界精确搜索
+
+    可加目标函数的得分是各卡片贡献之和，因此只与组合中各卡片的数量（多重集）有关，顺序只影响前缀非负约束。
+    搜索按得分从高到低扩展前缀，并使用以下剪枝:
+      - 上界剪枝: 当前纯增益 + 剩余步数 * 单步最大增益 不超过第K名得分时剪掉
+      - 可行性剪枝: 即使剩余每步都取该属性的最大增量也无法让最终属性回到下限时剪掉
+      - 重复剪枝: 同一深度上相同多重集的前缀累积属性完全相同，只需展开一次
+      - 支配剪枝: 同一深度上已有至少K个不同多重集的累积属性逐项不差于当前前缀时剪掉
+
+    Args:
+        top_k (int): 返回的最优组合数量（按多重集去重）
+        length (int): 组合长度
+        allow_intermediate_negative (bool): 是否允许中间步骤出现负值
+        enforce_positive_attrs (bool): 是否要求最终纯增益属性不包含负数
+        time_limit (float, optional): 时间限制（秒），超时后返回当前结果且不保证最优
+        memo_size (int): 每个深度保存的用于支配判断的前缀状态数量上限
+        objective (optional): 可加的目标函数（提供 card_values()），默认纯增益之和
+        incumbent (Incumbent, optional): 与其他搜索共享的当前最优解（见 card_optimizer.portfolio）。
+            只在 top_k=1 时使用: 上界不超过其得分的分支直接剪掉，找到更好的解时立即提交
+        store (SolutionStore, optional): 解存储（见 card_optimizer.store）。搜索前先查找已证明最优的结果，
+            命中时直接返回（certificate 中 store_hit 为 True）；搜索完成后写回
+
+    Returns:
+        tuple: (solutions, certificate)
+            solutions: [(combination, score, attrs), ...] 按得分降序
+            certificate: 搜索证明信息，optimal 为 True 时表示结果已被证明是前K个最优；
+                使用 incumbent 时表示已证明不存在比 incumbent 更好的解，solutions 可能为空
+    """
+    start_time = time.time()
+    problem = get_problem()
+    card_attributes, local_attributes = problem.card_attributes, problem.local_attributes
+    num_attrs = card_attributes.shape[1]
+
+    objective = get_objective(objective)
+    if not hasattr(objective, "card_values"):
+        raise ValueError("精确搜索只支持可加的目标函数（需要提供 card_values()）")
+
+    shared = incumbent if top_k == 1 else None
+
+    if store is not None:
+        stored = store.lookup(top_k, objective, length, allow_intermediate_negative, enforce_positive_attrs)
+        if stored is not None:
+            solutions, certificate = stored
+            certificate.update(store_hit=True, elapsed=time.time() - start_time)
+            if shared is not None and solutions:
+                shared.offer(*solutions[0], "store")
+            return solutions, certificate
+
+    # 按单卡增益从高到低排序，使得子节点的上界单调递减
+    gains = np.asarray(objective.card_values(), dtype=float)
+    order = np.argsort(-gains, kind='stable')
+    sorted_attributes = card_attributes[order]
+    sorted_gains = gains[order]
+    max_gain = gains.max()
+    use_dominance = getattr(objective, "monotone", False)
+    max_step = card_attributes.max(axis=0)  # 每个属性单步最大增量
+
+    # 最终属性的下限
+    floor = np.maximum(local_attributes, 0) if enforce_positive_attrs else np.zeros(num_attrs, dtype=local_attributes.dtype)
+
+    heap = []  # 最小堆: (score, 序号, combination, attrs)
+    visited = [set() for _ in range(length + 1)]
+    dominance = [np.empty((memo_size, num_attrs), dtype=card_attributes.dtype) for _ in range(length + 1)]
+    dominance_last = [np.empty(memo_size, dtype=np.intp) for _ in range(length + 1)]
+    dominance_count = [0] * (length + 1)
+    certificate = {
+        "optimal": True,
+        "nodes": 0,
+        "pruned_bound": 0,
+        "pruned_infeasible": 0,
+        "pruned_duplicate": 0,
+        "pruned_dominated": 0,
+        "max_pruned_bound": float('-inf'),
+    }
+    progress = SearchProgress("exact_search", logger)
+
+    def threshold():
+        bound = heap[0][0] if len(heap) >= top_k else float('-inf')
+        return bound if shared is None else max(bound, shared.score)
+
+    def record(prefix, total, score):
+        progress.update(best_score=score)
+        if shared is not None and score > shared.score:
+            shared.offer([int(order[index]) for index in prefix], score, total - local_attributes, "exact")
+        if len(heap) < top_k:
+            heapq.heappush(heap, (score, certificate["nodes"], prefix, total))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, certificate["nodes"], prefix, total))
+
+    def dominated(depth, total, last):
+        # 判断是否已有至少K个不同多重集的前缀在每个属性上都不差于当前前缀
+        count = min(dominance_count[depth], memo_size)
+        better = np.all(dominance[depth][:count] >= total, axis=1)
+        if allow_intermediate_negative:
+            # 非降序枚举时，支配者必须也能接上当前前缀的所有后续卡片
+            better &= dominance_last[depth][:count] <= last
+        return np.count_nonzero(better) >= top_k
+
+    def remember(depth, total, last):
+        slot = dominance_count[depth] % memo_size
+        dominance[depth][slot] = total
+        dominance_last[depth][slot] = last
+        dominance_count[depth] += 1
+
+    def search(prefix, total, value, depth):
+        certificate["nodes"] += 1
+        if time_limit is not None and time.time() - start_time > time_limit:
+            certificate["optimal"] = False
+            return False
+
+        remaining = length - depth - 1
+        first = prefix[-1] if allow_intermediate_negative and prefix else 0
+        children = total + sorted_attributes[first:]
+
+        feasible = np.all(children + remaining * max_step >= floor, axis=1)
+        if not allow_intermediate_negative:
+            feasible &= np.all(children >= 0, axis=1)
+        child_values = value + sorted_gains[first:]
+        bounds = child_values + remaining * max_gain
+        progress.update(candidates=len(children))
+
+        for offset in range(len(children)):
+            # 子节点按上界降序排列，一旦不能超过第K名即可停止
+            if bounds[offset] <= threshold():
+                certificate["pruned_bound"] += len(children) - offset
+                certificate["max_pruned_bound"] = max(certificate["max_pruned_bound"], float(bounds[offset]))
+                break
+            if not feasible[offset]:
+                certificate["pruned_infeasible"] += 1
+                continue
+
+            child_prefix = prefix + [first + offset]
+            child_total = children[offset]
+            if not allow_intermediate_negative:
+                # 允许中间负值时按非降序枚举，本身就是多重集；否则需要去掉同一多重集的其他排列
+                key = tuple(sorted(child_prefix))
+                if key in visited[depth + 1]:
+                    certificate["pruned_duplicate"] += 1
+                    continue
+                visited[depth + 1].add(key)
+
+            if remaining == 0:
+                if np.all(child_total >= floor):
+                    record(child_prefix, child_total, float(child_values[offset]))
+                continue
+
+            if use_dominance:
+                if dominated(depth + 1, child_total, first + offset):
+                    certificate["pruned_dominated"] += 1
+                    continue
+                remember(depth + 1, child_total, first + offset)
+
+            if not search(child_prefix, child_total, child_values[offset], depth + 1):
+                return False
+        return True
+
+    search([], local_attributes.copy(), 0.0, 0)
+    progress.finish()
+
+    solutions = []
+    for score, _, prefix, total in sorted(heap, key=lambda item: (-item[0], item[1])):
+        combination = [int(order[index]) for index in prefix]
+        solutions.append((combination, score, total - local_attributes))
+
+    certificate["elapsed"] = time.time() - start_time
+    if solutions:
+        certificate["kth_score"] = solutions[-1][1]
+    # 使用 incumbent 时的证明只相对于 incumbent 成立，不写回存储
+    if store is not None and shared is None:
+        store.save(solutions, certificate, top_k, objective, length, allow_intermediate_negative, enforce_positive_attrs)
+    return solutions, certificate
+
+# 使用精确搜索代替原来的暴力枚举，返回前 max_combinations 个最优组合
+def brute_force_search(max_combinations=10, time_limit=30, store=None):
+    solutions, certificate = exact_search(top_k=max_combinations, time_limit=time_limit, store=store)
+    if certificate.get("store_hit"):
+        logger.info("从解存储中读取到已证明最优的结果")
+    elif certificate["optimal"]:
+        logger.info(f"精确搜索完成: 已证明最优, 扩展节点 {certificate['nodes']} 个")
+    else:
+        logger.info(f"超过时间限制 {time_limit} 秒，已找到 {len(solutions)} 个有效组合（未证明最优）")
+    return solutions
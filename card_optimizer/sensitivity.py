@@ -0,0 +1,226 @@
+"""
+假设分析: 一次批量计算多种假设变化（速度、log2增益、负数抵消、增删卡片、local变化）下的最优组合
+
+每个场景都单独运行一次优化器时，大部分工作是重复的。这里把所有场景合并到一次多重集枚举中
+（见 card_optimizer.multiset）:
+  - 所有场景新增的卡片合并成一张卡片表，每个多重集的数量矩阵只计算一次；
+    某个场景中不可用的卡片（被移除或未加入）只需把用到它们的多重集标记为无效
+  - 机器人修正（负数抵消、log2增益）只改变属性表，每种修正只做一次 数量矩阵 × 属性表
+  - local 只影响有效性，同一修正下不同 local 的场景共用纯增益属性，只重新判断非负
+  - 速度只通过 floor(log2(speed + 1)) 缩放运行时长（见 speed.py），缩放系数相同的速度结果相同；
+    目标函数与时长无关时速度不影响结果，单位时间产出（rate）的最优组合与速度无关，得分按系数换算
+效果完全相同的场景只计算一次。
+
+场景为字典，可以包含:
+    speed: 机器人速度（attributes[1]）
+    offset: 负数抵消（attributes[2]）
+    bonus: log2增益等级（attributes[3]）
+    add: 新增的卡片 [{"duration": ..., "attributes": [...]}, ...]
+    remove: 移除的卡片在当前 Problem 中的编号
+    local_delta: 在当前local上增加的值；或 local: 直接给出新的local
+"""
+
+import itertools
+import math
+import time
+
+import numpy as np
+
+from utils.logger import get_logger
+from utils.trace import SearchProgress
+from speed import adjust_processing_time_by_speed
+from card_optimizer.multiset import count_matrix, iter_multisets, offer_multisets
+from card_optimizer.objectives import get_objective
+from card_optimizer.problem import Problem, get_problem, use_problem
+from card_optimizer.robots import robot_attribute, apply_robot_modifiers
+
+logger = get_logger("card_optimizer")
+
+# 速度修正不再变化的等级: floor(log2(speed + 1)) >= 9 时运行时长固定为原来的10%
+_MAX_SPEED_LEVEL = 9
+
+def speed_breakpoints(max_speed=None):
+    """
+    运行时长发生变化的速度: 速度在相邻两个断点之间时运行时长相同
+
+    Args:
+        max_speed (float, optional): 只返回不超过该值的断点
+
+    Returns:
+        list: [0, 1, 3, 7, ..., 511]
+    """
+    breakpoints = [0] + [2 ** level - 1 for level in range(1, _MAX_SPEED_LEVEL + 1)]
+    return [speed for speed in breakpoints if max_speed is None or speed <= max_speed]
+
+def scenario_grid(speeds=(None,), offsets=(None,), bonuses=(None,), added=(None,), removed=(None,), local_deltas=(None,)):
+    """
+    生成所有假设变化的组合（笛卡尔积），None 表示不改变该项
+
+    Args:
+        speeds, offsets, bonuses: 速度、负数抵消和log2增益等级的取值
+        added: 每一项为一组新增的卡片列表
+        removed: 每一项为一组移除的卡片编号列表
+        local_deltas: 每一项为local的增量
+
+    Returns:
+        list: 场景列表，见模块说明
+    """
+    names = ("speed", "offset", "bonus", "add", "remove", "local_delta")
+    return [{name: value for name, value in zip(names, values) if value is not None}
+            for values in itertools.product(speeds, offsets, bonuses, added, removed, local_deltas)]
+
+# 目标函数与速度的关系: "none" 与速度无关，"scale" 最优组合与速度无关、得分除以时长系数，"full" 需要按速度分别计算
+def _speed_dependence(objective, objective_args):
+    if objective == "rate":
+        return "scale"
+    if objective == "weighted" and objective_args.get("duration_weight"):
+        return "full"
+    return "none"
+
+def what_if(scenarios, objective=None, objective_args=None, top_k=1, robot_attributes=None, length=8,
+            allow_intermediate_negative=False, enforce_positive_attrs=False, chunk_size=65536):
+    """
+    批量计算每个场景下的最优组合
+
+    Args:
+        scenarios (list): 场景列表，见模块说明；scenario_grid() 可以生成网格
+        objective (str, optional): 内置目标函数名称（"sum"/"rate"/"weighted"），速度取自每个场景；
+            也可以是与速度无关、与顺序无关的可调用对象，它收到的组合为合并后卡片表中的编号
+        objective_args (dict, optional): 目标函数的其他参数，例如 weights、duration_weight
+        top_k (int): 每个场景返回的组合数量
+        robot_attributes (list, optional): 基准机器人属性，场景中未给出的速度、抵消和增益取自这里
+        length (int): 组合长度
+        allow_intermediate_negative (bool): 是否允许中间步骤出现负值
+        enforce_positive_attrs (bool): 是否要求最终纯增益属性不包含负数
+        chunk_size (int): 每块枚举的多重集数量
+
+    Returns:
+        tuple: (results, report)
+            results: 与 scenarios 顺序一致的 {"scenario", "solutions", "cards"}；
+                solutions 为 [(combination, score, attrs), ...]，combination 中的编号与 apply_card_diff 相同:
+                保留的卡片按原顺序在前，场景新增的卡片依次在后（重复新增的相同卡片各占一个编号，组合中使用第一张的编号）；
+                cards 为该场景的卡片数量
+            report: scenarios、distinct（效果不同、实际计算的场景数量）、modifiers（属性表的种类数）、
+                multisets（枚举的多重集数量）、elapsed
+    """
+    start_time = time.time()
+    problem = get_problem()
+    objective_args = dict(objective_args or {})
+    dependence = _speed_dependence(objective, objective_args) if isinstance(objective, str) or objective is None else "none"
+    base_speed = robot_attribute(robot_attributes, 1)
+    base_offset = robot_attribute(robot_attributes, 2)
+    base_bonus = robot_attribute(robot_attributes, 3)
+
+    # 合并所有场景新增的卡片，相同的卡片只保留一张
+    union_cards = [{"duration": problem.card_durations[card].item(), "attributes": problem.card_attributes[card].tolist()}
+                   for card in range(len(problem))]
+    added_index = {}
+    for scenario in scenarios:
+        for card in scenario.get("add") or []:
+            key = (card["duration"], tuple(card["attributes"]))
+            if key not in added_index:
+                added_index[key] = len(union_cards)
+                union_cards.append({"duration": card["duration"], "attributes": list(card["attributes"])})
+    union = Problem(union_cards, problem.local_attributes)
+    raw_attributes = union.card_attributes
+    # 抵消超过最大的负属性后效果相同
+    max_negative = int(max(0, -raw_attributes.min())) if raw_attributes.size else 0
+
+    # 把每个场景归一为效果键，效果相同的场景共用一个结果
+    modifiers, groups, plans = {}, {}, []
+    for scenario in scenarios:
+        removed = set(scenario.get("remove") or [])
+        for card in removed:
+            if not 0 <= card < len(problem):
+                raise ValueError(f"卡片编号超出范围: {card}")
+        kept = [card for card in range(len(problem)) if card not in removed]
+        added = [added_index[(card["duration"], tuple(card["attributes"]))] for card in scenario.get("add") or []]
+        available = kept + list(dict.fromkeys(added))
+        # 合并后卡片表编号 -> 场景中的卡片编号
+        index_map = {card: i for i, card in enumerate(kept)}
+        for position, card in enumerate(added):
+            index_map.setdefault(card, len(kept) + position)
+
+        if "local" in scenario:
+            local = np.asarray(scenario["local"], dtype=problem.local_attributes.dtype)
+        else:
+            local = problem.local_attributes + np.asarray(scenario.get("local_delta") or 0, dtype=problem.local_attributes.dtype)
+
+        offset = scenario.get("offset", base_offset)
+        bonus = scenario.get("bonus", base_bonus)
+        modifier = (min(offset, max_negative) if offset > 0 else 0, math.floor(math.log2(bonus + 1)) if bonus > 0 else 0)
+        modifiers.setdefault(modifier, [0, 0, offset, bonus])
+        factor = adjust_processing_time_by_speed(1.0, scenario.get("speed", base_speed))
+        speed_key = factor if dependence == "full" else None
+
+        key = (modifier, speed_key, tuple(sorted(available)), tuple(local.tolist()))
+        if key not in groups:
+            groups[key] = {"local": local, "available": available, "speed": scenario.get("speed", base_speed),
+                           "heap": [], "certificate": {"unorderable": 0}}
+        plans.append((scenario, key, index_map, len(kept) + len(added), factor))
+
+    # 每种修正的属性表和 Problem；不允许中间负值时，每个场景寻找排列要用自己的 local
+    tables = {modifier: apply_robot_modifiers(raw_attributes, robot) for modifier, robot in modifiers.items()}
+    problems = {modifier: union.with_attributes(table) for modifier, table in tables.items()}
+    for key, group in groups.items():
+        base = problems[key[0]]
+        group["problem"] = Problem(union_cards, group["local"]).with_attributes(base.card_attributes)
+        group["unavailable"] = np.setdiff1d(np.arange(len(union_cards)), group["available"])
+
+    # 按修正和速度分组: 同一修正共用纯增益属性，同一修正和速度共用目标函数的计算
+    by_modifier = {}
+    for key, group in groups.items():
+        speed = group["speed"] if dependence == "full" else 0
+        by_modifier.setdefault(key[0], {}).setdefault(key[1], (speed, []))[1].append(group)
+    objectives = {}
+    for modifier, by_speed in by_modifier.items():
+        for speed_key, (speed, _) in by_speed.items():
+            if isinstance(objective, str) and dependence != "none":
+                objectives[(modifier, speed_key)] = get_objective(objective, speed=speed, **objective_args)
+            else:
+                objectives[(modifier, speed_key)] = get_objective(objective, **objective_args)
+    for group in groups.values():
+        group["mask_key"] = (tuple(group["unavailable"].tolist()), tuple(group["local"].tolist()))
+
+    progress = SearchProgress("what_if", logger)
+    report = {"scenarios": len(scenarios), "distinct": len(groups), "modifiers": len(tables), "multisets": 0}
+    for combinations in iter_multisets(len(union_cards), length, chunk_size):
+        report["multisets"] += len(combinations)
+        counts = count_matrix(combinations, len(union_cards))
+        available_masks = {}
+        for modifier, by_speed in by_modifier.items():
+            net_attributes = counts @ tables[modifier]
+            non_negative = np.all(net_attributes >= 0, axis=1) if enforce_positive_attrs else None
+            # 卡片可用性和 local 相同的场景共用有效性判断
+            valid_masks = {}
+            for speed_key, (_, members) in by_speed.items():
+                with use_problem(problems[modifier]):
+                    values = objectives[(modifier, speed_key)](net_attributes, combinations)
+                for group in members:
+                    valid = valid_masks.get(group["mask_key"])
+                    if valid is None:
+                        unavailable = group["mask_key"][0]
+                        if unavailable not in available_masks:
+                            available_masks[unavailable] = counts[:, group["unavailable"]].sum(axis=1) == 0
+                        valid = available_masks[unavailable] & np.all(net_attributes >= -group["local"], axis=1)
+                        if non_negative is not None:
+                            valid &= non_negative
+                        valid_masks[group["mask_key"]] = valid
+                    scores = np.where(valid, values, -np.inf)
+                    with use_problem(group["problem"]):
+                        offer_multisets(group["heap"], top_k, scores, combinations, net_attributes,
+                                        report["multisets"] - len(combinations), allow_intermediate_negative, group["certificate"])
+        progress.update(candidates=len(combinations) * len(groups))
+    progress.finish()
+
+    results = []
+    for scenario, key, index_map, num_cards, factor in plans:
+        group = groups[key]
+        scale = 1.0 / factor if dependence == "scale" else 1.0
+        solutions = [([index_map[card] for card in combination], score * scale, attrs)
+                     for score, _, combination, attrs in sorted(group["heap"], key=lambda item: (-item[0], item[1]))]
+        results.append({"scenario": scenario, "solutions": solutions, "cards": num_cards})
+    report["elapsed"] = time.time() - start_time
+    logger.info(f"假设分析完成: {len(scenarios)} 个场景, 实际计算 {len(groups)} 个, 属性表 {len(tables)} 种, "
+                f"枚举 {report['multisets']} 个多重集, 用时 {report['elapsed']:.2f} 秒")
+    return results, report
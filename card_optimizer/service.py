@@ -0,0 +1,396 @@
+"""
+本地优化服务: 通过 HTTP/JSON 调用优化器，供用户脚本把计算交给本地的 Python 进程
+
+    python -m card_optimizer.service --port 8765
+
+接口:
+  POST /optimize  请求体为 data.json 的格式 {"player": {"data": {...}}, "options": {...}}，
+                  或直接 {"data": <player.data>, "options": {...}}；返回前K个卡片组合
+  GET  /health    服务状态和缓存统计
+
+结果按 (卡片、local、机器人属性、所选算法使用的选项) 的内容哈希缓存；相同内容的请求正在计算时，
+后到的请求等待同一个计算结果，而不是重复计算。求解在进程池中运行，不阻塞事件循环。
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.logger import configure_logging, configure_worker_logging, get_logger, logging_queue
+from card_optimizer.multiset import multiset_search
+from card_optimizer.objectives import get_objective
+from card_optimizer.portfolio import portfolio_solve
+from card_optimizer.problem import Problem, use_problem
+from card_optimizer.robots import apply_robot_modifiers
+from card_optimizer.search import exact_search, simulated_annealing
+from card_optimizer.store import SolutionStore
+
+logger = get_logger("service")
+
+# 可用的求解算法
+ALGORITHMS = ("exact", "multiset", "annealing", "portfolio")
+
+# 选项的默认值；请求中的选项与之合并后参与内容哈希，因此省略默认值的请求与显式给出默认值的请求共用缓存
+DEFAULT_OPTIONS = {
+    "algorithm": "exact",
+    "top_k": 5,
+    "allow_intermediate_negative": False,
+    "enforce_positive_attrs": False,
+    "objective": "sum",
+    "objective_args": {},
+    "robot": None,
+    "time_limit": 10.0,
+    "budget": 0.2,
+    "seed": 0,
+}
+
+# 选项的类型检查: 名称 -> (类型, 是否可以为 null, 下限, 是否可以等于下限)；bool 不算作整数或浮点数
+OPTION_TYPES = {
+    "algorithm": (str, False, None, True),
+    "top_k": (int, False, 1, True),
+    "allow_intermediate_negative": (bool, False, None, True),
+    "enforce_positive_attrs": (bool, False, None, True),
+    "objective": (str, False, None, True),
+    "objective_args": (dict, False, None, True),
+    "robot": (int, True, 0, True),
+    "time_limit": (float, True, 0, False),
+    "budget": (float, False, 0, False),
+    "seed": (int, True, None, True),
+}
+
+# 除通用选项外各算法使用的选项；其余选项不影响结果，在计算缓存键之前去掉
+COMMON_OPTIONS = ("algorithm", "top_k", "allow_intermediate_negative", "enforce_positive_attrs", "objective", "objective_args")
+ALGORITHM_OPTIONS = {
+    "exact": ("time_limit",),
+    "multiset": ("time_limit",),
+    "annealing": ("seed",),
+    "portfolio": ("budget", "seed"),
+}
+
+# 卡片属性和local的长度
+NUM_ATTRIBUTES = 8
+
+# 工作进程中打开的解存储: 路径 -> SolutionStore
+_stores = {}
+
+# 请求体大小上限（字节）
+MAX_BODY_SIZE = 8 * 1024 * 1024
+
+class RequestError(Exception):
+    """请求无效，以 status 对应的HTTP状态码返回给客户端"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+# 是否为有限的数字；bool 不算作数字
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+# 检查一个选项的类型和范围，不符合时抛出 RequestError
+def _check_option(name, value):
+    kind, nullable, minimum, inclusive = OPTION_TYPES[name]
+    if value is None:
+        if not nullable:
+            raise RequestError(f"选项 {name} 不能为 null")
+        return
+    if kind is float:
+        valid = _is_number(value)
+    elif kind is int:
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, kind)
+    if not valid:
+        type_names = {str: "字符串", int: "整数", float: "数字", bool: "布尔值", dict: "JSON对象"}
+        raise RequestError(f"选项 {name} 必须是{type_names[kind]}: {value!r}")
+    if minimum is not None and (value < minimum or (value == minimum and not inclusive)):
+        raise RequestError(f"选项 {name} 必须{'不小于' if inclusive else '大于'} {minimum}: {value!r}")
+
+# 检查一个数值列表（卡片属性、local、机器人属性），不符合时抛出 RequestError
+def _check_vector(name, value, length=None):
+    if not isinstance(value, list) or not all(_is_number(item) for item in value):
+        raise RequestError(f"{name} 必须是数字列表: {value!r}")
+    if length is not None and len(value) != length:
+        raise RequestError(f"{name} 必须包含 {length} 个数字，实际为 {len(value)} 个")
+
+# 从请求体中取出 player.data 和选项
+def parse_request(payload):
+    if not isinstance(payload, dict):
+        raise RequestError("请求体必须是JSON对象")
+    if "player" in payload:
+        if not isinstance(payload["player"] or {}, dict):
+            raise RequestError("player 必须是JSON对象")
+        player_data = (payload["player"] or {}).get("data")
+    else:
+        player_data = payload.get("data")
+    if not isinstance(player_data, dict) or not player_data.get("cards"):
+        raise RequestError("缺少 player.data.cards")
+
+    options = dict(DEFAULT_OPTIONS)
+    if not isinstance(payload.get("options") or {}, dict):
+        raise RequestError("options 必须是JSON对象")
+    unknown = set(payload.get("options") or {}) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise RequestError(f"未知的选项: {', '.join(sorted(unknown))}")
+    options.update(payload.get("options") or {})
+    for name, value in options.items():
+        _check_option(name, value)
+    if options["algorithm"] not in ALGORITHMS:
+        raise RequestError(f"未知的算法: {options['algorithm']}，可选: {', '.join(ALGORITHMS)}")
+    if options["algorithm"] == "portfolio":
+        options["top_k"] = 1
+    try:
+        objective = get_objective(options["objective"], **options["objective_args"])
+    except (ValueError, TypeError) as e:
+        raise RequestError(f"无效的目标函数: {e}")
+    if options["algorithm"] == "exact" and not hasattr(objective, "card_values"):
+        raise RequestError(f"精确搜索只支持可加的目标函数，{options['objective']} 请使用 multiset 或 annealing")
+
+    # 只保留影响结果的数据: 每张卡片的时长和属性、local、选中机器人的属性，以及所选算法使用的选项
+    if not isinstance(player_data["cards"], list):
+        raise RequestError("player.data.cards 必须是列表")
+    cards = []
+    for index, card in enumerate(player_data["cards"]):
+        if not isinstance(card, dict) or "duration" not in card or "attributes" not in card:
+            raise RequestError("卡片必须包含 duration 和 attributes")
+        if not _is_number(card["duration"]) or card["duration"] < 0:
+            raise RequestError(f"卡片 {index} 的 duration 必须是非负数字: {card['duration']!r}")
+        _check_vector(f"卡片 {index} 的 attributes", card["attributes"], NUM_ATTRIBUTES)
+        cards.append({"duration": card["duration"], "attributes": card["attributes"]})
+    local = player_data.get("local", [0] * NUM_ATTRIBUTES)
+    _check_vector("local", local, NUM_ATTRIBUTES)
+    robot_attributes = None
+    if options["robot"] is not None:
+        objects = player_data.get("objects") or []
+        if not isinstance(objects, list) or not 0 <= options["robot"] < len(objects):
+            raise RequestError(f"机器人编号超出范围: {options['robot']}")
+        if not isinstance(objects[options["robot"]], dict):
+            raise RequestError(f"机器人 {options['robot']} 必须是JSON对象")
+        robot_attributes = objects[options["robot"]].get("attributes") or []
+        _check_vector(f"机器人 {options['robot']} 的 attributes", robot_attributes)
+    used = COMMON_OPTIONS + ALGORITHM_OPTIONS[options["algorithm"]]
+    return {
+        "cards": cards,
+        "local": local,
+        "robot_attributes": robot_attributes,
+        "options": {name: options[name] for name in used},
+    }
+
+# 请求内容的哈希，作为缓存键
+def request_key(request):
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+# 在工作进程中求解一个请求；只使用模块级函数和JSON数据，便于传给进程池
+def solve_request(request, store_path=None):
+    options = request["options"]
+    store = None
+    if store_path is not None:
+        if store_path not in _stores:
+            _stores[store_path] = SolutionStore(store_path)
+        store = _stores[store_path]
+    problem = Problem(request["cards"], request["local"])
+    if request["robot_attributes"] is not None:
+        problem = problem.with_attributes(apply_robot_modifiers(problem.card_attributes, request["robot_attributes"]))
+    objective = get_objective(options["objective"], **options["objective_args"])
+    common = {
+        "allow_intermediate_negative": options["allow_intermediate_negative"],
+        "enforce_positive_attrs": options["enforce_positive_attrs"],
+        "objective": objective,
+    }
+    start = time.perf_counter()
+    optimal = None
+    with use_problem(problem):
+        if options["algorithm"] == "exact":
+            solutions, certificate = exact_search(top_k=options["top_k"], time_limit=options["time_limit"], store=store, **common)
+            optimal = certificate["optimal"]
+        elif options["algorithm"] == "multiset":
+            solutions, certificate = multiset_search(top_k=options["top_k"], time_limit=options["time_limit"], store=store,
+                                                     **common)
+            optimal = certificate["optimal"]
+        elif options["algorithm"] == "annealing":
+            # 与用户脚本中的模拟退火参数一致
+            _, _, _, solutions = simulated_annealing(initial_temp=300, cooling_rate=0.92, iterations=2000, num_runs=20,
+                                                     max_solutions=options["top_k"], seed=options["seed"], **common)
+        else:
+            combination, score, attrs, report = portfolio_solve(budget=options["budget"], seed=options["seed"], **common)
+            solutions = [(combination, score, attrs)] if combination is not None else []
+            optimal = report["optimal"]
+
+    return {
+        "solutions": [{"combination": [int(card) for card in combination], "score": float(score),
+                       "attributes": [int(round(value)) for value in attrs]}
+                      for combination, score, attrs in solutions],
+        "optimal": optimal,
+        "elapsed": time.perf_counter() - start,
+    }
+
+class OptimizationService:
+    """
+    带结果缓存和请求合并的求解服务
+
+    Args:
+        executor (optional): 运行 solve_request 的执行器，默认创建 workers 个进程的进程池
+        workers (int, optional): 进程池大小
+        cache_size (int): 缓存的结果数量上限，超出时淘汰最久未使用的结果
+        store_path (str, optional): 解存储文件（见 card_optimizer.store），精确搜索和多重集搜索的结果在服务重启后仍可复用
+    """
+
+    def __init__(self, executor=None, workers=None, cache_size=256, store_path=None):
+        # 工作进程用 spawn 启动: fork 出的进程会继承已打开的客户端连接，父进程关闭连接后客户端收不到连接结束
+        self.executor = executor or ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                                        initializer=configure_worker_logging, initargs=(logging_queue(),))
+        self.cache_size = cache_size
+        self.store_path = store_path
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    async def optimize(self, payload):
+        """求解一个请求体，返回响应JSON对象"""
+        request = parse_request(payload)
+        key = request_key(request)
+        self.stats["requests"] += 1
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return dict(self._cache[key], key=key, cached=True)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            loop = asyncio.get_running_loop()
+            task = asyncio.ensure_future(loop.run_in_executor(self.executor, solve_request, request, self.store_path))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # shield: 一个客户端断开不会取消其他客户端正在等待的计算
+        result = await asyncio.shield(task)
+        return dict(result, key=key, cached=False)
+
+    def _finish(self, key, task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            self.stats["errors"] += 1
+            return
+        self._cache[key] = task.result()
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def health(self):
+        return {"status": "ok", "cache_entries": len(self._cache), "inflight": len(self._inflight), **self.stats}
+
+    async def handle_connection(self, reader, writer):
+        """处理一个HTTP连接（每个连接一个请求）"""
+        try:
+            status, body = await self._handle_request(reader)
+        except RequestError as e:
+            status, body = e.status, {"error": str(e)}
+        except Exception as e:
+            logger.exception(f"处理请求时出错: {e}")
+            status, body = 500, {"error": str(e)}
+        try:
+            writer.write(_http_response(status, body))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+        except ValueError:
+            raise RequestError("请求行过长")
+        if len(request_line) < 2:
+            raise RequestError("无效的请求行")
+        method, path = request_line[0].upper(), request_line[1].split("?", 1)[0]
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if method == "OPTIONS":
+            return 204, None
+        if path == "/health" and method == "GET":
+            return 200, self.health()
+        if path != "/optimize":
+            raise RequestError(f"未知的路径: {path}", 404)
+        if method != "POST":
+            raise RequestError(f"不支持的方法: {method}", 405)
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise RequestError("无效的 Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise RequestError(f"请求体超过 {MAX_BODY_SIZE} 字节", 413)
+        try:
+            payload = json.loads(await reader.readexactly(length))
+        except (asyncio.IncompleteReadError, ValueError) as e:
+            raise RequestError(f"无效的JSON请求体: {e}")
+
+        start = time.perf_counter()
+        response = await self.optimize(payload)
+        logger.info(f"{method} {path}: {len(response['solutions'])} 个组合, "
+                    f"{'缓存命中' if response['cached'] else '已计算'}, 用时 {(time.perf_counter() - start) * 1000:.1f} ms")
+        return 200, response
+
+_STATUS_TEXT = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error"}
+
+# 构造HTTP响应；允许跨域访问，用户脚本可以直接从页面请求本地服务
+def _http_response(status, body):
+    content = b"" if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+    headers = [
+        f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(content)}",
+        "Access-Control-Allow-Origin: *",
+        "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+        "Access-Control-Allow-Headers: Content-Type",
+        "Connection: close",
+    ]
+    return ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + content
+
+async def serve(host="127.0.0.1", port=8765, workers=None, cache_size=256, store_path=None):
+    """启动服务并一直运行"""
+    service = OptimizationService(workers=workers, cache_size=cache_size, store_path=store_path)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    logger.info(f"优化服务已启动: http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.executor.shutdown(cancel_futures=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="本地卡片组合优化服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--workers", type=int, default=None, help="求解进程数，默认为CPU核数")
+    parser.add_argument("--cache-size", type=int, default=256, help="缓存的结果数量上限")
+    parser.add_argument("--store", default=None, help="解存储文件路径，例如 data/solutions.sqlite")
+    args = parser.parse_args()
+    # 工作进程的日志通过进程间队列交给主进程写入
+    configure_logging(process_safe=True)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.cache_size, args.store))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+离散事件生产模拟: 在一段时间内逐步模拟所有机器人循环运行各自的卡片组合
+
+与用户脚本中 floor(86400 / 总时长) 的静态估计不同，模拟逐张卡片推进，并跟踪共享的 local 资源:
+  - 每张卡片的时长为 duration * 5 按机器人速度修正，属性按机器人的负数抵消和log2增益修正（见 card_optimizer.robots）
+  - 卡片开始时扣除其负属性（消耗的资源），结束时加上其正属性（产出的资源）
+  - 扣除后某个资源会变为负数时机器人停顿，直到其他机器人产出资源后再尝试
+  - 每次开始新一轮卡片组合时消耗 (机器人序号+1) 点能量，能量不足时机器人停止
+事件按时间保存在优先队列中，每次取出最早结束的一张卡片。
+"""
+
+import heapq
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.logger import get_logger
+from card_optimizer.objectives import SECONDS_PER_DAY, robot_card_durations
+from card_optimizer.problem import get_problem, init_worker
+from card_optimizer.robots import robot_attribute, robot_card_attributes
+
+logger = get_logger("card_optimizer")
+
+# 机器人在模拟结束时的状态
+IDLE, RUNNING, STALLED, OUT_OF_ENERGY = "idle", "running", "stalled", "out_of_energy"
+
+def simulate(objects=None, local=None, energy=None, horizon=SECONDS_PER_DAY):
+    """
+    模拟所有机器人在 horizon 秒内的运行
+
+    Args:
+        objects (list, optional): player.data.objects（每个机器人的 cards 和 attributes），默认使用当前 Problem 的机器人
+        local (list, optional): 初始资源，默认使用当前 Problem 的local
+        energy (float, optional): 可用的能量，默认使用当前 Problem 的energy；objects 不为 None 时默认不限制
+        horizon (float): 模拟时长（秒），默认一天
+
+    Returns:
+        dict: local（结束时的资源）、produced（资源的净变化）、output（净变化之和）、energy_used、events、
+            robots（每个机器人的 runs、steps、stall_time、energy_used、produced、cycle_time、status）
+    """
+    problem = get_problem()
+    if objects is None:
+        objects = problem.objects
+        if energy is None:
+            energy = problem.energy
+    resources = np.array(problem.local_attributes if local is None else local, dtype=np.int64)
+    initial = resources.copy()
+    remaining_energy = float('inf') if energy is None else energy
+
+    robots = []
+    for index, robot in enumerate(objects):
+        robot_attributes = robot.get("attributes") or []
+        sequence = np.asarray(robot.get("cards") or [], dtype=np.intp)
+        state = {"robot": index, "runs": 0, "steps": 0, "stall_time": 0.0, "energy_used": 0,
+                 "produced": np.zeros_like(resources), "cycle_time": 0.0, "status": IDLE}
+        if len(sequence):
+            durations = robot_card_durations(robot_attribute(robot_attributes, 1))[sequence]
+            deltas = robot_card_attributes(robot_attributes)[sequence].astype(np.int64)
+            state.update(durations=durations, consumed=np.minimum(deltas, 0), yielded=np.maximum(deltas, 0),
+                         position=0, cycle_time=float(durations.sum()), stalled_since=None)
+            if state["cycle_time"] > 0:
+                state["status"] = RUNNING
+        robots.append(state)
+
+    events = []  # 最小堆: (结束时间, 序号, 机器人)
+    counter = itertools.count()
+    stalled = []
+
+    # 尝试开始机器人的下一张卡片，成功时加入事件队列
+    def start(state, now):
+        nonlocal remaining_energy, resources
+        position = state["position"]
+        cost = state["robot"] + 1
+        if position == 0 and remaining_energy < cost:
+            state["status"] = OUT_OF_ENERGY
+            return True
+        if np.any(resources + state["consumed"][position] < 0):
+            if state["stalled_since"] is None:
+                state["stalled_since"] = now
+            state["status"] = STALLED
+            return False
+        if position == 0:
+            remaining_energy -= cost
+            state["energy_used"] += cost
+        resources += state["consumed"][position]
+        state["produced"] += state["consumed"][position]
+        if state["stalled_since"] is not None:
+            state["stall_time"] += now - state["stalled_since"]
+            state["stalled_since"] = None
+        state["status"] = RUNNING
+        heapq.heappush(events, (now + state["durations"][position], next(counter), state["robot"]))
+        return True
+
+    for state in robots:
+        if state["status"] == RUNNING and not start(state, 0.0):
+            stalled.append(state)
+
+    processed = 0
+    while events and events[0][0] <= horizon:
+        now, _, index = heapq.heappop(events)
+        processed += 1
+        state = robots[index]
+        position = state["position"]
+        resources += state["yielded"][position]
+        state["produced"] += state["yielded"][position]
+        state["steps"] += 1
+        state["position"] = (position + 1) % len(state["durations"])
+        if state["position"] == 0:
+            state["runs"] += 1
+        if not start(state, now):
+            stalled.append(state)
+        # 产出资源后按停顿的先后顺序重试停顿的机器人
+        if stalled:
+            stalled = [waiting for waiting in stalled if not start(waiting, now)]
+
+    for state in stalled:
+        state["stall_time"] += horizon - state["stalled_since"]
+
+    produced = resources - initial
+    return {
+        "horizon": horizon,
+        "local": resources.tolist(),
+        "produced": produced.tolist(),
+        "output": int(produced.sum()),
+        "energy_used": sum(state["energy_used"] for state in robots),
+        "events": processed,
+        "robots": [{"robot": state["robot"], "runs": state["runs"], "steps": state["steps"],
+                    "stall_time": state["stall_time"], "energy_used": state["energy_used"],
+                    "produced": state["produced"].tolist(), "cycle_time": state["cycle_time"], "status": state["status"]}
+                   for state in robots],
+    }
+
+# 在进程池中运行一个场景
+def _simulate_scenario(scenario, horizon):
+    return simulate(scenario.get("objects"), scenario.get("local"), scenario.get("energy"), scenario.get("horizon", horizon))
+
+def simulate_batch(scenarios, horizon=SECONDS_PER_DAY, workers=None):
+    """
+    批量模拟多个场景，例如比较不同的编队配置
+
+    Args:
+        scenarios (list): 场景列表，每个场景为 simulate 参数的字典（objects、local、energy、horizon），缺少的项使用默认值
+        horizon (float): 场景中未指定 horizon 时的模拟时长
+        workers (int, optional): 并行进程数，None 或 1 表示在当前进程中顺序运行
+
+    Returns:
+        list: 与 scenarios 顺序一致的 simulate 结果
+    """
+    if workers is None or workers <= 1:
+        return [_simulate_scenario(scenario, horizon) for scenario in scenarios]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(get_problem(),)) as executor:
+        return list(executor.map(_simulate_scenario, scenarios, itertools.repeat(horizon),
+                                 chunksize=max(1, len(scenarios) // (workers * 4))))
+
+# 把 fleet_optimize 的分配结果转换为机器人列表，空闲的机器人不运行卡片
+def fleet_objects(assignments, objects=None):
+    if objects is None:
+        objects = get_problem().objects
+    return [dict(robot, cards=assignment["combination"] or []) for robot, assignment in zip(objects, assignments)]
@@ -0,0 +1,233 @@
+"""
+解的持久化存储: 按卡片集合的规范指纹保存已证明最优或已知最好的前K个组合
+
+指纹由按内容排序后的卡片（修正后的属性和时长）、local、目标函数、组合长度和约束选项计算，
+因此卡片顺序不同但内容相同的玩家、修正后属性表相同的机器人共用同一条记录。
+组合按排序后的卡片编号保存，读取时再映射回当前 Problem 的卡片编号。
+
+存储是一个 SQLite 文件，可以被多个进程同时使用；记录数超过上限时淘汰最久未使用的记录。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from utils.logger import get_logger
+from card_optimizer.problem import get_problem
+
+logger = get_logger("card_optimizer")
+
+# 默认的存储文件
+DEFAULT_STORE_PATH = os.path.join('data', "solutions.sqlite")
+
+# 指纹格式版本，规范化方式改变时递增，使旧记录不再被命中
+FINGERPRINT_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    fingerprint TEXT PRIMARY KEY,
+    top_k INTEGER NOT NULL,
+    optimal INTEGER NOT NULL,
+    best_score REAL,
+    solutions TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used);
+"""
+
+# 计算当前 Problem 在给定目标函数和选项下的规范指纹
+def canonical_fingerprint(objective, length=8, allow_intermediate_negative=False, enforce_positive_attrs=False):
+    """
+    Args:
+        objective: 目标函数，必须有 key 属性（内置目标函数都有）
+
+    Returns:
+        tuple: (fingerprint, order)；order[j] 为排序后第 j 张卡片在当前 Problem 中的编号。
+            目标函数没有 key 时返回 (None, None)，表示结果不能被存储
+    """
+    key = getattr(objective, "key", None)
+    if key is None:
+        return None, None
+    problem = get_problem()
+    table = np.column_stack([problem.card_attributes, problem.card_durations]).astype(float)
+    # lexsort 以最后一个键为主键，反转后按第一个属性、第二个属性……时长的顺序排序
+    order = np.lexsort(table.T[::-1])
+    content = {
+        "version": FINGERPRINT_VERSION,
+        "cards": table[order].tolist(),
+        "local": np.asarray(problem.local_attributes, dtype=float).tolist(),
+        "objective": list(key),
+        "length": length,
+        "allow_intermediate_negative": bool(allow_intermediate_negative),
+        "enforce_positive_attrs": bool(enforce_positive_attrs),
+    }
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest(), order
+
+# numpy 标量转换为 Python 数值后写入JSON
+def _json_default(value):
+    return value.item()
+
+# 记录的优先级: 已证明最优的记录优于未证明的；都已证明时K更大的更好，都未证明时得分更高的更好
+def _rank(optimal, top_k, best_score):
+    best_score = float('-inf') if best_score is None else best_score
+    return (1, top_k, best_score) if optimal else (0, best_score, top_k)
+
+class SolutionStore:
+    """
+    SQLite 解存储
+
+    Args:
+        path (str): 存储文件路径，":memory:" 表示只在内存中保存
+        max_entries (int): 记录数上限，超出时淘汰最久未使用的记录
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, max_entries=10000):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def lookup(self, top_k, objective, length=8, allow_intermediate_negative=False, enforce_positive_attrs=False,
+               require_optimal=True):
+        """
+        查找当前 Problem 的前K个组合
+
+        已证明最优的记录在保存的K不小于 top_k、或者有效组合总数少于保存的K时可以直接使用；
+        require_optimal 为 False 时也返回未证明最优的记录。
+
+        Returns:
+            tuple: (solutions, metadata)，组合已映射回当前 Problem 的卡片编号；没有可用记录时返回 None
+        """
+        fingerprint, order = canonical_fingerprint(objective, length, allow_intermediate_negative, enforce_positive_attrs)
+        if fingerprint is None:
+            return None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT top_k, optimal, solutions, metadata FROM solutions WHERE fingerprint = ?", (fingerprint,)).fetchone()
+            if row is None:
+                return None
+            stored_k, optimal, solutions, metadata = row
+            solutions = json.loads(solutions)
+            complete = stored_k >= top_k or len(solutions) < stored_k
+            if require_optimal and not (optimal and complete):
+                return None
+            self._connection.execute("UPDATE solutions SET last_used = ? WHERE fingerprint = ?", (time.time(), fingerprint))
+
+        metadata = json.loads(metadata)
+        metadata["optimal"] = bool(optimal and complete)
+        return [([int(order[card]) for card in combination], score, np.array(attrs))
+                for combination, score, attrs in solutions[:top_k]], metadata
+
+    def save(self, solutions, metadata, top_k, objective, length=8, allow_intermediate_negative=False,
+             enforce_positive_attrs=False):
+        """
+        保存当前 Problem 的前K个组合和搜索信息（例如 certificate），metadata["optimal"] 表示是否已证明最优
+
+        已有记录比新结果更好时保留已有记录。
+
+        Returns:
+            bool: 是否写入
+        """
+        fingerprint, order = canonical_fingerprint(objective, length, allow_intermediate_negative, enforce_positive_attrs)
+        if fingerprint is None:
+            return False
+        position = np.empty(len(order), dtype=np.intp)
+        position[order] = np.arange(len(order))
+        entry = {
+            "fingerprint": fingerprint,
+            "top_k": top_k,
+            "optimal": bool(metadata.get("optimal")),
+            "best_score": float(solutions[0][1]) if solutions else None,
+            "solutions": [[[int(position[card]) for card in combination], float(score), np.asarray(attrs).tolist()]
+                          for combination, score, attrs in solutions],
+            "metadata": metadata,
+        }
+        return self._merge([entry]) == 1
+
+    # 合并记录，只在新记录更好时替换；返回写入的记录数
+    def _merge(self, entries):
+        written = 0
+        now = time.time()
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                for entry in entries:
+                    row = connection.execute("SELECT optimal, top_k, best_score FROM solutions WHERE fingerprint = ?",
+                                             (entry["fingerprint"],)).fetchone()
+                    if row is not None and _rank(*row) >= _rank(entry["optimal"], entry["top_k"], entry["best_score"]):
+                        continue
+                    connection.execute(
+                        "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (entry["fingerprint"], entry["top_k"], int(entry["optimal"]), entry["best_score"],
+                         json.dumps(entry["solutions"]), json.dumps(entry["metadata"], default=_json_default),
+                         entry.get("created", now), now))
+                    written += 1
+                self._evict()
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return written
+
+    def _evict(self):
+        count = self._connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+        if count > self.max_entries:
+            self._connection.execute(
+                "DELETE FROM solutions WHERE fingerprint IN (SELECT fingerprint FROM solutions ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,))
+            logger.debug(f"解存储淘汰了 {count - self.max_entries} 条最久未使用的记录")
+
+    def export_jsonl(self, file_path):
+        """把所有记录导出为JSON Lines文件，返回导出的记录数"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT fingerprint, top_k, optimal, best_score, solutions, metadata, created FROM solutions").fetchall()
+        with open(file_path, 'w', encoding='utf-8') as f:
+            for fingerprint, top_k, optimal, best_score, solutions, metadata, created in rows:
+                f.write(json.dumps({"fingerprint": fingerprint, "top_k": top_k, "optimal": bool(optimal),
+                                    "best_score": best_score, "solutions": json.loads(solutions),
+                                    "metadata": json.loads(metadata), "created": created}, ensure_ascii=False) + "\n")
+        return len(rows)
+
+    def import_jsonl(self, file_path, batch_size=1000):
+        """从 export_jsonl 导出的文件导入记录，与已有记录合并，返回写入的记录数"""
+        written = 0
+        batch = []
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    written += self._merge(batch)
+                    batch = []
+        if batch:
+            written += self._merge(batch)
+        return written
@@ -0,0 +1,119 @@
+"""
+有界的前K个解收集器
+
+扫描任意多的候选时只保留K个解，内存占用与扫描的候选数量无关。
+组合以紧凑整数编码（见 pack_combinations）保存并按此去重，需要时再解码为卡片编号列表。
+可选的最小汉明距离使保留的解彼此至少有若干个位置不同，避免前K名都是同一个解的微小变化。
+"""
+
+import heapq
+import itertools
+
+import numpy as np
+
+from card_optimizer.evaluation import pack_combinations, unpack_combinations
+from card_optimizer.problem import get_problem
+
+class TopK:
+    """
+    前K个解收集器
+
+    得分相同时先加入的解优先保留，因此结果与按加入顺序稳定排序后取前K个相同。
+
+    Args:
+        k (int): 保留的解数量
+        min_distance (int): 保留的解之间的最小汉明距离（不同位置的数量）；0 或 1 表示只去掉完全相同的组合。
+            新解与已保留的某个解距离过近时，只有得分高于所有这些解才会替换它们
+    """
+
+    def __init__(self, k, min_distance=0):
+        if k < 1:
+            raise ValueError(f"保留的解数量至少为1: {k}")
+        self.k = k
+        self.min_distance = min_distance
+        self.num_cards = len(get_problem())
+        self.length = None
+        self._heap = []  # 最小堆: (score, -序号, key)，被替换的解在弹出时跳过
+        self._entries = {}  # key -> (score, 序号, attrs)
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def threshold(self):
+        """进入前K名需要超过的得分，未满K个时为负无穷"""
+        if len(self._entries) < self.k:
+            return float('-inf')
+        self._drop_stale()
+        return self._heap[0][0]
+
+    def offer(self, combination, score, attrs=None):
+        """加入一个解，返回是否被保留"""
+        combination = np.asarray(combination)
+        return self._offer(pack_combinations(combination[None, :])[0], combination.shape[0], float(score), attrs)
+
+    def offer_batch(self, combinations, scores, attrs=None):
+        """
+        加入一批解，只对可能进入前K名的行编码和比较
+
+        Returns:
+            int: 被保留的解数量
+        """
+        scores = np.asarray(scores, dtype=float)
+        candidates = np.flatnonzero(scores > self.threshold)
+        if len(candidates) == 0:
+            return 0
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        combinations = np.asarray(combinations)
+        kept = 0
+        for row, key in zip(candidates, pack_combinations(combinations[candidates])):
+            if not scores[row] > self.threshold:
+                break
+            kept += self._offer(key, combinations.shape[1], float(scores[row]), None if attrs is None else attrs[row])
+        return kept
+
+    def _offer(self, key, length, score, attrs):
+        if score == float('-inf') or not score > self.threshold or key in self._entries:
+            return False
+        self.length = length
+        if self.min_distance > 1 and self._entries:
+            keys = list(self._entries)
+            kept = unpack_combinations(keys, length, self.num_cards)
+            combination = unpack_combinations([key], length, self.num_cards)[0]
+            close = np.count_nonzero(kept != combination, axis=1) < self.min_distance
+            conflicts = [keys[row] for row in np.flatnonzero(close)]
+            if any(self._entries[other][0] >= score for other in conflicts):
+                return False
+            for other in conflicts:
+                del self._entries[other]
+
+        order = next(self._counter)
+        self._entries[key] = (score, order, None if attrs is None else np.array(attrs))
+        heapq.heappush(self._heap, (score, -order, key))
+        while len(self._entries) > self.k:
+            self._drop_stale()
+            _, _, evicted = heapq.heappop(self._heap)
+            del self._entries[evicted]
+        # 被替换的解留在堆中，数量过多时重建堆
+        if len(self._heap) > 2 * self.k + 16:
+            self._heap = [(score, -order, key) for key, (score, order, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+        return True
+
+    # 弹出堆顶已被替换的解（不在 _entries 中，或同一组合之后被重新加入）
+    def _drop_stale(self):
+        while self._heap:
+            _, negative_order, key = self._heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == -negative_order:
+                return
+            heapq.heappop(self._heap)
+
+    def results(self):
+        """返回 [(combination, score, attrs), ...]，按得分降序，得分相同时先加入的在前"""
+        if not self._entries:
+            return []
+        items = sorted(self._entries.items(), key=lambda item: (-item[1][0], item[1][1]))
+        combinations = unpack_combinations([key for key, _ in items], self.length, self.num_cards)
+        return [(combination.tolist(), score, attrs) for combination, (_, (score, _, attrs)) in zip(combinations, items)]
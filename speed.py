@@ -22,11 +22,12 @@ def seconds_to_hms(seconds: float) -> str:
     return f"{hours}小时{minutes}分{seconds}秒"
 
 # 示例用法
-original_time = 500  # 原始时间（秒）
-speed_value = 50      # 速度值
+if __name__ == "__main__":
+    original_time = 500  # 原始时间（秒）
+    speed_value = 50      # 速度值
 
-adjusted_time = adjust_processing_time_by_speed(original_time, speed_value)
-adjusted_time_hms = seconds_to_hms(adjusted_time)
+    adjusted_time = adjust_processing_time_by_speed(original_time, speed_value)
+    adjusted_time_hms = seconds_to_hms(adjusted_time)
 
-print(f"调整后的时间为: {adjusted_time} 秒")
-print(f"调整后的时间为: {adjusted_time_hms}")
+    print(f"调整后的时间为: {adjusted_time} 秒")
+    print(f"调整后的时间为: {adjusted_time_hms}")
@@ -0,0 +1,206 @@
+"""
+卡片优化算法基准测试
+
+在固定种子生成的合成卡片集（4/16/64张，不同属性稀疏度）和 data.json 上运行贪心、遗传、
+模拟退火和精确搜索，记录耗时、每秒评估的候选解数量、内存峰值以及与精确解的差距，结果写入JSON。
+
+用法:
+    python test/benchmark_card_optimizer.py --output benchmark.json
+    python test/benchmark_card_optimizer.py --sizes 4 16 --sparsity 0.5 --skip-data
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+from utils.logger import get_logger
+
+logger = get_logger("benchmark")
+
+# 各算法在基准测试中的评估模式，与算法本身的默认约束一致，精确解按相同模式计算
+STRICT = {"allow_intermediate_negative": False, "enforce_positive_attrs": False}
+RELAXED = {"allow_intermediate_negative": True, "enforce_positive_attrs": True}
+
+
+# 收集搜索结束时输出的结构化进度事件
+class EventCollector(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.events = []
+
+    def emit(self, record):
+        event = getattr(record, "event", None)
+        if event is not None and event["event"] == "search_finished":
+            self.events.append(event)
+
+
+# 生成合成卡片集: sparsity 为属性取0的比例
+def synthetic_card_set(num_cards, sparsity, seed, num_attrs=8):
+    rng = np.random.default_rng(seed)
+    mask = rng.random((num_cards, num_attrs)) >= sparsity
+    attributes = rng.integers(-30, 31, size=(num_cards, num_attrs)) * mask
+    cards = [
+        {"id": i, "duration": int(rng.integers(30, 200)), "attributes": attributes[i].tolist()}
+        for i in range(num_cards)
+    ]
+    local = rng.integers(0, 50, size=num_attrs).tolist()
+    return cards, local
+
+
+# 基准测试的算法: (名称, 评估模式, 运行函数)，运行函数返回最佳组合
+def benchmark_algorithms(seed):
+    return [
+        ("greedy", STRICT, lambda: optimizer.greedy_algorithm()[0]),
+        ("genetic", STRICT, lambda: optimizer.genetic_algorithm(seed=seed)[0]),
+        ("annealing", RELAXED, lambda: optimizer.simulated_annealing(iterations=1000, num_runs=10, seed=seed)[0]),
+        ("brute_force", STRICT, lambda: (optimizer.brute_force_search(max_combinations=1) or [(None,)])[0][0]),
+        ("multiset", STRICT, lambda: (optimizer.multiset_search(top_k=1, allow_intermediate_negative=False,
+                                                                time_limit=10)[0] or [(None,)])[0][0]),
+    ]
+
+
+# 按给定评估模式重新计算组合得分，使不同算法的结果可以直接比较
+def rescore(combination, mode):
+    if combination is None:
+        return None
+    scores, _, _ = optimizer.evaluate_batch([combination], **mode)
+    return float(scores[0]) if scores[0] != float('-inf') else None
+
+
+# 计算精确解作为参照
+def reference_score(mode, time_limit):
+    solutions, certificate = optimizer.exact_search(top_k=1, time_limit=time_limit, **mode)
+    score = float(solutions[0][1]) if solutions else None
+    return score, certificate["optimal"]
+
+
+# 运行一次算法并记录耗时、候选解数量和内存峰值
+def measure(run, collector, track_memory):
+    collector.events.clear()
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    combination = run()
+    wall_time = time.perf_counter() - start
+    peak = None
+    if track_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    candidates = sum(event["candidates"] for event in collector.events)
+    return combination, wall_time, candidates, peak
+
+
+def benchmark_problem(name, cards, local, seed, reference_time_limit, track_memory, collector):
+    results = []
+    with optimizer.use_problem(optimizer.Problem(cards, local)):
+        references = {}
+        for mode_name, mode in (("strict", STRICT), ("relaxed", RELAXED)):
+            collector.events.clear()
+            references[mode_name] = reference_score(mode, reference_time_limit)
+
+        for algorithm, mode, run in benchmark_algorithms(seed):
+            combination, wall_time, candidates, _ = measure(run, collector, False)
+            # 内存峰值单独测量一次，避免tracemalloc的开销影响耗时
+            peak = measure(run, collector, True)[3] if track_memory else None
+            score = rescore(combination, mode)
+            ref, optimal = references["strict" if mode is STRICT else "relaxed"]
+            gap = ref - score if ref is not None and score is not None else None
+            results.append({
+                "problem": name,
+                "cards": len(cards),
+                "algorithm": algorithm,
+                "mode": "strict" if mode is STRICT else "relaxed",
+                "wall_time": round(wall_time, 6),
+                "candidates": candidates,
+                "candidates_per_second": round(candidates / wall_time, 1) if wall_time > 0 else None,
+                "peak_memory_bytes": peak,
+                "combination": combination,
+                "score": score,
+                "reference_score": ref,
+                "reference_optimal": optimal,
+                "gap": gap,
+                "relative_gap": round(gap / abs(ref), 6) if gap is not None and ref else None,
+            })
+            logger.debug(f"{name} {algorithm}: {results[-1]}")
+    return results
+
+
+def run_benchmark(sizes=(4, 16, 64), sparsities=(0.5, 0.8), seed=0, include_data=True,
+                  reference_time_limit=30, track_memory=True):
+    """
+    运行完整的基准测试
+
+    Returns:
+        dict: {"meta": 运行环境, "results": 每个问题和算法一条记录}
+    """
+    collector = EventCollector()
+    search_logger = get_logger("card_optimizer")
+    propagate = search_logger.propagate
+    search_logger.addHandler(collector)
+    search_logger.propagate = False  # 基准测试期间不在控制台输出搜索日志
+    try:
+        problems = []
+        for size in sizes:
+            for sparsity in sparsities:
+                cards, local = synthetic_card_set(size, sparsity, seed=(seed, size, int(sparsity * 100)))
+                problems.append((f"synthetic-{size}-{sparsity}", cards, local))
+        if include_data:
+            data_path = os.path.join(REPO_ROOT, "data.json")
+            cards, local = optimizer.load_cards_from_json(data_path)
+            problems.append(("data.json", cards, local))
+
+        results = []
+        for name, cards, local in problems:
+            results.extend(benchmark_problem(name, cards, local, seed, reference_time_limit, track_memory, collector))
+    finally:
+        search_logger.removeHandler(collector)
+        search_logger.propagate = propagate
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "seed": seed,
+            "reference_time_limit": reference_time_limit,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="卡片优化算法基准测试")
+    parser.add_argument("--output", default="benchmark.json", help="结果JSON文件路径")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 16, 64], help="合成卡片集的卡片数量")
+    parser.add_argument("--sparsity", type=float, nargs="+", default=[0.5, 0.8], help="合成卡片集的属性稀疏度")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--reference-time-limit", type=float, default=30, help="精确参照解的时间限制（秒）")
+    parser.add_argument("--skip-data", action="store_true", help="不测试 data.json")
+    parser.add_argument("--no-memory", action="store_true", help="不测量内存峰值")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.sizes, args.sparsity, args.seed, not args.skip_data,
+                           args.reference_time_limit, not args.no_memory)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for result in report["results"]:
+        gap = "-" if result["gap"] is None else f"{result['gap']:g}"
+        print(f"{result['problem']:<22} {result['algorithm']:<12} {result['wall_time']:>9.3f}s "
+              f"{result['candidates_per_second'] or 0:>12.0f}/s gap={gap}")
+    print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
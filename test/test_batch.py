@@ -0,0 +1,97 @@
+"""
+批量优化测试: 检查每个快照写入一条结果，以及中断后（输出文件末尾有不完整的一行）继续时只求解未完成的快照
+
+可直接运行: python test/test_batch.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+from card_optimizer.batch import CompletedSnapshots
+
+# 测试用卡片
+CARDS = [
+    {"duration": 100, "attributes": [-2, -2, 4, 0, 0, 0, 0, 0]},
+    {"duration": 110, "attributes": [3, 0, -2, 0, 0, 0, 0, 0]},
+    {"duration": 120, "attributes": [0, 3, -2, 0, 0, 0, 0, 0]},
+    {"duration": 169, "attributes": [1, 0, 0, 0, 0, 0, 0, 0]},
+]
+
+# 测试用快照: local 各不相同，第3个快照缺少卡片
+SNAPSHOTS = [{"player": {"data": {"cards": CARDS, "local": [level, level, level, 0, 0, 0, 0, 0]}}} for level in range(2, 7)]
+SNAPSHOTS[2] = {"player": {"data": {"local": [0] * 8}}}
+
+
+# 读取输出文件中的所有结果，按序号排序
+def read_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return sorted((json.loads(line) for line in f), key=lambda record: record["seq"])
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.source = os.path.join(self.directory, "snapshots.jsonl")
+        self.output = os.path.join(self.directory, "results.jsonl")
+        with open(self.source, "w", encoding="utf-8") as f:
+            for snapshot in SNAPSHOTS:
+                f.write(json.dumps(snapshot) + "\n")
+
+    def test_resume_after_truncated_line(self):
+        stats = optimizer.run_batch(self.source, self.output, {"top_k": 2}, workers=1)
+        self.assertEqual((stats["solved"], stats["errors"], stats["skipped"]), (4, 1, 0))
+        complete = read_results(self.output)
+        self.assertEqual([record["seq"] for record in complete], list(range(len(SNAPSHOTS))))
+        self.assertEqual([record["id"] for record in complete], [f"snapshots.jsonl:{line}" for line in range(1, 6)])
+        self.assertIn("error", complete[2])
+        for record, snapshot in zip(complete, SNAPSHOTS):
+            if "error" in record:
+                continue
+            data = snapshot["player"]["data"]
+            with optimizer.use_problem(optimizer.Problem(data["cards"], data["local"])):
+                expected, _ = optimizer.exact_search(top_k=2)
+            self.assertEqual([solution["score"] for solution in record["solutions"]], [score for _, score, _ in expected])
+
+        # 模拟中断: 只保留前两条完整的结果和第三条的一半
+        with open(self.output, "rb") as f:
+            lines = f.readlines()
+        with open(self.output, "wb") as f:
+            f.writelines(lines[:2])
+            f.write(lines[2][:len(lines[2]) // 2])
+        done = {json.loads(line)["seq"] for line in lines[:2]}
+
+        stats = optimizer.run_batch(self.source, self.output, {"top_k": 2}, workers=1)
+        self.assertEqual(stats["skipped"], 2)
+        self.assertEqual(stats["solved"] + stats["errors"], len(SNAPSHOTS) - 2)
+        resumed = read_results(self.output)
+        self.assertEqual([record["seq"] for record in resumed], list(range(len(SNAPSHOTS))))
+        for old, new in zip(complete, resumed):
+            if new["seq"] not in done:
+                self.assertEqual(old.get("solutions"), new.get("solutions"))
+
+        # 全部完成后再次运行不再求解任何快照
+        stats = optimizer.run_batch(self.source, self.output, {"top_k": 2}, workers=1)
+        self.assertEqual((stats["solved"], stats["errors"], stats["skipped"]), (0, 0, len(SNAPSHOTS)))
+
+    def test_unknown_option(self):
+        with self.assertRaises(ValueError):
+            optimizer.run_batch(self.source, self.output, {"unknown": 1}, workers=1)
+
+    def test_completed_snapshots(self):
+        done = CompletedSnapshots()
+        for seq in (2, 0, 5, 1, 1, 3):
+            done.add(seq)
+        self.assertEqual(done.count, 5)
+        self.assertEqual(done.watermark, 4)
+        self.assertEqual(done.ahead, {5})
+        self.assertEqual([seq in done for seq in range(7)], [True, True, True, True, False, True, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+精确搜索测试: 在随机的小规模问题上检查 exact_search 和 multiset_search 与穷举所有排列的结果一致
+
+可直接运行: python test/test_exact_search.py
+"""
+
+import itertools
+import os
+import sys
+import unittest
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+
+LENGTH = 4
+
+
+# 随机生成小规模问题: 卡片属性有正有负，初始属性较小，使中间负值约束经常起作用
+def random_problem(rng, num_cards):
+    cards = [{"duration": int(rng.integers(60, 200)), "attributes": rng.integers(-2, 4, size=8).tolist()}
+             for _ in range(num_cards)]
+    return optimizer.Problem(cards, rng.integers(0, 4, size=8).tolist())
+
+
+# 穷举所有排列，每个多重集取有效排列中的最高得分，返回按得分降序的前K个得分
+def brute_force_scores(top_k, allow_intermediate_negative, enforce_positive_attrs):
+    combinations = np.array(list(itertools.product(range(len(optimizer.get_problem())), repeat=LENGTH)))
+    scores, _, _ = optimizer.evaluate_batch(combinations, allow_intermediate_negative, enforce_positive_attrs)
+    best = {}
+    for combination, score in zip(combinations, scores):
+        key = tuple(sorted(combination))
+        if score > best.get(key, float('-inf')):
+            best[key] = score
+    return sorted(best.values(), reverse=True)[:top_k]
+
+
+class ExactSearchTest(unittest.TestCase):
+    def assert_matches_brute_force(self, solutions, certificate, top_k, allow_intermediate_negative,
+                                   enforce_positive_attrs):
+        self.assertTrue(certificate["optimal"])
+        expected = brute_force_scores(top_k, allow_intermediate_negative, enforce_positive_attrs)
+        self.assertEqual([score for _, score, _ in solutions], expected)
+        # 返回的组合本身有效、得分一致且多重集互不相同
+        combinations = [combination for combination, _, _ in solutions]
+        scores, net, _ = optimizer.evaluate_batch(np.array(combinations).reshape(-1, LENGTH),
+                                                  allow_intermediate_negative, enforce_positive_attrs)
+        self.assertEqual(scores.tolist(), expected)
+        self.assertEqual([np.asarray(attrs).tolist() for _, _, attrs in solutions], net.tolist())
+        self.assertEqual(len({tuple(sorted(combination)) for combination in combinations}), len(combinations))
+
+    def test_random_problems(self):
+        rng = np.random.default_rng(0)
+        for trial in range(12):
+            problem = random_problem(rng, num_cards=int(rng.integers(3, 5)))
+            for top_k, allow, enforce in itertools.product([1, 5], [False, True], [False, True]):
+                with self.subTest(trial=trial, top_k=top_k, allow_intermediate_negative=allow,
+                                  enforce_positive_attrs=enforce), optimizer.use_problem(problem):
+                    solutions, certificate = optimizer.exact_search(top_k=top_k, length=LENGTH,
+                                                                    allow_intermediate_negative=allow,
+                                                                    enforce_positive_attrs=enforce)
+                    self.assert_matches_brute_force(solutions, certificate, top_k, allow, enforce)
+                    solutions, certificate = optimizer.multiset_search(top_k=top_k, length=LENGTH,
+                                                                       allow_intermediate_negative=allow,
+                                                                       enforce_positive_attrs=enforce)
+                    self.assert_matches_brute_force(solutions, certificate, top_k, allow, enforce)
+
+
+if __name__ == "__main__":
+    unittest.main()
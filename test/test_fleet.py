@@ -0,0 +1,77 @@
+"""
+编队优化测试: 检查每个机器人的候选组合与按单位时间产出穷举多重集的结果一致，以及能量预算下的分配
+
+可直接运行: python test/test_fleet.py
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+from card_optimizer.fleet import _top_rate_combinations
+
+# 测试用卡片
+CARDS = [
+    {"duration": 100, "attributes": [-2, -2, 4, 0, 0, 0, 0, 0]},
+    {"duration": 110, "attributes": [3, 0, -2, 0, 0, 0, 0, 0]},
+    {"duration": 120, "attributes": [0, 3, -2, 0, 0, 0, 0, 0]},
+    {"duration": 169, "attributes": [1, 0, 0, 0, 0, 0, 0, 0]},
+]
+LOCAL = [2, 2, 2, 0, 0, 0, 0, 0]
+OBJECTS = [
+    {"cards": [0, 0, 1, 2, 0, 1, 1, 2], "attributes": [0, 0, 0, 0]},
+    {"cards": [3, 3, 3, 3, 3, 3, 3, 3], "attributes": [0, 50, 1, 3]},
+]
+
+
+class FleetTest(unittest.TestCase):
+    def test_top_rate_combinations_match_multiset_search(self):
+        rng = np.random.default_rng(0)
+        for trial in range(10):
+            cards = [{"duration": int(rng.integers(60, 200)), "attributes": rng.integers(-4, 6, size=8).tolist()}
+                     for _ in range(int(rng.integers(3, 7)))]
+            problem = optimizer.Problem(cards, rng.integers(0, 20, size=8).tolist())
+            for allow in (False, True):
+                speed = int(rng.integers(0, 50))
+                objective = optimizer.RateObjective(speed)
+                with self.subTest(trial=trial, allow_intermediate_negative=allow), optimizer.use_problem(problem):
+                    combinations, proven = _top_rate_combinations(5, speed, allow)
+                    self.assertTrue(proven)
+                    expected, _ = optimizer.multiset_search(top_k=5, allow_intermediate_negative=allow,
+                                                            enforce_positive_attrs=True, objective=objective)
+                    # 产出为0的组合不影响分配，只比较产出为正的部分
+                    expected = [score for _, score, _ in expected if score > 0]
+                    scores, _, _ = optimizer.evaluate_batch(np.array(combinations).reshape(-1, 8), allow, True, objective)
+                    np.testing.assert_allclose(scores[:len(expected)], expected)
+
+    def test_energy_budget(self):
+        with optimizer.use_problem(optimizer.Problem(CARDS, LOCAL, OBJECTS, energy=0)):
+            unlimited, unlimited_output, unlimited_energy = optimizer.fleet_optimize(OBJECTS, energy=None)
+            self.assertTrue(all(assignment["combination"] is not None for assignment in unlimited))
+            for energy in (0, unlimited_energy - 1, unlimited_energy):
+                with self.subTest(energy=energy):
+                    assignments, output, total_energy = optimizer.fleet_optimize(energy=energy)
+                    self.assertLessEqual(total_energy, energy)
+                    self.assertLessEqual(output, unlimited_output)
+                    if energy == unlimited_energy:
+                        self.assertEqual(output, unlimited_output)
+                    for assignment in assignments:
+                        if assignment["combination"] is not None:
+                            # 分配的组合都可以持续运行: 修正后的纯增益属性都不为负
+                            robot = OBJECTS[assignment["robot"]]
+                            with optimizer.robot_modifiers(robot["attributes"]):
+                                scores, net, _ = optimizer.evaluate_batch([assignment["combination"]],
+                                                                          enforce_positive_attrs=True)
+                            self.assertEqual(scores[0], assignment["score"])
+                            self.assertTrue(np.all(net >= 0))
+            with self.assertRaises(ValueError):
+                optimizer.fleet_optimize(energy=-1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+增量评估测试: 随机接受若干邻居后，检查 IncrementalEvaluator 的得分与 evaluate_batch 完整重算的结果一致
+
+可直接运行: python test/test_incremental_evaluator.py
+"""
+
+import itertools
+import os
+import sys
+import unittest
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+from card_optimizer.search import generate_moves
+
+LENGTH = 8
+
+
+# 随机生成问题: 卡片属性有正有负，使邻居中有效和无效的都有
+def random_problem(rng, num_cards):
+    cards = [{"duration": int(rng.integers(60, 200)), "attributes": rng.integers(-2, 4, size=8).tolist()}
+             for _ in range(num_cards)]
+    return optimizer.Problem(cards, rng.integers(2, 8, size=8).tolist())
+
+
+# 按 evaluate_moves 的约定依次应用每个修改，得到邻居组合
+def apply_moves(solution, positions, new_cards):
+    neighbors = np.repeat(np.asarray(solution)[None, :], len(positions), axis=0)
+    rows = np.arange(len(positions))
+    for change in range(positions.shape[1]):
+        neighbors[rows, positions[:, change]] = new_cards[:, change]
+    return neighbors
+
+
+class IncrementalEvaluatorTest(unittest.TestCase):
+    def run_random_walk(self, rng, allow_intermediate_negative, enforce_positive_attrs, objective, changes):
+        options = (allow_intermediate_negative, enforce_positive_attrs, objective)
+        evaluator = optimizer.IncrementalEvaluator(rng.integers(0, len(optimizer.get_problem()), size=LENGTH), *options)
+        for _ in range(30):
+            if changes == 2:
+                positions, new_cards = generate_moves(rng, 64, LENGTH)
+            else:
+                positions = rng.integers(0, LENGTH, size=(64, changes))
+                new_cards = rng.integers(0, len(optimizer.get_problem()), size=(64, changes))
+            scores, net = evaluator.evaluate_moves(positions, new_cards)
+            neighbors = apply_moves(evaluator.solution, positions, new_cards)
+            expected_scores, expected_net, _ = optimizer.evaluate_batch(neighbors, *options)
+            np.testing.assert_allclose(scores, expected_scores)
+            np.testing.assert_allclose(net, expected_net)
+
+            # 优先接受有效的邻居，没有时也接受无效的邻居，覆盖当前解本身无效的情况
+            valid = np.flatnonzero(np.isfinite(scores))
+            index = rng.choice(valid) if len(valid) and rng.random() < 0.8 else rng.integers(len(scores))
+            evaluator.accept(index, scores[index])
+            np.testing.assert_array_equal(evaluator.solution, neighbors[index])
+            current_score, _, _ = optimizer.evaluate_batch(evaluator.solution, *options)
+            self.assertEqual(evaluator.score, current_score[0])
+            np.testing.assert_array_equal(evaluator.prefix, optimizer.compute_prefixes(evaluator.solution[None])[0])
+
+    def test_random_accepted_moves(self):
+        rng = np.random.default_rng(0)
+        for trial in range(4):
+            problem = random_problem(rng, num_cards=int(rng.integers(3, 10)))
+            for allow, enforce, objective, changes in itertools.product([False, True], [False, True],
+                                                                        [None, "rate"], [1, 2, 3]):
+                with self.subTest(trial=trial, allow_intermediate_negative=allow, enforce_positive_attrs=enforce,
+                                  objective=objective, changes=changes), optimizer.use_problem(problem):
+                    self.run_random_walk(rng, allow, enforce, optimizer.get_objective(objective), changes)
+
+
+if __name__ == "__main__":
+    unittest.main()
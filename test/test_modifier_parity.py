@@ -0,0 +1,120 @@
+"""
+机器人修正一致性测试: 检查Python评估器与用户脚本 processObjectsAndCards 的计算结果一致
+
+可直接运行: python test/test_modifier_parity.py
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+
+USERSCRIPT = os.path.join(REPO_ROOT, "card_optimizer_tampermonkey.js")
+
+# 测试用卡片
+CARDS = [
+    {"duration": 100, "attributes": [-2, -2, 4, 0, 0, 0, 0, 0]},
+    {"duration": 110, "attributes": [3, 0, -2, 0, 0, 0, 0, 0]},
+    {"duration": 120, "attributes": [0, 3, -2, 0, 0, 0, 0, 0]},
+    {"duration": 169, "attributes": [0, 0, 0, 0, 0, 0, 0, 0]},
+    {"duration": 65, "attributes": [10, 0, -30, 0, 20, 0, 0, -5]},
+]
+
+# 测试用机器人: 覆盖无修正、只有速度、只有抵消、只有增益以及组合的情况
+OBJECTS = [
+    {"cards": [0, 0, 1, 2, 0, 1, 1, 2], "attributes": [0, 0, 0, 0]},
+    {"cards": [0, 0, 1, 2, 0, 1, 1, 2], "attributes": [0, 50, 0, 0]},
+    {"cards": [4, 1, 0, 2, 4, 3, 1, 0], "attributes": [0, 0, 1, 0]},
+    {"cards": [4, 1, 0, 2, 4, 3, 1, 0], "attributes": [0, 0, 0, 7]},
+    {"cards": [4, 4, 4, 1, 2, 3, 0, 0], "attributes": [0, 3, 25, 2]},
+    {"cards": [1, 2, 3, 4, 0, 1, 2, 3], "attributes": [0, 1023, 2, 31]},
+    {"cards": [3, 3, 3, 3, 3, 3, 3, 3], "attributes": []},
+]
+
+# 由用户脚本 processObjectsAndCards 计算得到的结果（按机器人序号）
+EXPECTED = [
+    {"totalDuration": 4350, "cumulativeAttributes": [3, 0, 2, 0, 0, 0, 0, 0], "runsPerDay": 19, "dailyEnergyConsumption": 19},
+    {"totalDuration": 2175, "cumulativeAttributes": [3, 0, 2, 0, 0, 0, 0, 0], "runsPerDay": 39, "dailyEnergyConsumption": 79},
+    {"totalDuration": 4195, "cumulativeAttributes": [24, 1, -53, 0, 40, 0, 0, -8], "runsPerDay": 20, "dailyEnergyConsumption": 61},
+    {"totalDuration": 4195, "cumulativeAttributes": [34, 2, -52, 0, 46, 0, 0, -10], "runsPerDay": 20, "dailyEnergyConsumption": 82},
+    {"totalDuration": 3176, "cumulativeAttributes": [37, 4, -5, 0, 63, 0, 0, 0], "runsPerDay": 27, "dailyEnergyConsumption": 136},
+    {"totalDuration": 481.5, "cumulativeAttributes": [31, 16, -19, 0, 25, 0, 0, -3], "runsPerDay": 179, "dailyEnergyConsumption": 1076},
+    {"totalDuration": 6760, "cumulativeAttributes": [0, 0, 0, 0, 0, 0, 0, 0], "runsPerDay": 12, "dailyEnergyConsumption": 89},
+]
+
+
+# 从用户脚本中截取一个函数的源码
+def extract_js_function(source, name):
+    start = source.index(f"function {name}(")
+    depth = 0
+    for position in range(source.index("{", start), len(source)):
+        if source[position] == "{":
+            depth += 1
+        elif source[position] == "}":
+            depth -= 1
+            if depth == 0:
+                return source[start:position + 1]
+    raise ValueError(f"未找到函数结尾: {name}")
+
+
+# 使用node运行用户脚本中的 processObjectsAndCards
+def run_userscript(objects, cards):
+    with open(USERSCRIPT, encoding="utf-8") as f:
+        source = f.read()
+    script = "\n".join([
+        "const Logger = {info() {}, debug() {}, warn() {}, error() {}};",
+        "function formatDuration(seconds) { return String(seconds); }",
+        extract_js_function(source, "adjustProcessingTimeBySpeed"),
+        extract_js_function(source, "processObjectsAndCards"),
+        f"console.log(JSON.stringify(processObjectsAndCards({json.dumps(objects)}, {json.dumps(cards)})));",
+    ])
+    output = subprocess.run(["node", "-e", script], capture_output=True, text=True, check=True).stdout
+    return sorted(json.loads(output), key=lambda item: item["index"])
+
+
+class ModifierParityTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(optimizer.use_problem(optimizer.Problem(CARDS)))
+
+    def assert_matches(self, summary, expected):
+        self.assertAlmostEqual(summary["totalDuration"], expected["totalDuration"])
+        self.assertEqual(summary["cumulativeAttributes"], expected["cumulativeAttributes"])
+        self.assertEqual(summary["runsPerDay"], expected["runsPerDay"])
+        self.assertEqual(summary["dailyEnergyConsumption"], expected["dailyEnergyConsumption"])
+
+    def test_summaries_match_recorded_userscript_results(self):
+        for index, (robot, expected) in enumerate(zip(OBJECTS, EXPECTED)):
+            with self.subTest(robot=index):
+                self.assert_matches(optimizer.summarize_robot(index, robot), expected)
+
+    def test_modifier_table_matches_per_card_accumulation(self):
+        for robot in OBJECTS:
+            table = optimizer.robot_card_attributes(robot["attributes"])
+            with optimizer.robot_modifiers(robot["attributes"]):
+                scores, net, _ = optimizer.evaluate_batch([robot["cards"]], allow_intermediate_negative=True)
+                np.testing.assert_array_equal(optimizer.get_problem().card_attributes, table)
+            np.testing.assert_array_equal(net[0], table[robot["cards"]].sum(axis=0))
+        # 离开上下文后恢复原始属性表
+        np.testing.assert_array_equal(optimizer.get_problem().card_attributes, np.array([card["attributes"] for card in CARDS]))
+
+    def test_offset_never_turns_negative_into_positive(self):
+        table = optimizer.apply_robot_modifiers(np.array([[-5, -1, 0, 3]]), [0, 0, 4, 3])
+        np.testing.assert_array_equal(table, [[-1, 0, 0, 5]])
+
+    @unittest.skipUnless(shutil.which("node"), "需要node运行用户脚本")
+    def test_summaries_match_live_userscript(self):
+        for index, (robot, expected) in enumerate(zip(OBJECTS, run_userscript(OBJECTS, CARDS))):
+            with self.subTest(robot=index):
+                self.assert_matches(optimizer.summarize_robot(index, robot), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
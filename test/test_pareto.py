@@ -0,0 +1,84 @@
+"""
+多目标优化测试: 在随机的小规模问题上检查 pareto_search 的前沿与穷举所有排列后两两比较得到的前沿一致
+
+可直接运行: python test/test_pareto.py
+"""
+
+import itertools
+import os
+import sys
+import unittest
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+
+LENGTH = 4
+
+
+# 随机生成小规模问题: 卡片属性有正有负，时长各不相同
+def random_problem(rng, num_cards):
+    cards = [{"duration": int(rng.integers(60, 200)), "attributes": rng.integers(-1, 4, size=8).tolist()}
+             for _ in range(num_cards)]
+    return optimizer.Problem(cards, rng.integers(1, 4, size=8).tolist())
+
+
+# 穷举所有排列，返回 {多重集: (纯增益属性, 时长)}，只包含存在有效排列且满足约束的多重集
+def feasible_multisets(allow_intermediate_negative, enforce_positive_attrs, constraints):
+    combinations = np.array(list(itertools.product(range(len(optimizer.get_problem())), repeat=LENGTH)))
+    scores, net, _ = optimizer.evaluate_batch(combinations, allow_intermediate_negative, enforce_positive_attrs)
+    durations = optimizer.robot_card_durations(0)[combinations].sum(axis=1)
+    feasible = {}
+    for combination, score, attrs, duration in zip(combinations, scores, net, durations):
+        if score == float('-inf') or any(attrs[attribute] < bound for attribute, bound in constraints.items()):
+            continue
+        feasible[tuple(sorted(combination))] = (attrs, duration)
+    return feasible
+
+
+# 两两比较得到前沿上的多重集
+def brute_force_front(feasible, attributes):
+    values = {key: np.append(attrs[attributes], -duration) for key, (attrs, duration) in feasible.items()}
+    return {key for key, value in values.items()
+            if not any(np.all(other >= value) and np.any(other > value) for other in values.values())}
+
+
+class ParetoSearchTest(unittest.TestCase):
+    def test_random_problems(self):
+        rng = np.random.default_rng(0)
+        for trial in range(8):
+            problem = random_problem(rng, num_cards=int(rng.integers(3, 5)))
+            attributes = sorted(rng.choice(8, size=int(rng.integers(1, 4)), replace=False).tolist())
+            for allow, enforce, constraints in itertools.product([False, True], [False, True], [{}, {attributes[0]: 1}]):
+                with self.subTest(trial=trial, attributes=attributes, allow_intermediate_negative=allow,
+                                  enforce_positive_attrs=enforce, constraints=constraints), optimizer.use_problem(problem):
+                    front, certificate = optimizer.pareto_search(attributes, constraints=constraints, length=LENGTH,
+                                                                 allow_intermediate_negative=allow,
+                                                                 enforce_positive_attrs=enforce)
+                    self.assertTrue(certificate["optimal"])
+                    feasible = feasible_multisets(allow, enforce, constraints)
+                    expected = brute_force_front(feasible, attributes)
+                    self.assertEqual({tuple(sorted(combination)) for combination, _, _ in front}, expected)
+                    self.assertEqual(certificate["size"], len(front))
+
+                    # 返回的组合本身有效，属性和时长与重新计算的一致
+                    for combination, attrs, duration in front:
+                        scores, net, _ = optimizer.evaluate_batch([combination], allow, enforce)
+                        self.assertNotEqual(scores[0], float('-inf'))
+                        self.assertEqual(np.asarray(attrs).tolist(), net[0].tolist())
+                        self.assertAlmostEqual(duration, optimizer.robot_card_durations(0)[combination].sum())
+
+                    # 前沿上的加权和最优解与在所有可行多重集中的最优解得分相同
+                    if feasible:
+                        weights = {attribute: 1.0 + index for index, attribute in enumerate(attributes)}
+                        best = max(sum(weight * attrs[attribute] for attribute, weight in weights.items()) - 0.01 * duration
+                                   for attrs, duration in feasible.values())
+                        _, attrs, duration = optimizer.select_from_front(front, weights, duration_weight=0.01)
+                        self.assertAlmostEqual(sum(weight * attrs[attribute] for attribute, weight in weights.items())
+                                               - 0.01 * duration, best)
+
+
+if __name__ == "__main__":
+    unittest.main()
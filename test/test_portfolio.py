@@ -0,0 +1,74 @@
+"""
+限时组合求解测试: 检查各策略提交的解都按求解模式重新评估，不满足约束的高分解不会成为结果或抬高精确搜索的剪枝阈值
+
+可直接运行: python test/test_portfolio.py
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+
+# 卡片0得分更高但会让第二个属性的纯增益为负，唯一满足最终属性非负的组合是8张卡片1
+CARDS = [
+    {"duration": 100, "attributes": [5, -1, 0, 0, 0, 0, 0, 0]},
+    {"duration": 100, "attributes": [1, 0, 0, 0, 0, 0, 0, 0]},
+]
+LOCAL = [100] * 8
+
+# 不满足最终属性非负、但按不要求非负计算得分更高的组合
+INFEASIBLE = [1, 0, 0, 1, 1, 0, 0, 0]
+
+
+class PortfolioTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(optimizer.use_problem(optimizer.Problem(CARDS, LOCAL)))
+
+    def test_enforce_positive_attrs(self):
+        for strategies in (["annealing"], ["genetic"], ["annealing", "genetic", "exact"], None):
+            with self.subTest(strategies=strategies):
+                combination, score, attributes, report = optimizer.portfolio_solve(
+                    0.5, strategies=strategies, enforce_positive_attrs=True, seed=0)
+                self.assertEqual(combination, [1] * 8)
+                self.assertEqual(score, 8)
+                self.assertTrue(all(attributes >= 0))
+                if strategies is None or "exact" in strategies:
+                    self.assertTrue(report["optimal"])
+
+    def test_rescores_strategy_results(self):
+        # 即使随机策略返回了不满足约束的解，也不能成为结果或抬高精确搜索的剪枝阈值
+        scores, attrs, _ = optimizer.evaluate_batch([INFEASIBLE])
+        annealing = mock.patch("card_optimizer.portfolio._annealing_run",
+                               return_value=(0, INFEASIBLE, scores[0], attrs[0], None))
+        genetic = mock.patch("card_optimizer.portfolio.genetic_algorithm",
+                             return_value=(INFEASIBLE, scores[0], attrs[0]))
+        with annealing, genetic:
+            for strategies in (["annealing"], ["genetic"], ["annealing", "genetic", "exact"]):
+                with self.subTest(strategies=strategies):
+                    combination, score, _, report = optimizer.portfolio_solve(
+                        0.2, strategies=strategies, enforce_positive_attrs=True, seed=0)
+                    if "exact" in strategies:
+                        self.assertEqual(combination, [1] * 8)
+                        self.assertEqual(score, 8)
+                        self.assertTrue(report["optimal"])
+                    else:
+                        self.assertIsNone(combination)
+                        self.assertEqual(score, float('-inf'))
+
+    def test_matches_exact_search(self):
+        for allow in (False, True):
+            with self.subTest(allow_intermediate_negative=allow):
+                expected, _ = optimizer.exact_search(top_k=1, allow_intermediate_negative=allow)
+                combination, score, _, report = optimizer.portfolio_solve(1.0, allow_intermediate_negative=allow, seed=0)
+                self.assertTrue(report["optimal"])
+                self.assertEqual(score, expected[0][1])
+                scores, _, _ = optimizer.evaluate_batch([combination], allow_intermediate_negative=allow)
+                self.assertEqual(scores[0], score)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+假设分析测试: 检查 what_if 的结果与在每个场景的卡片集合上单独搜索一致
+
+可直接运行: python test/test_sensitivity.py
+"""
+
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+from card_optimizer.incremental import apply_card_diff
+
+# 测试用卡片
+CARDS = [
+    {"duration": 100, "attributes": [-2, -2, 4, 0, 0, 0, 0, 0]},
+    {"duration": 110, "attributes": [3, 0, -2, 0, 0, 0, 0, 0]},
+    {"duration": 120, "attributes": [0, 3, -2, 0, 0, 0, 0, 0]},
+    {"duration": 169, "attributes": [1, 0, 0, 0, 0, 0, 0, 0]},
+]
+LOCAL = [2, 2, 2, 0, 0, 0, 0, 0]
+
+# 新增的卡片，A 比原有的卡片都好
+CARD_A = {"duration": 90, "attributes": [2, 2, 0, 0, 0, 0, 0, 0]}
+CARD_B = {"duration": 80, "attributes": [0, -1, 3, 0, 0, 0, 0, 0]}
+
+
+class WhatIfTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(optimizer.use_problem(optimizer.Problem(CARDS, LOCAL)))
+
+    def assert_matches_separate_search(self, scenario, result, top_k):
+        problem, _ = apply_card_diff(scenario.get("add"), scenario.get("remove"))
+        self.assertEqual(result["cards"], len(problem))
+        # 相同的卡片重复新增不会产生新的组合，参照搜索中每种新卡片只加入一次
+        unique = list({(card["duration"], tuple(card["attributes"])): card for card in scenario.get("add") or []}.values())
+        reference, _ = apply_card_diff(unique, scenario.get("remove"))
+        with optimizer.use_problem(reference):
+            expected, _ = optimizer.multiset_search(top_k=top_k, allow_intermediate_negative=False)
+        with optimizer.use_problem(problem):
+            for combination, score, attrs in result["solutions"]:
+                self.assertTrue(all(0 <= card < len(problem) for card in combination))
+                scores, net, _ = optimizer.evaluate_batch([combination], allow_intermediate_negative=False)
+                self.assertEqual(scores[0], score)
+                self.assertEqual(net[0].tolist(), attrs.tolist())
+        self.assertEqual([score for _, score, _ in result["solutions"]], [score for _, score, _ in expected])
+
+    def test_repeated_additions_use_valid_card_indices(self):
+        scenarios = [{}, {"add": [CARD_A, CARD_A, CARD_B]}, {"add": [CARD_B, CARD_A, CARD_A]},
+                     {"add": [CARD_A, CARD_A], "remove": [0, 1]}]
+        results, report = optimizer.what_if(scenarios, top_k=3)
+        self.assertEqual(report["scenarios"], len(scenarios))
+        for scenario, result in zip(scenarios, results):
+            with self.subTest(scenario=scenario):
+                self.assert_matches_separate_search(scenario, result, top_k=3)
+        # 新增 A 的场景中最优组合全部由 A 组成，使用第一张 A 的编号
+        self.assertEqual(results[1]["solutions"][0][0], [4] * 8)
+        self.assertEqual(results[2]["solutions"][0][0], [5] * 8)
+        self.assertEqual(results[3]["solutions"][0][0], [2] * 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+优化服务测试: 通过HTTP发送请求，检查结果与直接搜索一致、相同的请求命中缓存，以及无效的请求返回400
+
+可直接运行: python test/test_service.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+from card_optimizer.service import OptimizationService, RequestError, parse_request, request_key
+
+# 测试用卡片
+CARDS = [
+    {"duration": 100, "attributes": [-2, -2, 4, 0, 0, 0, 0, 0]},
+    {"duration": 110, "attributes": [3, 0, -2, 0, 0, 0, 0, 0]},
+    {"duration": 120, "attributes": [0, 3, -2, 0, 0, 0, 0, 0]},
+    {"duration": 169, "attributes": [1, 0, 0, 0, 0, 0, 0, 0]},
+]
+LOCAL = [2, 2, 2, 0, 0, 0, 0, 0]
+PAYLOAD = {"player": {"data": {"cards": CARDS, "local": LOCAL, "objects": [{"cards": [], "attributes": [0, 0, 1, 3]}]}}}
+
+
+# 发送一个HTTP请求，返回 (状态码, 响应JSON)
+async def http_request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    content = b"" if body is None else (body if isinstance(body, bytes) else json.dumps(body).encode("utf-8"))
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(content)}\r\n\r\n".encode("latin-1")
+                 + content)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(content) if content else None
+
+
+class ServiceTest(unittest.TestCase):
+    def setUp(self):
+        executor = self.enterContext(ThreadPoolExecutor(max_workers=2))
+        self.service = OptimizationService(executor=executor)
+
+    # 启动服务，依次发送请求并返回所有响应
+    def exchange(self, requests):
+        async def run():
+            server = await asyncio.start_server(self.service.handle_connection, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return [await http_request(port, *request) for request in requests]
+        return asyncio.run(run())
+
+    def test_round_trip(self):
+        payload = dict(PAYLOAD, options={"top_k": 3})
+        (status, first), (status_again, second), (health_status, health) = self.exchange(
+            [("POST", "/optimize", payload), ("POST", "/optimize", payload), ("GET", "/health")])
+        self.assertEqual((status, status_again, health_status), (200, 200, 200))
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(first["solutions"], second["solutions"])
+        self.assertEqual((health["hits"], health["misses"]), (1, 1))
+
+        with optimizer.use_problem(optimizer.Problem(CARDS, LOCAL)):
+            expected, certificate = optimizer.exact_search(top_k=3)
+        self.assertEqual(first["optimal"], certificate["optimal"])
+        self.assertEqual([(solution["combination"], solution["score"], solution["attributes"]) for solution in first["solutions"]],
+                         [(combination, score, attrs.tolist()) for combination, score, attrs in expected])
+
+    def test_bad_requests(self):
+        data = PAYLOAD["player"]["data"]
+        cases = [
+            b"not json",
+            [],
+            {"options": {"top_k": 3}},
+            dict(PAYLOAD, options={"unknown": 1}),
+            dict(PAYLOAD, options={"top_k": 0}),
+            dict(PAYLOAD, options={"robot": 5}),
+            {"data": dict(data, local=[1, 2, 3])},
+            {"data": dict(data, local="1,2,3")},
+            {"data": dict(data, local=[0] * 7 + ["x"])},
+            {"data": dict(data, cards=[{"duration": 100, "attributes": [1, 2]}])},
+            {"data": dict(data, cards=[{"duration": "100", "attributes": [0] * 8}])},
+            {"data": dict(data, cards=[{"attributes": [0] * 8}])},
+            {"data": dict(data, cards=[[100, [0] * 8]])},
+            {"data": dict(data, objects=[{"attributes": [0, "fast"]}]), "options": {"robot": 0}},
+        ]
+        responses = self.exchange([("POST", "/optimize", case) for case in cases])
+        for case, (status, body) in zip(cases, responses):
+            with self.subTest(case=case):
+                self.assertEqual(status, 400)
+                self.assertIn("error", body)
+        self.assertEqual(self.exchange([("GET", "/unknown")])[0][0], 404)
+
+    def test_unused_options_do_not_change_the_key(self):
+        # seed 和 budget 不影响精确搜索的结果，time_limit 不影响模拟退火的结果
+        key = request_key(parse_request(dict(PAYLOAD, options={"algorithm": "exact"})))
+        self.assertEqual(request_key(parse_request(dict(PAYLOAD, options={"algorithm": "exact", "seed": 7, "budget": 1.0}))), key)
+        self.assertNotEqual(request_key(parse_request(dict(PAYLOAD, options={"algorithm": "exact", "time_limit": 1.0}))), key)
+        key = request_key(parse_request(dict(PAYLOAD, options={"algorithm": "annealing"})))
+        self.assertEqual(request_key(parse_request(dict(PAYLOAD, options={"algorithm": "annealing", "time_limit": 1.0}))), key)
+        self.assertNotEqual(request_key(parse_request(dict(PAYLOAD, options={"algorithm": "annealing", "seed": 7}))), key)
+        with self.assertRaises(RequestError):
+            parse_request(dict(PAYLOAD, options={"algorithm": "exact", "seed": "7"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
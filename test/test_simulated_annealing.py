@@ -0,0 +1,48 @@
+"""
+模拟退火测试: 要求最终属性非负时，检查初始解和重启解也满足该约束，不会因为从不可行的解出发而丢失可行解
+
+可直接运行: python test/test_simulated_annealing.py
+"""
+
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+
+# 卡片0得分更高但会让第二个属性的纯增益为负，唯一满足最终属性非负的组合是8张卡片1
+CARDS = [
+    {"duration": 100, "attributes": [5, -1, 0, 0, 0, 0, 0, 0]},
+    {"duration": 100, "attributes": [1, 0, 0, 0, 0, 0, 0, 0]},
+]
+LOCAL = [100] * 8
+
+
+class SimulatedAnnealingTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(optimizer.use_problem(optimizer.Problem(CARDS, LOCAL)))
+
+    def test_enforce_positive_attrs(self):
+        for allow in (False, True):
+            with self.subTest(allow_intermediate_negative=allow):
+                solution, score, attrs, solutions = optimizer.simulated_annealing(
+                    iterations=500, num_runs=5, allow_intermediate_negative=allow, enforce_positive_attrs=True, seed=0)
+                self.assertEqual(solution, [1] * 8)
+                self.assertEqual(score, 8)
+                self.assertTrue(all(attrs >= 0))
+                self.assertEqual(len(solutions), 1)
+
+    def test_infeasible_initial_solution(self):
+        # 传入不满足约束的初始解时，从随机可行解重新开始
+        _, solution, score, attrs, _ = optimizer.search._annealing_run(
+            0, 0, initial_temp=10, cooling_rate=0.97, iterations=200, allow_intermediate_negative=False,
+            enforce_positive_attrs=True, neighborhood_size=32, objective=optimizer.get_objective(),
+            initial=[0, 1, 1, 1, 1, 1, 1, 1])
+        self.assertEqual(solution, [1] * 8)
+        self.assertEqual(score, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+生产模拟测试: 检查资源不足时机器人停顿、其他机器人产出后继续，能量不足时停止，以及没有资源竞争时与静态估计一致
+
+可直接运行: python test/test_simulator.py
+"""
+
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+from card_optimizer.simulator import OUT_OF_ENERGY, RUNNING, STALLED
+
+# 测试用卡片: 卡片0消耗2个资源0，卡片1产出3个资源0，卡片2只产出资源1；每张卡片运行 100*5 秒
+CARDS = [
+    {"duration": 100, "attributes": [-2, 1, 0, 0, 0, 0, 0, 0]},
+    {"duration": 100, "attributes": [3, 0, 0, 0, 0, 0, 0, 0]},
+    {"duration": 100, "attributes": [0, 1, 0, 0, 0, 0, 0, 0]},
+]
+LOCAL = [5, 0, 0, 0, 0, 0, 0, 0]
+CONSUMER = {"cards": [0] * 8, "attributes": [0, 0, 0, 0]}
+PRODUCER = {"cards": [1] * 8, "attributes": [0, 0, 0, 0]}
+
+
+class SimulatorTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(optimizer.use_problem(optimizer.Problem(CARDS, LOCAL)))
+
+    def test_stalls_when_resources_run_out(self):
+        result = optimizer.simulate([CONSUMER])
+        robot = result["robots"][0]
+        # 资源0只够开始两张卡片，第二张结束（1000秒）后一直停顿到模拟结束
+        self.assertEqual(robot["status"], STALLED)
+        self.assertEqual(robot["steps"], 2)
+        self.assertEqual(robot["runs"], 0)
+        self.assertEqual(robot["stall_time"], result["horizon"] - 1000)
+        self.assertEqual(result["local"][:2], [1, 2])
+        self.assertEqual(result["produced"][:2], [-4, 2])
+
+    def test_resumes_after_another_robot_produces(self):
+        # 生产者每轮（4000秒）只产出3个资源0，少于消费者的消耗，因此消费者经常停顿，但每次产出后继续推进
+        producer_robot = {"cards": [1] + [2] * 7, "attributes": [0, 0, 0, 0]}
+        result = optimizer.simulate([CONSUMER, producer_robot])
+        consumer, producer = result["robots"]
+        self.assertGreater(consumer["stall_time"], 0)
+        self.assertGreater(consumer["steps"], 2)
+        self.assertEqual(producer["stall_time"], 0)
+        self.assertEqual(producer["runs"], result["horizon"] // 4000)
+        self.assertTrue(all(value >= 0 for value in result["local"]))
+        self.assertEqual(result["produced"], [a + b for a, b in zip(consumer["produced"], producer["produced"])])
+        self.assertEqual(result["output"], sum(result["produced"]))
+
+    def test_stops_when_energy_runs_out(self):
+        # 机器人0每轮消耗1点能量，机器人1每轮消耗2点；只有1点能量时只有机器人0完成一轮
+        result = optimizer.simulate([PRODUCER, PRODUCER], energy=1)
+        first, second = result["robots"]
+        self.assertEqual((first["status"], first["runs"], first["energy_used"]), (OUT_OF_ENERGY, 1, 1))
+        self.assertEqual((second["status"], second["runs"], second["energy_used"]), (OUT_OF_ENERGY, 0, 0))
+        self.assertEqual(result["energy_used"], 1)
+
+    def test_matches_static_estimate_without_contention(self):
+        robot = {"cards": [2] * 8, "attributes": [0, 50, 0, 0]}
+        result = optimizer.simulate([robot])
+        summary = optimizer.summarize_robot(0, robot)
+        self.assertEqual(result["robots"][0]["status"], RUNNING)
+        self.assertEqual(result["robots"][0]["runs"], summary["runsPerDay"])
+        self.assertEqual(result["robots"][0]["cycle_time"], summary["totalDuration"])
+        self.assertEqual(result["produced"][1], 8 * summary["runsPerDay"] + result["robots"][0]["steps"] % 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+解存储测试: 检查结果写入后能按规范指纹读回（卡片顺序不同时映射回当前编号），以及超过记录数上限时按最久未使用淘汰
+
+可直接运行: python test/test_store.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+
+# 测试用卡片
+CARDS = [
+    {"duration": 100, "attributes": [-2, -2, 4, 0, 0, 0, 0, 0]},
+    {"duration": 110, "attributes": [3, 0, -2, 0, 0, 0, 0, 0]},
+    {"duration": 120, "attributes": [0, 3, -2, 0, 0, 0, 0, 0]},
+    {"duration": 169, "attributes": [1, 0, 0, 0, 0, 0, 0, 0]},
+]
+LOCAL = [2, 2, 2, 0, 0, 0, 0, 0]
+
+
+class SolutionStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(optimizer.use_problem(optimizer.Problem(CARDS, LOCAL)))
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.path = os.path.join(directory, "solutions.sqlite")
+        self.objective = optimizer.get_objective()
+
+    def test_round_trip(self):
+        with optimizer.SolutionStore(self.path) as store:
+            solutions, certificate = optimizer.exact_search(top_k=3, store=store)
+            self.assertTrue(certificate["optimal"])
+            self.assertFalse(certificate.get("store_hit"))
+            self.assertEqual(len(store), 1)
+            stored, stored_certificate = optimizer.exact_search(top_k=3, store=store)
+            self.assertTrue(stored_certificate["store_hit"])
+            # 需要更多的解或者约束不同时不能使用这条记录
+            self.assertIsNone(store.lookup(5, self.objective))
+            self.assertIsNone(store.lookup(3, self.objective, allow_intermediate_negative=True))
+            self.assertEqual(len(store.lookup(2, self.objective)[0]), 2)
+        self.assertEqual([(combination, score, np.asarray(attrs).tolist()) for combination, score, attrs in stored],
+                         [(combination, score, np.asarray(attrs).tolist()) for combination, score, attrs in solutions])
+
+        # 重新打开文件、并且卡片顺序反转后，组合映射回新的卡片编号
+        with optimizer.SolutionStore(self.path) as store, \
+                optimizer.use_problem(optimizer.Problem(CARDS[::-1], LOCAL)):
+            reversed_solutions, metadata = store.lookup(3, self.objective)
+            self.assertTrue(metadata["optimal"])
+            self.assertEqual([[len(CARDS) - 1 - card for card in combination] for combination, _, _ in reversed_solutions],
+                             [combination for combination, _, _ in solutions])
+            scores, _, _ = optimizer.evaluate_batch([combination for combination, _, _ in reversed_solutions])
+            self.assertEqual(scores.tolist(), [score for _, score, _ in solutions])
+
+    def test_export_import(self):
+        export_path = os.path.join(os.path.dirname(self.path), "solutions.jsonl")
+        with optimizer.SolutionStore(self.path) as store:
+            solutions, _ = optimizer.exact_search(top_k=3, store=store)
+            self.assertEqual(store.export_jsonl(export_path), 1)
+        with optimizer.SolutionStore(":memory:") as store:
+            self.assertEqual(store.import_jsonl(export_path), 1)
+            # 已有相同的记录时不再写入
+            self.assertEqual(store.import_jsonl(export_path), 0)
+            imported, metadata = store.lookup(3, self.objective)
+        self.assertTrue(metadata["optimal"])
+        self.assertEqual([score for _, score, _ in imported], [score for _, score, _ in solutions])
+
+    def test_keeps_better_record(self):
+        with optimizer.SolutionStore(self.path) as store:
+            solutions, certificate = optimizer.exact_search(top_k=3)
+            self.assertTrue(store.save(solutions, certificate, 3, self.objective))
+            # 未证明最优的结果不会覆盖已证明最优的记录
+            self.assertFalse(store.save(solutions[:1], {"optimal": False}, 1, self.objective))
+            self.assertEqual(len(store.lookup(3, self.objective)[0]), 3)
+
+    def test_evicts_least_recently_used(self):
+        with optimizer.SolutionStore(self.path, max_entries=2) as store:
+            for length in (2, 3):
+                solutions, certificate = optimizer.exact_search(top_k=1, length=length)
+                store.save(solutions, certificate, 1, self.objective, length)
+            # 读取长度为2的记录后，它比长度为3的记录更晚使用
+            self.assertIsNotNone(store.lookup(1, self.objective, 2))
+            solutions, certificate = optimizer.exact_search(top_k=1, length=4)
+            store.save(solutions, certificate, 1, self.objective, 4)
+            self.assertEqual(len(store), 2)
+            self.assertIsNotNone(store.lookup(1, self.objective, 2))
+            self.assertIsNone(store.lookup(1, self.objective, 3))
+            self.assertIsNotNone(store.lookup(1, self.objective, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
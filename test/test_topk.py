@@ -0,0 +1,104 @@
+"""
+前K个解收集器测试: 检查堆替换后的结果与稳定排序后取前K个一致，以及最小汉明距离的替换规则
+
+可直接运行: python test/test_topk.py
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_ROOT)
+import card_optimizer as optimizer
+
+# 测试用卡片，TopK 只用到卡片数量
+CARDS = [{"duration": 100, "attributes": [card, 0, 0, 0, 0, 0, 0, 0]} for card in range(5)]
+LOCAL = [0, 0, 0, 0, 0, 0, 0, 0]
+
+
+class TopKTest(unittest.TestCase):
+    def setUp(self):
+        self.enterContext(optimizer.use_problem(optimizer.Problem(CARDS, LOCAL)))
+
+    def test_requires_positive_k(self):
+        for k in (0, -1):
+            with self.subTest(k=k), self.assertRaises(ValueError):
+                optimizer.TopK(k)
+
+    def test_matches_stable_sort(self):
+        rng = np.random.default_rng(0)
+        for k in (1, 3, 10):
+            with self.subTest(k=k):
+                top = optimizer.TopK(k)
+                # 得分只取少数几个值，使相同得分和重复组合都经常出现；提交次数远多于K，堆会多次替换和重建
+                combinations = rng.integers(0, len(CARDS), size=(2000, 3))
+                scores = rng.integers(0, 20, size=2000).astype(float)
+                scores[rng.random(2000) < 0.1] = float('-inf')
+                for start in range(0, 2000, 100):
+                    if start % 200:
+                        top.offer_batch(combinations[start:start + 100], scores[start:start + 100])
+                    else:
+                        for combination, score in zip(combinations[start:start + 100], scores[start:start + 100]):
+                            top.offer(combination, score)
+
+                # 参照: 每个组合只保留第一次以最高得分出现的记录，再按得分降序、出现顺序稳定排序
+                best = {}
+                for index, (combination, score) in enumerate(zip(map(tuple, combinations.tolist()), scores)):
+                    if score > float('-inf') and (combination not in best or score > best[combination][0]):
+                        best[combination] = (score, index)
+                expected = sorted(best.items(), key=lambda item: (-item[1][0], item[1][1]))[:k]
+                self.assertEqual([(combination, score) for combination, score, _ in top.results()],
+                                 [(list(combination), score) for combination, (score, _) in expected])
+                self.assertEqual(top.threshold, expected[-1][1][0])
+
+    def test_threshold_before_full(self):
+        top = optimizer.TopK(2)
+        self.assertEqual(top.threshold, float('-inf'))
+        self.assertFalse(top.offer([0, 1], float('-inf')))
+        self.assertTrue(top.offer([0, 1], 5))
+        self.assertFalse(top.offer([0, 1], 6))  # 相同组合只保留第一次
+        self.assertEqual(top.threshold, float('-inf'))
+        self.assertTrue(top.offer([1, 1], 3))
+        self.assertEqual(top.threshold, 3)
+        self.assertFalse(top.offer([2, 2], 3))  # 得分相同时先加入的优先
+        self.assertTrue(top.offer([2, 2], 4))
+        self.assertEqual([(combination, score) for combination, score, _ in top.results()], [([0, 1], 5), ([2, 2], 4)])
+
+    def test_diversity_replacement(self):
+        top = optimizer.TopK(3, min_distance=2)
+        self.assertTrue(top.offer([0, 0, 0, 0], 10))
+        self.assertTrue(top.offer([1, 1, 1, 1], 8))
+        # 与 [0, 0, 0, 0] 只有一个位置不同: 得分不高于它时拒绝，高于它时替换它
+        self.assertFalse(top.offer([0, 0, 0, 4], 9))
+        self.assertFalse(top.offer([0, 0, 0, 4], 10))
+        self.assertTrue(top.offer([0, 0, 0, 4], 11))
+        self.assertEqual([(combination, score) for combination, score, _ in top.results()],
+                         [([0, 0, 0, 4], 11), ([1, 1, 1, 1], 8)])
+
+        # 同时与两个已保留的解冲突: 只有得分高于所有冲突的解才替换它们
+        self.assertTrue(top.offer([1, 1, 0, 4], 7))
+        self.assertFalse(top.offer([0, 1, 0, 4], 9))
+        self.assertTrue(top.offer([0, 1, 0, 4], 12))
+        self.assertEqual([(combination, score) for combination, score, _ in top.results()],
+                         [([0, 1, 0, 4], 12), ([1, 1, 1, 1], 8)])
+
+    def test_diversity_random(self):
+        rng = np.random.default_rng(1)
+        for min_distance in (2, 3):
+            with self.subTest(min_distance=min_distance):
+                top = optimizer.TopK(5, min_distance)
+                top.offer_batch(rng.integers(0, len(CARDS), size=(3000, 4)), rng.random(3000))
+                results = top.results()
+                self.assertEqual(len(results), 5)
+                combinations = np.array([combination for combination, _, _ in results])
+                distances = np.count_nonzero(combinations[:, None] != combinations[None, :], axis=2)
+                self.assertTrue(np.all(distances[~np.eye(len(results), dtype=bool)] >= min_distance))
+                scores = [score for _, score, _ in results]
+                self.assertEqual(scores, sorted(scores, reverse=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
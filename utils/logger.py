@@ -1,14 +1,29 @@
 """
 日志模块: 配置和管理日志输出
+
+导入本模块不会创建目录或打开文件；第一次输出日志时才调用 configure_logging() 完成配置。
+配置后 get_logger() 返回的日志记录器不设置自己的级别，由根日志记录器的级别（configure_logging 的 level）决定，
+例如 configure_logging(level=logging.DEBUG) 会开启逐个候选解的追踪。
+
+默认使用异步模式: 根日志记录器只把日志放入队列，由后台线程写入文件和控制台，
+搜索循环中的 logger.info 不再等待磁盘和终端。日志文件按大小（或按时间）轮转，不会无限增长。
+进程池的工作进程:
+  - fork 启动的进程继承 process_safe=True 时的进程间队列，日志仍由主进程写入；
+    使用线程队列时，fork 出的进程改为直接写入（不轮转）
+  - spawn 启动的进程用 initializer=configure_worker_logging, initargs=(logging_queue(),) 把日志发回主进程
 """
 
 import os
+import atexit
 import logging
+import logging.handlers
+import multiprocessing
+import queue
+import sys
 from datetime import datetime
 
-# 创建日志目录
+# 日志目录
 log_dir = os.path.join('data', "logs")
-os.makedirs(log_dir, exist_ok=True)
 
 # 定义颜色
 class ColoredFormatter(logging.Formatter):
@@ -36,25 +51,173 @@ class ColoredFormatter(logging.Formatter):
 log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 date_format = "%Y-%m-%d %H:%M:%S"
 
-# 创建日志文件路径
-log_file = os.path.join(log_dir, f"app_{datetime.now().strftime('%Y%m%d')}.log")
+# 日志文件轮转: 按大小轮转时单个文件的上限，以及保留的旧文件数量
+max_bytes = 10 * 1024 * 1024
+backup_count = 5
+
+_configured = False
+_queue = None       # 异步模式的日志队列
+_listener = None    # 从队列取出日志并写入的后台线程
+_process_safe = False
+_log_file = None
+_color = False
+
+class _ThreadQueueHandler(logging.handlers.QueueHandler):
+    """
+    放入线程队列的处理器
+
+    标准的 QueueHandler 在调用线程中格式化消息并复制日志记录，以便跨进程传递；
+    同一进程内不需要复制，没有格式化参数（本项目的日志都用 f-string）时直接把记录交给后台线程格式化。
+    """
+
+    def prepare(self, record):
+        if record.args or record.exc_info:
+            return super().prepare(record)
+        return record
+
+# 控制台是否使用颜色: 输出到终端且未设置 NO_COLOR 环境变量时才使用
+def _use_color(stream):
+    return hasattr(stream, "isatty") and stream.isatty() and not os.environ.get("NO_COLOR")
+
+# 创建写入文件和控制台的处理器
+def _create_handlers(rotation):
+    file_formatter = logging.Formatter(log_format, date_format)
+    if rotation == "time":
+        # 每天零点切换到新文件，保留 backup_count 天
+        file_handler = logging.handlers.TimedRotatingFileHandler(_log_file, when="midnight", backupCount=backup_count,
+                                                                 encoding='utf-8')
+    elif rotation == "size":
+        file_handler = logging.handlers.RotatingFileHandler(_log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                                            encoding='utf-8')
+    else:
+        file_handler = logging.FileHandler(_log_file, encoding='utf-8', delay=True)
+    file_handler.setFormatter(file_formatter)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(ColoredFormatter(log_format, date_format) if _color else file_formatter)
+    return [file_handler, console_handler]
+
+def configure_logging(asynchronous=True, process_safe=False, rotation="size", color=None, level=logging.INFO):
+    """
+    配置日志输出: 创建日志目录、日志文件和控制台输出
+
+    只在第一次调用时生效；如果根日志记录器已经由调用方配置了处理器，则保留调用方的配置。
+    需要非默认的配置时，应在输出第一条日志之前调用。
+
+    Args:
+        asynchronous (bool): 是否通过队列和后台线程写入日志；为 False 时在调用线程中直接写入
+        process_safe (bool): 是否使用进程间队列，使进程池工作进程的日志也由主进程统一写入和轮转
+        rotation (str, optional): "size" 按文件大小轮转（app_日期.log，上限 max_bytes），
+            "time" 每天零点轮转（app.log），None 不轮转
+        color (bool, optional): 控制台是否使用颜色，默认只在输出到终端时使用
+        level (int): 根日志记录器的级别
+    """
+    global _configured, _queue, _listener, _process_safe, _log_file, _color
+    if _configured:
+        return
+    _configured = True
+    _release_level()
+    if logging.getLogger().handlers:
+        return
+
+    # 创建日志目录和日志文件路径
+    os.makedirs(log_dir, exist_ok=True)
+    name = "app.log" if rotation == "time" else f"app_{datetime.now().strftime('%Y%m%d')}.log"
+    _log_file = os.path.join(log_dir, name)
+    _color = _use_color(sys.stderr) if color is None else color
+    handlers = _create_handlers(rotation)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if not asynchronous:
+        for handler in handlers:
+            root.addHandler(handler)
+        return
 
-# 创建文件处理器
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setFormatter(logging.Formatter(log_format, date_format))
+    _process_safe = process_safe
+    # 用 spawn 上下文创建: 可以传给 spawn 启动的工作进程，fork 出的进程也能直接继承
+    _queue = multiprocessing.get_context("spawn").Queue(-1) if process_safe else queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(_queue) if process_safe else _ThreadQueueHandler(_queue))
+    _listener = logging.handlers.QueueListener(_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
 
-# 创建控制台处理器
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(ColoredFormatter(log_format, date_format))
+def stop_logging():
+    """写完队列中剩余的日志并停止后台线程；之后的日志在调用线程中直接写入"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    for handler in listener.handlers:
+        root.addHandler(handler)
 
-# 配置根日志记录器
-logging.basicConfig(
-    level=logging.INFO,
-    handlers=[file_handler, console_handler]
-)
+def logging_queue():
+    """返回进程间日志队列，传给 spawn 启动的工作进程的 configure_worker_logging；未使用 process_safe 时返回 None"""
+    configure_logging()
+    return _queue if _process_safe and _listener is not None else None
 
-# 创建日志记录器
+def configure_worker_logging(log_queue=None):
+    """
+    进程池工作进程的 initializer: 把日志放入主进程的队列
+
+    Args:
+        log_queue (optional): logging_queue() 的返回值；为 None 时工作进程按默认方式自行配置
+    """
+    global _configured
+    if log_queue is None:
+        return
+    _configured = True
+    _release_level()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+
+# fork 出的子进程中没有后台线程: 线程队列中的日志永远不会被写入，因此改为直接写入（由主进程负责轮转）
+def _after_fork_in_child():
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None or _process_safe:
+        return
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    for handler in _create_handlers(None):
+        root.addHandler(handler)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+class _DeferredConfigHandler(logging.Handler):
+    """第一条日志到达时完成配置，之后这条日志照常传递给根日志记录器的处理器"""
+
+    def emit(self, record):
+        if not _configured:
+            configure_logging()
+
+# 创建日志记录器，配置后级别由根日志记录器决定
 logger = logging.getLogger("article_generator")
+logger.addHandler(_DeferredConfigHandler())
+
+# 配置前根日志记录器为默认的 WARNING，INFO 日志到不了 _DeferredConfigHandler；
+# 因此暂时把级别设为 INFO，让第一条 INFO 日志触发配置，配置后恢复为 NOTSET。调用方已设置的级别保持不变
+_pinned_level = not logging.getLogger().handlers and logger.level == logging.NOTSET
+if _pinned_level:
+    logger.setLevel(logging.INFO)
+
+# 配置完成后取消暂时设置的级别
+def _release_level():
+    global _pinned_level
+    if _pinned_level:
+        _pinned_level = False
+        logger.setLevel(logging.NOTSET)
 
 def get_logger(name=None):
     """
@@ -68,4 +231,4 @@ def get_logger(name=None):
     """
     if name:
         return logging.getLogger(f"article_generator.{name}")
-    return logger 
\ No newline at end of file
+    return logger
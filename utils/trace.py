@@ -0,0 +1,306 @@
+"""
+追踪模块: 搜索算法的分级追踪、周期性进度事件，以及可选的搜索统计和性能分析
+"""
+
+import cProfile
+import csv
+import functools
+import io
+import json
+import logging
+import pstats
+import time
+from contextlib import contextmanager, nullcontext
+
+from utils.logger import configure_logging, get_logger
+
+
+def trace_enabled(logger):
+    """
+    判断是否需要输出逐个候选解的追踪信息
+
+    只有在 DEBUG 级别开启时才值得构造追踪内容，调用方应先用它判断再格式化消息。
+    日志尚未配置时先按默认方式配置，使 configure_logging(level=...) 或调用方设置的根日志记录器级别生效。
+
+    Args:
+        logger (logging.Logger): 日志记录器
+
+    Returns:
+        bool: DEBUG 级别是否开启
+    """
+    configure_logging()
+    return logger.isEnabledFor(logging.DEBUG)
+
+
+class SearchProgress:
+    """
+    搜索进度统计
+
+    算法在主循环中调用 update() 累加计数，只有距上次输出超过 interval 秒时才输出一条
+    结构化的进度事件（候选解/秒、最佳得分、接受率、重启次数），因此不会在每个候选解上产生I/O。
+    事件内容同时以 key=value 形式写入消息，并通过 extra 的 event 字段提供给日志处理器。
+    """
+
+    def __init__(self, algorithm, logger=None, interval=5.0, instrument=None):
+        self.algorithm = algorithm
+        self.logger = logger or get_logger("search")
+        self.interval = interval
+        self.instrument = instrument
+        self.candidates = 0
+        self.proposed = 0
+        self.accepted = 0
+        self.restarts = 0
+        self.infeasible = 0
+        self.cache_hits = 0
+        self.best_score = float('-inf')
+        self.start_time = time.perf_counter()
+        self._last_report = self.start_time
+        self._enabled = self.logger.isEnabledFor(logging.INFO)
+        if instrument is not None:
+            instrument.start(algorithm, self.start_time)
+
+    def update(self, candidates=0, proposed=0, accepted=0, restarts=0, best_score=None, infeasible=0, cache_hits=0):
+        """
+        累加计数，到达输出间隔时输出一条进度事件
+
+        Args:
+            candidates (int): 本次评估的候选解数量
+            proposed (int): 本次提出的移动数量
+            accepted (int): 本次接受的移动数量
+            restarts (int): 本次重启次数
+            best_score (float, optional): 当前最佳得分
+            infeasible (int): 本次评估中不满足约束的候选解数量
+            cache_hits (int): 本次命中得分缓存的次数
+        """
+        self.candidates += candidates
+        self.proposed += proposed
+        self.accepted += accepted
+        self.restarts += restarts
+        self.infeasible += infeasible
+        self.cache_hits += cache_hits
+        if best_score is not None and best_score > self.best_score:
+            self.best_score = best_score
+            # 只在最佳得分提高时记录收敛轨迹，轨迹长度与改进次数成正比
+            if self.instrument is not None:
+                self.instrument.record(self.candidates, best_score)
+        if self._enabled:
+            now = time.perf_counter()
+            if now - self._last_report >= self.interval:
+                self._last_report = now
+                self.report("search_progress")
+
+    def counters(self):
+        """返回可跨进程传递的计数，供 merge() 合并"""
+        return {
+            "candidates": self.candidates,
+            "proposed": self.proposed,
+            "accepted": self.accepted,
+            "restarts": self.restarts,
+            "infeasible": self.infeasible,
+            "cache_hits": self.cache_hits,
+            "best_score": self.best_score,
+        }
+
+    def merge(self, counters):
+        """合并另一个进度统计（例如进程池中的一次运行）的计数；phases 为该运行的阶段计时"""
+        counters = dict(counters)
+        phases = counters.pop("phases", None)
+        if phases and self.instrument is not None:
+            self.instrument.merge_phases(phases)
+        self.update(**counters)
+
+    def event(self, name="search_progress"):
+        """构造结构化事件"""
+        elapsed = time.perf_counter() - self.start_time
+        return {
+            "event": name,
+            "algorithm": self.algorithm,
+            "elapsed": round(elapsed, 3),
+            "candidates": self.candidates,
+            "candidates_per_second": round(self.candidates / elapsed, 1) if elapsed > 0 else 0.0,
+            "best_score": self.best_score,
+            "acceptance_rate": round(self.accepted / self.proposed, 4) if self.proposed else 0.0,
+            "restarts": self.restarts,
+            "infeasible": self.infeasible,
+        }
+
+    def report(self, name="search_progress"):
+        """输出一条进度事件"""
+        event = self.event(name)
+        self.logger.info(" ".join(f"{key}={value}" for key, value in event.items()), extra={"event": event})
+        return event
+
+    def finish(self):
+        """搜索结束时输出汇总事件"""
+        if self.instrument is not None:
+            self.instrument.finish(self)
+        if self._enabled:
+            return self.report("search_finished")
+        return self.event("search_finished")
+
+
+def phase(instrument, name):
+    """
+    统计一个阶段的用时；instrument 为 None 时返回空的上下文管理器
+
+    Args:
+        instrument (SearchInstrumentation, optional): 搜索统计
+        name (str): 阶段名称
+
+    Returns:
+        上下文管理器
+    """
+    if instrument is None:
+        return nullcontext()
+    return instrument.phase(name)
+
+
+def profiled(func):
+    """
+    算法函数的装饰器: 以关键字参数传入的 instrument 带有性能分析器时，在分析器启用期间调用算法
+
+    没有传入 instrument 或没有分析器时直接调用，只多一次字典查找。
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        instrument = kwargs.get("instrument")
+        if instrument is None or instrument.profiler is None:
+            return func(*args, **kwargs)
+        with instrument.profiling():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class SearchInstrumentation:
+    """
+    一次算法调用的搜索统计: 计数、各阶段用时、收敛轨迹和可选的性能分析
+
+    传给算法的 instrument 参数后由算法内部的 SearchProgress 填写；不传时算法只多做几次 None 判断。
+    计数包括评估的候选解、缓存命中、接受/拒绝的移动、重启和不可行候选解。
+    阶段用时按名称累加，阶段可以嵌套（外层包含内层的用时）。
+    收敛轨迹只在最佳得分提高时记录一个点 (evaluations, elapsed, best_score)。
+
+    Args:
+        convergence (bool): 是否记录收敛轨迹
+        profile (optional): True 或 "cprofile" 使用 cProfile；也可以是任何有 enable()/disable() 方法的
+            分析器对象（例如采样分析器），在整个算法调用期间启用
+    """
+
+    def __init__(self, convergence=True, profile=None):
+        self.algorithm = None
+        self.counters = {}
+        self.phases = {}
+        self.phase_calls = {}
+        self.convergence = [] if convergence else None
+        self.elapsed = 0.0
+        if profile is True or profile == "cprofile":
+            profile = cProfile.Profile()
+        self.profiler = profile
+        self._start_time = time.perf_counter()
+
+    def start(self, algorithm, start_time):
+        """由 SearchProgress 在算法开始时调用"""
+        self.algorithm = algorithm
+        self._start_time = start_time
+
+    def record(self, evaluations, best_score):
+        """记录收敛轨迹上的一个点"""
+        if self.convergence is not None:
+            self.convergence.append((evaluations, time.perf_counter() - self._start_time, float(best_score)))
+
+    @contextmanager
+    def phase(self, name):
+        """统计 with 块的用时，按名称累加"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, calls=1):
+        """累加一个阶段的用时"""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.phase_calls[name] = self.phase_calls.get(name, 0) + calls
+
+    def merge_phases(self, phases):
+        """合并另一次运行（例如进程池中的一次运行）的阶段用时 {name: (seconds, calls)}"""
+        for name, (seconds, calls) in phases.items():
+            self.add_time(name, seconds, calls)
+
+    def phase_totals(self):
+        """返回可跨进程传递的阶段用时 {name: (seconds, calls)}"""
+        return {name: (seconds, self.phase_calls[name]) for name, seconds in self.phases.items()}
+
+    @contextmanager
+    def profiling(self):
+        """在 with 块中启用性能分析器；没有分析器时什么也不做"""
+        if self.profiler is None:
+            yield
+            return
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+
+    def finish(self, progress):
+        """由 SearchProgress 在算法结束时调用，保存最终计数"""
+        self.elapsed = time.perf_counter() - self._start_time
+        self.counters = {
+            "evaluations": progress.candidates,
+            "cache_hits": progress.cache_hits,
+            "proposed": progress.proposed,
+            "accepted": progress.accepted,
+            "rejected": progress.proposed - progress.accepted,
+            "restarts": progress.restarts,
+            "infeasible": progress.infeasible,
+            "best_score": float(progress.best_score),
+        }
+
+    def profile_stats(self, sort="cumulative", limit=30):
+        """
+        返回 cProfile 的统计文本
+
+        Args:
+            sort (str): 排序字段，见 pstats.Stats.sort_stats
+            limit (int): 输出的函数数量
+
+        Returns:
+            str: 统计文本；未使用 cProfile 时为空字符串
+        """
+        if not isinstance(self.profiler, cProfile.Profile):
+            return ""
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def summary(self):
+        """返回可以写入JSON的汇总"""
+        return {
+            "algorithm": self.algorithm,
+            "elapsed": self.elapsed,
+            "counters": self.counters,
+            "phases": {name: {"seconds": seconds, "calls": self.phase_calls[name]} for name, seconds in self.phases.items()},
+            "convergence": [{"evaluations": evaluations, "elapsed": elapsed, "best_score": score}
+                            for evaluations, elapsed, score in self.convergence or []],
+        }
+
+    def export_json(self, path):
+        """把汇总写入JSON文件；得分为 -inf 时写为 null"""
+        summary = self.summary()
+        if summary["counters"].get("best_score") == float('-inf'):
+            summary["counters"]["best_score"] = None
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    def export_csv(self, path):
+        """把收敛轨迹写入CSV文件，列为 evaluations, elapsed, best_score"""
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["evaluations", "elapsed", "best_score"])
+            writer.writerows(self.convergence or [])
+
+    def export_profile(self, path):
+        """把 cProfile 的原始统计写入文件，可以用 pstats 或 snakeviz 查看"""
+        if isinstance(self.profiler, cProfile.Profile):
+            self.profiler.dump_stats(path)